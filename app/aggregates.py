@@ -0,0 +1,77 @@
+"""
+Cubo de agregados de hospitales para el dashboard.
+
+Cada recarga de Streamlit recorría la tabla completa de hospitales varias veces
+(value_counts por departamento, institución y clasificación, nunique, rangos de
+coordenadas). Aquí esos conteos se materializan una vez por versión de datos
+(ver DERIVED en datastore.py) en un cubo departamento × provincia × distrito ×
+institución × clasificación con el número de hospitales y la extensión lat/lon
+de cada celda, más una tabla distrital con los distritos sin hospitales. El
+dashboard solo filtra y re-agrega el cubo, cuyo tamaño depende del número de
+combinaciones y no del número de establecimientos.
+"""
+import pandas as pd
+
+CUBE_DIMENSIONS = ['Departamento', 'Provincia', 'Distrito', 'Institución', 'Clasificación']
+DISTRICT_COLUMNS = ['IDDIST', 'DEPARTAMEN', 'PROVINCIA', 'DISTRITO', 'num_hospitales']
+
+
+def build_cube(hospitales) -> pd.DataFrame:
+    """Conteo y extensión lat/lon de hospitales por combinación de dimensiones."""
+    from proximity import point_coords
+
+    lon, lat = point_coords(hospitales)
+    base = pd.DataFrame({dim: hospitales[dim].to_numpy() for dim in CUBE_DIMENSIONS})
+    base['lat'], base['lon'] = lat, lon
+    cube = base.groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=True).agg(
+        hospitales=('lat', 'size'),
+        lat_min=('lat', 'min'), lat_max=('lat', 'max'),
+        lon_min=('lon', 'min'), lon_max=('lon', 'max'),
+    )
+    return cube.reset_index()
+
+
+def build_district_table(distritos) -> pd.DataFrame:
+    """Tabla distrital sin geometría (incluye los distritos con 0 hospitales)."""
+    tabla = pd.DataFrame(distritos[DISTRICT_COLUMNS])
+    tabla['num_hospitales'] = tabla['num_hospitales'].fillna(0).astype('int32')
+    return tabla.sort_values(['DEPARTAMEN', 'PROVINCIA', 'DISTRITO'], kind='stable').reset_index(drop=True)
+
+
+def slice_cube(cube, filtros=None) -> pd.DataFrame:
+    """Celdas del cubo que cumplen {dimensión: valor o lista de valores}."""
+    mask = pd.Series(True, index=cube.index)
+    for dim, valor in (filtros or {}).items():
+        if valor is None:
+            continue
+        valores = valor if isinstance(valor, (list, tuple, set)) else [valor]
+        mask &= cube[dim].isin(valores)
+    return cube[mask]
+
+
+def counts(cube, by, filtros=None) -> pd.Series:
+    """Hospitales por `by` (una dimensión o lista), de mayor a menor como value_counts."""
+    celdas = slice_cube(cube, filtros)
+    serie = celdas.groupby(by, observed=True)['hospitales'].sum()
+    return serie[serie > 0].sort_values(ascending=False, kind='stable')
+
+
+def total(cube, filtros=None) -> int:
+    return int(slice_cube(cube, filtros)['hospitales'].sum())
+
+
+def spans(cube, filtros=None):
+    """Extensión (grados) en latitud y longitud de los hospitales seleccionados."""
+    celdas = slice_cube(cube, filtros)
+    if celdas.empty:
+        return 0.0, 0.0
+    return (float(celdas['lat_max'].max() - celdas['lat_min'].min()),
+            float(celdas['lon_max'].max() - celdas['lon_min'].min()))
+
+
+def zero_hospital_districts(tabla, departamento=None) -> pd.DataFrame:
+    """Distritos sin hospitales, opcionalmente de un departamento."""
+    sin = tabla[tabla['num_hospitales'] == 0]
+    if departamento is not None:
+        sin = sin[sin['DEPARTAMEN'] == departamento]
+    return sin
@@ -2,12 +2,15 @@
 import os
 from pathlib import Path
 import streamlit as st
+import numpy as np
 import pandas as pd
-import geopandas as gpd
-import plotly.express as px
-import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+import aggregates
+import datastore
+import profiling
+
+# geopandas, plotly y los módulos que los usan (plots, siting) se importan dentro
+# de cada pestaña: solo se cargan cuando la pestaña que los necesita se abre
 
 # ----- Rutas robustas -----
 APP_DIR  = Path(__file__).resolve().parent      # .../app
@@ -32,58 +35,126 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-@st.cache_data
-def load_data():
-    """Carga todos los datos necesarios usando rutas robustas."""
+def data_version(name):
+    """Huella barata (mtime) de la fuente de un dataset: invalida la caché de recursos si cambia."""
     try:
-        hospitales = gpd.read_file(f("data/hospitales_procesados.geojson"))
-        try:
-            distritos = gpd.read_file(f("data/distritos_con_hospitales.geojson"))
-        except Exception:
-            distritos = None
-        try:
-            stats_dept = pd.read_csv(f("data/estadisticas_departamentales.csv"))
-        except Exception:
-            stats_dept = None
-        return hospitales, distritos, stats_dept
-    except Exception as e:
-        st.error(f"Error cargando datos: {e}")
-        return None, None, None
+        return datastore.source_stat(datastore.source_path(name))["mtime_ns"]
+    except (OSError, ValueError):
+        return None
+
+@st.cache_resource(show_spinner=False)
+def _load_dataset(name, columns, version):
+    return datastore.load(name, columns=None if columns is None else list(columns))
+
+def load_dataset(name, columns=None):
+    """
+    Dataset compartido por todas las sesiones y recargas sin serializar ni
+    copiar (st.cache_resource): tratarlo como solo lectura.
+    """
+    with profiling.span(f"load_{name}") as tramo:
+        datos = _load_dataset(name, None if columns is None else tuple(columns), data_version(name))
+        tramo.rows = len(datos)
+    return datos
+
+def load_cube():
+    """Cubo de hospitales materializado en la caché columnar; se construye si falta."""
+    try:
+        return load_dataset("cubo_hospitales")
+    except Exception:
+        return aggregates.build_cube(load_dataset("hospitales", columns=aggregates.CUBE_DIMENSIONS + ["latitud", "longitud"]))
+
+def show_missing_data(error):
+    st.error(f"❌ No se pudieron cargar los datos ({error}). Verifica archivos en la carpeta /data")
+    try:
+        st.caption("Contenido de /data detectado:")
+        st.code("\\n".join(sorted(p.name for p in Path(f('data')).glob('*'))))
+    except Exception:
+        pass
+
+@st.cache_resource
+def _load_siting_scenario(departamento, version):
+    import siting
+    from districts import district_index
+    hospitales = datastore.load("hospitales")
+    centros = datastore.load("ccpp")
+    indice = district_index()
+    centros["IDDIST"] = indice.assign(centros, "IDDIST")
+    distritos = pd.DataFrame(indice.attrs).drop_duplicates("IDDIST").set_index("IDDIST")
+    centros = centros[centros["IDDIST"].map(distritos["DEPARTAMEN"]) == departamento]
+    escenario = siting.CoverageScenario.from_geodataframes(hospitales, centros, group_col="IDDIST", radius_km=10)
+    return escenario, distritos["DISTRITO"]
+
+def load_siting_scenario(departamento):
+    """
+    Escenario base de cobertura (CCPP del departamento frente a todos los
+    hospitales), uno por proceso y versión de los datos.
+    """
+    return _load_siting_scenario(departamento, (data_version("hospitales"), data_version("ccpp")))
+
+PERF_EVENTS_KEY = "perf_events"
+
+def profiling_requested():
+    """Pestaña oculta de rendimiento: ?perf=1 en la URL o HOSPITALS_PROFILE=1."""
+    return st.query_params.get("perf") == "1" or os.environ.get(profiling.ENV_VAR, "") not in ("", "0")
 
 def main():
     """Función principal del dashboard"""
-    st.title("🏥 Hospitals Access Peru")
-    st.markdown("**Geospatial Analysis of Public Hospital Access**")
-
-    # Cargar datos
-    hospitales, distritos, stats_dept = load_data()
-    if hospitales is None:
-        st.error("❌ No se pudieron cargar los datos. Verifica archivos en la carpeta /data")
-        try:
-            st.caption("Contenido de /data detectado:")
-            st.code("\\n".join(sorted(p.name for p in Path(f('data')).glob('*'))))
-        except Exception:
-            pass
-        return
+    # El perfilado es por sesión: solo las recargas de quien lo pide registran
+    # (en su buffer de session_state) y pagan el coste de tracemalloc
+    mostrar_rendimiento = profiling_requested()
+    if mostrar_rendimiento:
+        eventos = st.session_state.setdefault(PERF_EVENTS_KEY, profiling.new_buffer())
+    else:
+        st.session_state.pop(PERF_EVENTS_KEY, None)
+        profiling.disable()
+        eventos = None
+    with profiling.rerun(events=eventos):
+        render_dashboard(mostrar_rendimiento)
+
+def lazy_tabs(nombres):
+    """Pestañas que solo ejecutan la seleccionada; en Streamlit sin `on_change` se ejecutan todas."""
+    try:
+        return st.tabs(nombres, key="pestana", on_change="rerun")
+    except TypeError:
+        return st.tabs(nombres)
 
-    # Tabs según requerimientos
-    tab1, tab2, tab3 = st.tabs([
-        "🗂️ Data Description", 
-        "🗺️ Static Maps & Department Analysis", 
-        "🌍 Dynamic Maps"
-    ])
+def tab_open(tab):
+    return getattr(tab, "open", None) is not False
 
-    with tab1:
-        show_data_description(hospitales)
+def render_dashboard(mostrar_rendimiento=False):
+    st.title("🏥 Hospitals Access Peru")
+    st.markdown("**Geospatial Analysis of Public Hospital Access**")
 
-    with tab2:
-        show_static_maps_department_analysis(hospitales, stats_dept)
+    # Tabs según requerimientos; cada una carga sus datos al abrirse
+    pestanas = [
+        ("🗂️ Data Description", "tab_data_description", show_data_description),
+        ("🗺️ Static Maps & Department Analysis", "tab_static_maps", show_static_maps_department_analysis),
+        ("🌍 Dynamic Maps", "tab_dynamic_maps", show_dynamic_maps),
+    ]
+    if mostrar_rendimiento:
+        pestanas.append(("⏱️ Performance", "tab_performance", show_performance))
+    tabs = lazy_tabs([nombre for nombre, _, _ in pestanas])
 
-    with tab3:
-        show_dynamic_maps()
+    for tab, (_, tramo, mostrar) in zip(tabs, pestanas):
+        if tab_open(tab):
+            with tab, profiling.span(tramo):
+                mostrar()
 
-def show_data_description(hospitales):
+def show_data_description():
     """Tab 1: Data Description con gráficos estadísticos expandidos"""
+    import plotly.express as px
+    import plots
+
+    try:
+        cubo = load_cube()
+        hospitales = load_dataset("hospitales", columns=[
+            "latitud", "longitud", "Departamento", "Nombre del establecimiento", "Institución"
+        ])
+    except Exception as e:
+        show_missing_data(e)
+        return
+    total_hospitales = aggregates.total(cubo)
+    dept_counts_all = aggregates.counts(cubo, 'Departamento')
 
     st.header("📋 Data Description")
 
@@ -110,7 +181,7 @@ def show_data_description(hospitales):
                 "Population centers for proximity analysis", 
                 "District boundaries for spatial analysis"
             ],
-            "Records": [f"{len(hospitales)} hospitals", "33 centers", "1,873 districts"]
+            "Records": [f"{total_hospitales} hospitals", "33 centers", "1,873 districts"]
         }
 
         st.dataframe(pd.DataFrame(sources_data), use_container_width=True, hide_index=True)
@@ -130,15 +201,15 @@ def show_data_description(hospitales):
         st.subheader("📈 Key Statistics")
 
         # Métricas principales
-        st.metric("Total Hospitals Analyzed", f"{len(hospitales)}")
-        st.metric("Departments Covered", f"{hospitales['Departamento'].nunique()}")
+        st.metric("Total Hospitals Analyzed", f"{total_hospitales}")
+        st.metric("Departments Covered", f"{len(dept_counts_all)}")
         st.metric("Geographic Coverage", "National")
 
         # Distribución por institución
         st.subheader("🏛️ By Institution")
-        inst_counts = hospitales['Institución'].value_counts()
+        inst_counts = aggregates.counts(cubo, 'Institución')
         for inst, count in inst_counts.items():
-            percentage = (count / len(hospitales)) * 100
+            percentage = (count / total_hospitales) * 100
             st.write(f"• {inst}: {count} ({percentage:.1f}%)")
 
         # Gráfico de distribución por institución
@@ -160,7 +231,7 @@ def show_data_description(hospitales):
     with col1:
         # Gráfico de barras - Top 10 departamentos
         st.write("**Top 10 Departments by Hospital Count**")
-        dept_counts = hospitales['Departamento'].value_counts().head(10)
+        dept_counts = dept_counts_all.head(10)
 
         fig_bar = px.bar(
             x=dept_counts.values,
@@ -176,7 +247,7 @@ def show_data_description(hospitales):
 
         # Gráfico de clasificación de hospitales
         st.write("**Hospital Classification Distribution**")
-        clasif_counts = hospitales['Clasificación'].value_counts()
+        clasif_counts = aggregates.counts(cubo, 'Clasificación')
 
         fig_clasif = px.bar(
             x=clasif_counts.values,
@@ -189,29 +260,27 @@ def show_data_description(hospitales):
         fig_clasif.update_layout(height=300)
         st.plotly_chart(fig_clasif, use_container_width=True)
 
+    # Coordenadas según el formato disponible
+    with profiling.span("coordinates", rows=len(hospitales)):
+        if 'latitud' in hospitales.columns and 'longitud' in hospitales.columns:
+            lat_values, lon_values = hospitales['latitud'].to_numpy(), hospitales['longitud'].to_numpy()
+        else:
+            # Si son geometrías de GeoPandas
+            lat_values, lon_values = hospitales.geometry.y.to_numpy(), hospitales.geometry.x.to_numpy()
+
     with col2:
-        # Histograma de distribución geográfica
+        # Histogramas binned en el servidor: solo viajan los conteos por bin
         st.write("**Geographic Distribution - Latitude**")
-        fig_hist_lat = px.histogram(
-            hospitales, 
-            x='latitud' if 'latitud' in hospitales.columns else hospitales.geometry.y,
-            nbins=20,
-            title="Latitude Distribution",
-            labels={'x': 'Latitude', 'y': 'Count'},
-            color_discrete_sequence=['#2ca02c']
+        fig_hist_lat = plots.histogram_figure(
+            lat_values, nbins=20, title="Latitude Distribution", x_label='Latitude', color='#2ca02c'
         )
         fig_hist_lat.update_layout(height=300)
         st.plotly_chart(fig_hist_lat, use_container_width=True)
 
         # Histograma de distribución geográfica - Longitud
         st.write("**Geographic Distribution - Longitude**")
-        fig_hist_lon = px.histogram(
-            hospitales, 
-            x='longitud' if 'longitud' in hospitales.columns else hospitales.geometry.x,
-            nbins=20,
-            title="Longitude Distribution",
-            labels={'x': 'Longitude', 'y': 'Count'},
-            color_discrete_sequence=['#d62728']
+        fig_hist_lon = plots.histogram_figure(
+            lon_values, nbins=20, title="Longitude Distribution", x_label='Longitude', color='#d62728'
         )
         fig_hist_lon.update_layout(height=300)
         st.plotly_chart(fig_hist_lon, use_container_width=True)
@@ -219,34 +288,38 @@ def show_data_description(hospitales):
     # Gráfico de dispersión geográfica
     st.write("**Geographic Scatter Plot**")
 
-    # Extraer coordenadas según el formato disponible
-    if 'latitud' in hospitales.columns and 'longitud' in hospitales.columns:
-        lat_col, lon_col = 'latitud', 'longitud'
-    else:
-        # Si son geometrías de GeoPandas
-        hospitales_coords = hospitales.copy()
-        hospitales_coords['lat_temp'] = hospitales_coords.geometry.y
-        hospitales_coords['lon_temp'] = hospitales_coords.geometry.x
-        lat_col, lon_col = 'lat_temp', 'lon_temp'
-
-    fig_scatter = px.scatter(
-        hospitales,
-        x=lon_col,
-        y=lat_col,
-        color='Departamento',
-        title="Hospital Locations Across Peru",
-        labels={'x': 'Longitude', 'y': 'Latitude'},
-        hover_data=['Nombre del establecimiento', 'Institución'] if 'Nombre del establecimiento' in hospitales.columns else None
-    )
-    fig_scatter.update_layout(height=500, showlegend=False)  # Hide legend due to many departments
+    # Muestra que preserva la densidad espacial cuando hay demasiados puntos
+    with profiling.span("scatter_figure", rows=len(hospitales)):
+        muestra = plots.decimate(lon_values, lat_values)
+        puntos = pd.DataFrame({
+            'Longitude': lon_values[muestra],
+            'Latitude': lat_values[muestra],
+            'Departamento': hospitales['Departamento'].to_numpy()[muestra],
+        })
+        hover_cols = [c for c in ('Nombre del establecimiento', 'Institución') if c in hospitales.columns]
+        for col in hover_cols:
+            puntos[col] = hospitales[col].to_numpy()[muestra]
+
+        fig_scatter = px.scatter(
+            puntos,
+            x='Longitude',
+            y='Latitude',
+            color='Departamento',
+            title="Hospital Locations Across Peru",
+            hover_data=hover_cols or None,
+            render_mode=plots.render_mode(len(puntos))
+        )
+        fig_scatter.update_layout(height=500, showlegend=False)  # Hide legend due to many departments
     st.plotly_chart(fig_scatter, use_container_width=True)
+    if len(puntos) < len(hospitales):
+        st.caption(f"Showing a density-preserving sample of {len(puntos):,} of {len(hospitales):,} hospitals")
 
     # Tabla estadística resumen
     col1, col2 = st.columns(2)
 
     with col1:
         st.write("**Department Statistics Summary**")
-        dept_stats = hospitales['Departamento'].value_counts().describe()
+        dept_stats = dept_counts_all.describe()
         stats_df = pd.DataFrame({
             'Statistic': ['Mean', 'Std Dev', 'Min', '25%', '50%', '75%', 'Max'],
             'Value': [f"{dept_stats['mean']:.1f}", f"{dept_stats['std']:.1f}", 
@@ -258,6 +331,7 @@ def show_data_description(hospitales):
 
     with col2:
         st.write("**Coverage Metrics**")
+        lat_span, lon_span = aggregates.spans(cubo)
         coverage_data = {
             'Metric': [
                 'Total Departments', 
@@ -268,18 +342,29 @@ def show_data_description(hospitales):
                 'Geographic Span (Lon)'
             ],
             'Value': [
-                hospitales['Departamento'].nunique(),
-                f"{len(hospitales) / hospitales['Departamento'].nunique():.1f}",
-                (hospitales['Departamento'].value_counts() <= 5).sum(),
-                (hospitales['Departamento'].value_counts() > 5).sum(),
-                f"{hospitales[lat_col].max() - hospitales[lat_col].min():.1f}°",
-                f"{hospitales[lon_col].max() - hospitales[lon_col].min():.1f}°"
+                len(dept_counts_all),
+                f"{total_hospitales / len(dept_counts_all):.1f}",
+                (dept_counts_all <= 5).sum(),
+                (dept_counts_all > 5).sum(),
+                f"{lat_span:.1f}°",
+                f"{lon_span:.1f}°"
             ]
         }
         st.dataframe(pd.DataFrame(coverage_data), use_container_width=True, hide_index=True)
 
-def show_static_maps_department_analysis(hospitales, stats_dept):
+def show_static_maps_department_analysis():
     """Tab 2: Static Maps & Department Analysis"""
+    import plotly.express as px
+
+    try:
+        cubo = load_cube()
+    except Exception as e:
+        show_missing_data(e)
+        return
+    try:
+        distritos_resumen = load_dataset("distritos_resumen")
+    except Exception:
+        distritos_resumen = None
     st.header("🗺️ Static Maps & Department Analysis")
     st.subheader("Static Maps Created with GeoPandas")
 
@@ -308,7 +393,7 @@ def show_static_maps_department_analysis(hospitales, stats_dept):
                     st.info("Run Notebook 2 to generate static maps")
 
     st.subheader("📊 Department Analysis")
-    dept_counts = hospitales['Departamento'].value_counts()
+    dept_counts = aggregates.counts(cubo, 'Departamento')
 
     col1, col2 = st.columns(2)
 
@@ -334,6 +419,39 @@ def show_static_maps_department_analysis(hospitales, stats_dept):
         fig_bar.update_layout(height=400, yaxis={'categoryorder': 'total ascending'})
         st.plotly_chart(fig_bar, use_container_width=True)
 
+    st.subheader("🏘️ District Analysis")
+    departamento = st.selectbox("Department:", list(dept_counts.index))
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.write(f"**Districts with hospitals - {departamento}**")
+        dist_counts = aggregates.counts(cubo, ['Provincia', 'Distrito'], {'Departamento': departamento})
+        st.dataframe(
+            dist_counts.rename('Hospitals').reset_index().rename(
+                columns={'Provincia': 'Province', 'Distrito': 'District'}),
+            use_container_width=True, hide_index=True
+        )
+        st.write("**By Institution and Classification**")
+        st.dataframe(
+            aggregates.counts(cubo, ['Institución', 'Clasificación'], {'Departamento': departamento})
+            .rename('Hospitals').reset_index(),
+            use_container_width=True, hide_index=True
+        )
+
+    with col2:
+        if distritos_resumen is None:
+            st.info("Run the conteo_distritos pipeline stage to list districts with zero hospitals")
+        else:
+            sin_hospitales = aggregates.zero_hospital_districts(distritos_resumen, departamento)
+            total_distritos = int((distritos_resumen['DEPARTAMEN'] == departamento).sum())
+            st.write(f"**Districts with zero hospitals - {departamento}**")
+            st.metric("Zero-hospital districts", f"{len(sin_hospitales)} / {total_distritos}")
+            st.dataframe(
+                sin_hospitales[['PROVINCIA', 'DISTRITO']].rename(
+                    columns={'PROVINCIA': 'Province', 'DISTRITO': 'District'}),
+                use_container_width=True, hide_index=True
+            )
+
 def show_dynamic_maps():
     """Tab 3: Dynamic Maps"""
     st.header("🌍 Dynamic Maps")
@@ -376,8 +494,9 @@ def show_dynamic_maps():
     map_file = map_files[map_option]
 
     if os.path.exists(map_file):
-        with open(map_file, 'r', encoding='utf-8') as fhtml:
+        with profiling.span("read_map_html") as tramo, open(map_file, 'r', encoding='utf-8') as fhtml:
             html = fhtml.read()
+            tramo.rows = len(html)
         st.components.v1.html(html, height=600)
     else:
         st.error(f"Dynamic map not found:\n{map_file}")
@@ -388,5 +507,226 @@ def show_dynamic_maps():
             pass
         st.info("Run Notebook 4 to generate interactive maps")
 
+    if map_option != "National Choropleth + Markers":
+        show_siting_whatif(map_option.split()[0].upper())
+    else:
+        show_suggested_sites()
+
+def show_suggested_sites():
+    """Sitios donde nuevos hospitales cubrirían más centros poblados hoy sin acceso"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    st.subheader("📍 Suggested New Hospital Sites")
+    try:
+        sitios = load_dataset("sitios_optimos")
+    except Exception:
+        sitios = None
+    if sitios is None or sitios.empty:
+        st.info("Run the pipeline (stage `ubicacion_optima`) to compute suggested sites")
+        return
+
+    st.markdown(
+        "Greedy maximal-coverage solution: each site is the population center that adds the most "
+        "currently uncovered centers within 10 km, given the existing hospitals and the sites chosen before it."
+    )
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        fig = px.scatter_map(
+            sitios, lat="latitud", lon="longitud", size="ganancia", color="rango",
+            hover_name="DISTRITO", hover_data={"DEPARTAMEN": True, "ganancia": True, "rango": True,
+                                              "latitud": False, "longitud": False},
+            color_continuous_scale="Viridis_r", zoom=4, height=500, map_style="carto-positron",
+            labels={"ganancia": "New centers covered", "rango": "Rank", "DEPARTAMEN": "Department"}
+        )
+        fig.update_layout(margin={"l": 0, "r": 0, "t": 0, "b": 0})
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        fig = go.Figure(go.Bar(x=sitios["rango"], y=sitios["ganancia"], name="Marginal"))
+        fig.add_trace(go.Scatter(x=sitios["rango"], y=sitios["porcentaje_cubierto"], name="Coverage %", yaxis="y2"))
+        fig.update_layout(
+            title="Marginal and cumulative coverage", xaxis_title="Sites added",
+            yaxis_title="New centers covered", yaxis2={"title": "Coverage %", "overlaying": "y", "side": "right"},
+            height=500, legend={"orientation": "h"}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        sitios[["rango", "DEPARTAMEN", "PROVINCIA", "DISTRITO", "ganancia", "acumulado", "porcentaje_cubierto",
+                "latitud", "longitud"]].rename(columns={
+            "rango": "Rank", "DEPARTAMEN": "Department", "PROVINCIA": "Province", "DISTRITO": "District",
+            "ganancia": "New centers", "acumulado": "Cumulative", "porcentaje_cubierto": "Coverage %",
+            "latitud": "Latitude", "longitud": "Longitude"
+        }).round(4),
+        use_container_width=True, hide_index=True
+    )
+
+def siting_update(clave, operacion):
+    """Callback de los botones what-if: aplica el cambio antes de la recarga"""
+    escenario = st.session_state[clave]
+    with profiling.span("siting_update") as tramo:
+        if operacion == "add":
+            cambio = escenario.add_site(
+                st.session_state[f"{clave}_lon"], st.session_state[f"{clave}_lat"],
+                st.session_state.get(f"{clave}_name") or None
+            )
+        else:
+            sitio = st.session_state.get(f"{clave}_pick")
+            if sitio is None:
+                return
+            cambio = escenario.remove_site(int(sitio))
+        tramo.rows = cambio["centros_revisados"]
+    st.session_state[f"{clave}_last"] = cambio
+
+def siting_reset(clave, base):
+    st.session_state[clave] = base.copy()
+    st.session_state.pop(f"{clave}_last", None)
+
+def show_siting_whatif(departamento):
+    """Control what-if: añadir/quitar hospitales y ver la cobertura de 10 km al instante"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    import plots
+
+    st.subheader(f"🏗️ What-if Hospital Siting – {departamento.title()}")
+    try:
+        with profiling.span("load_siting_scenario"):
+            base, nombres = load_siting_scenario(departamento)
+    except ImportError as e:
+        st.error(f"What-if siting needs a missing package ({e}); install app/requirements.txt")
+        return
+    except Exception as e:
+        st.info(f"What-if siting needs the CCPP and district layers in /data ({e})")
+        return
+    if len(base) == 0:
+        st.info("No population centers found for this region")
+        return
+
+    # Cada sesión edita su propia copia del estado base compartido
+    clave = f"siting_{departamento}"
+    if clave not in st.session_state:
+        st.session_state[clave] = base.copy()
+    escenario = st.session_state[clave]
+
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col1:
+        st.number_input("Latitude", value=float(np.median(base.center_lat)), format="%.4f", key=f"{clave}_lat")
+    with col2:
+        st.number_input("Longitude", value=float(np.median(base.center_lon)), format="%.4f", key=f"{clave}_lon")
+    with col3:
+        st.text_input("Name (optional)", key=f"{clave}_name")
+
+    sitios = escenario.sites_table()
+    activos = sitios[sitios["activo"]].sort_values("hipotetico", ascending=False)
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("➕ Add hospital", key=f"{clave}_add", on_click=siting_update, args=(clave, "add"))
+    with col2:
+        st.selectbox(
+            "Facility to remove", activos["sitio"].tolist(), key=f"{clave}_pick",
+            format_func=lambda i: ("🆕 " if escenario.hypothetical[i] else "") + escenario.site_names[i]
+        )
+    with col3:
+        st.button("➖ Remove facility", key=f"{clave}_remove", on_click=siting_update, args=(clave, "remove"))
+    st.button("↺ Reset scenario", key=f"{clave}_reset", on_click=siting_reset, args=(clave, base))
+
+    resumen = escenario.summary()
+    inicial = base.summary()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Covered centers (≤10 km)", f"{resumen['cubiertos']:,}",
+                delta=f"{resumen['cubiertos'] - inicial['cubiertos']:+,}")
+    col2.metric("Uncovered centers", f"{resumen['sin_cobertura']:,}",
+                delta=f"{resumen['sin_cobertura'] - inicial['sin_cobertura']:+,}", delta_color="inverse")
+    col3.metric("Coverage", f"{resumen['porcentaje_cubierto']:.1f}%")
+    col4.metric("Median distance", f"{resumen['dist_mediana_km']:.1f} km")
+    ultimo = st.session_state.get(f"{clave}_last")
+    if ultimo is not None:
+        accion = "Added" if ultimo["operacion"] == "add" else "Removed"
+        st.caption(
+            f"{accion} {escenario.site_names[ultimo['sitio']]}: {ultimo['centros_revisados']:,} nearby centers "
+            f"re-evaluated, coverage change {ultimo['cambio_cubiertos']:+,}"
+        )
+
+    with profiling.span("siting_map") as tramo:
+        centros = escenario.centers_table()
+        muestra = plots.decimate(centros["longitud"], centros["latitud"])
+        centros = centros.iloc[muestra]
+        tramo.rows = len(centros)
+        fig = px.scatter_map(
+            centros, lat="latitud", lon="longitud", color="tiene_acceso",
+            color_discrete_map={True: "green", False: "orange"},
+            hover_data={"dist_hospital_km": ':.1f', "tiene_acceso": True, "latitud": False, "longitud": False},
+            zoom=6 if departamento == "LORETO" else 8, height=550, map_style="carto-positron"
+        )
+        fig.update_traces(marker={"size": 5, "opacity": 0.7})
+        puntos = sitios[sitios["activo"]]
+        puntos = puntos[(puntos["longitud"].between(centros["longitud"].min() - 1, centros["longitud"].max() + 1))
+                        & (puntos["latitud"].between(centros["latitud"].min() - 1, centros["latitud"].max() + 1))]
+        for hipotetico, color, etiqueta in [(False, "red", "Hospital"), (True, "blue", "Hypothetical hospital")]:
+            grupo = puntos[puntos["hipotetico"] == hipotetico]
+            fig.add_trace(go.Scattermap(
+                lat=grupo["latitud"], lon=grupo["longitud"], mode="markers", name=etiqueta,
+                marker={"size": 11, "color": color}, text=grupo["nombre"], hoverinfo="text"
+            ))
+        fig.update_layout(margin={"l": 0, "r": 0, "t": 0, "b": 0}, legend_title_text="")
+    st.plotly_chart(fig, use_container_width=True)
+    if len(muestra) < len(escenario):
+        st.caption(f"Showing a density-preserving sample of {len(muestra):,} of {len(escenario):,} population centers")
+
+    tabla = escenario.group_table()
+    tabla.insert(0, "District", tabla["grupo"].map(nombres).fillna(tabla["grupo"]))
+    tabla["Δ covered"] = tabla["cubiertos"] - base.covered_by_group
+    tabla = tabla.drop(columns="grupo").rename(columns={
+        "centros": "Centers", "cubiertos": "Covered", "sin_cobertura": "Uncovered",
+        "porcentaje_cubierto": "Coverage %", "dist_media_km": "Mean distance (km)"
+    })
+    st.dataframe(
+        tabla.sort_values(["Δ covered", "Uncovered"], ascending=False).round(1),
+        use_container_width=True, hide_index=True
+    )
+
+def show_performance():
+    """Tab oculta: tiempo, memoria pico y filas por tramo de cada recarga"""
+    import plotly.express as px
+
+    st.header("⏱️ Performance")
+    eventos = st.session_state.get(PERF_EVENTS_KEY, profiling.new_buffer())
+    registros = profiling.records(eventos=eventos)
+    completas = registros.loc[registros["category"] == "rerun", "run"]
+    if completas.empty:
+        st.info("Interact with the dashboard to record a complete rerun")
+        return
+
+    ultima = int(completas.max())
+    st.subheader(f"Last rerun (#{ultima})")
+    tramos = registros[(registros["run"] == ultima) & (registros["category"] != "rerun")]
+    total_ms = float(registros.loc[(registros["category"] == "rerun") & (registros["run"] == ultima), "duration_ms"].iloc[0])
+    st.metric("Rerun wall time", f"{total_ms:.0f} ms")
+    fig = px.bar(
+        tramos, x="duration_ms", y="name", orientation="h", color="depth",
+        labels={"duration_ms": "ms", "name": ""}, title="Span durations"
+    )
+    fig.update_layout(height=350, yaxis={'categoryorder': 'total ascending'}, coloraxis_showscale=False)
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(
+        tramos[["name", "depth", "duration_ms", "peak_mb", "rows", "error"]].round(2),
+        use_container_width=True, hide_index=True
+    )
+    if tramos["peak_mb"].isna().any():
+        st.caption("Peak memory is blank for spans that overlapped a profiled rerun of another session")
+
+    st.subheader(f"All recorded reruns ({len(completas)})")
+    st.dataframe(profiling.summary(registros).round(2), use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "⬇️ Download trace (Chrome/Perfetto JSON)", profiling.export_trace(eventos=list(eventos)),
+            file_name="hospitals_access_trace.json", mime="application/json"
+        )
+    with col2:
+        if st.button("🗑️ Clear recorded spans"):
+            eventos.clear()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,239 @@
+"""
+Superficie de costo de viaje al hospital más cercano (raster de fricción).
+
+En regiones amazónicas como Loreto la distancia en línea recta no representa
+el acceso: se viaja por ríos y trochas. `friction_grid` rasteriza una malla
+lon/lat sobre el departamento con el costo en minutos por km de cada celda
+(terreno dentro de los polígonos distritales; ríos y vías opcionales, más
+rápidos; fuera del país, intransitable). `cost_surface` calcula en una sola
+pasada de Dijkstra multi-origen (scipy.sparse.csgraph) el costo desde cada
+celda al hospital más cercano. La malla se procesa en bloques con un margen
+que cubre el costo máximo `max_minutes`, de modo que la memoria del grafo es
+acotada y el resultado es exacto hasta ese costo. Costos y hospital más
+cercano se guardan como arrays float32 / int32, y el costo de cada centro
+poblado se obtiene por lectura directa de su celda.
+"""
+import numpy as np
+
+KM_PER_DEGREE = 111.32
+
+# Velocidades de referencia (km/h): caminata en selva, bote fluvial, trocha/carretera
+LAND_KMH = 4.0
+RIVER_KMH = 12.0
+ROAD_KMH = 30.0
+
+# Vecindad de 8 celdas: (desplazamiento fila, desplazamiento columna)
+OFFSETS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def minutes_per_km(speed_kmh):
+    return 60.0 / speed_kmh
+
+
+class CostGrid:
+    """Malla regular lon/lat: esquina noroeste, tamaño de celda en grados y forma."""
+
+    def __init__(self, west, north, cell_x, cell_y, shape):
+        self.west = float(west)
+        self.north = float(north)
+        self.cell_x = float(cell_x)
+        self.cell_y = float(cell_y)
+        self.shape = tuple(int(n) for n in shape)
+
+    @classmethod
+    def from_bounds(cls, bounds, cell_km=1.0):
+        """Malla de celdas de ~cell_km sobre (oeste, sur, este, norte)."""
+        west, south, east, north = bounds
+        cell_y = cell_km / KM_PER_DEGREE
+        cell_x = cell_km / (KM_PER_DEGREE * np.cos(np.radians((south + north) / 2)))
+        shape = (int(np.ceil((north - south) / cell_y)), int(np.ceil((east - west) / cell_x)))
+        return cls(west, north, cell_x, cell_y, shape)
+
+    def centers(self, rows=slice(None), cols=slice(None)):
+        """Coordenadas (lon, lat) de los centros de celda de una ventana, como mallas 2-D."""
+        filas = np.arange(self.shape[0])[rows]
+        columnas = np.arange(self.shape[1])[cols]
+        lon = self.west + (columnas + 0.5) * self.cell_x
+        lat = self.north - (filas + 0.5) * self.cell_y
+        return np.meshgrid(lon, lat)
+
+    def cell_of(self, lon, lat):
+        """(fila, columna) de cada punto y máscara de puntos dentro de la malla."""
+        fila = np.floor((self.north - np.asarray(lat, dtype=float)) / self.cell_y).astype(np.int64)
+        columna = np.floor((np.asarray(lon, dtype=float) - self.west) / self.cell_x).astype(np.int64)
+        dentro = (fila >= 0) & (fila < self.shape[0]) & (columna >= 0) & (columna < self.shape[1])
+        return fila, columna, dentro
+
+    def step_km(self, rows):
+        """Longitud (km) de un paso este-oeste y norte-sur en cada fila (el primero depende de la latitud)."""
+        lat = self.north - (np.asarray(rows) + 0.5) * self.cell_y
+        return self.cell_x * KM_PER_DEGREE * np.cos(np.radians(lat)), self.cell_y * KM_PER_DEGREE
+
+
+def _burn_lines(grid, friccion, lineas, costo):
+    """Asigna `costo` (si es menor) a las celdas que atraviesan las líneas."""
+    import shapely
+    if lineas is None or len(lineas) == 0:
+        return
+    geometrias = lineas.to_crs("EPSG:4326").geometry.values if lineas.crs is not None else lineas.geometry.values
+    # Puntos cada media celda sobre cada línea: ninguna celda atravesada queda sin marcar
+    densas = shapely.segmentize(geometrias, min(grid.cell_x, grid.cell_y) / 2)
+    coords = shapely.get_coordinates(densas)
+    fila, columna, dentro = grid.cell_of(coords[:, 0], coords[:, 1])
+    fila, columna = fila[dentro], columna[dentro]
+    friccion[fila, columna] = np.fmin(friccion[fila, columna], np.float32(costo))
+
+
+def friction_grid(distritos, bounds, cell_km=1.0, rivers=None, roads=None,
+                  land_kmh=LAND_KMH, river_kmh=RIVER_KMH, road_kmh=ROAD_KMH):
+    """
+    Raster de fricción (min/km, float32) sobre `bounds`. Las celdas dentro de
+    algún polígono distrital son transitables a `land_kmh`; las que cruzan
+    ríos o vías (GeoDataFrames de líneas opcionales) toman su velocidad; el
+    resto (mar, países vecinos) queda en inf.
+    """
+    import shapely
+    grid = CostGrid.from_bounds(bounds, cell_km)
+    if distritos.crs is not None and distritos.crs.to_epsg() != 4326:
+        distritos = distritos.to_crs("EPSG:4326")
+    caja = shapely.box(*bounds)
+    geometrias = distritos.geometry.values
+    tierra = shapely.union_all(geometrias[shapely.intersects(geometrias, caja)])
+    shapely.prepare(tierra)
+
+    friccion = np.full(grid.shape, np.inf, dtype=np.float32)
+    lon, lat = grid.centers()
+    friccion[shapely.contains_xy(tierra, lon, lat)] = minutes_per_km(land_kmh)
+    _burn_lines(grid, friccion, rivers, minutes_per_km(river_kmh))
+    _burn_lines(grid, friccion, roads, minutes_per_km(road_kmh))
+    return grid, friccion
+
+
+def _window_graph(grid, friccion, r0, r1, c0, c1):
+    """Grafo disperso (8 vecinos) de la ventana; peso = fricción media × longitud del paso."""
+    from scipy import sparse
+    ventana = friccion[r0:r1, c0:c1]
+    alto, ancho = ventana.shape
+    ids = np.arange(alto * ancho).reshape(alto, ancho)
+    paso_x, paso_y = grid.step_km(np.arange(r0, r1))
+    origenes, destinos, pesos = [], [], []
+    for df, dc in OFFSETS:
+        a = (slice(0, alto - df), slice(max(0, -dc), ancho - max(0, dc)))
+        b = (slice(df, alto), slice(max(0, dc), ancho - max(0, -dc)))
+        largo = np.hypot(paso_x[:alto - df, None] * abs(dc), paso_y * df)
+        peso = (ventana[a] + ventana[b]) / 2 * largo
+        valido = np.isfinite(peso)
+        origenes.append(ids[a][valido])
+        destinos.append(ids[b][valido])
+        pesos.append(peso[valido])
+    origenes, destinos, pesos = (np.concatenate(x) for x in (origenes, destinos, pesos))
+    n = alto * ancho
+    return sparse.coo_matrix((pesos, (origenes, destinos)), shape=(n, n)).tocsr()
+
+
+class CostSurface:
+    """Costo (min) al hospital más cercano por celda y posición de ese hospital (-1 si no hay)."""
+
+    def __init__(self, grid, cost, nearest):
+        self.grid = grid
+        self.cost = cost
+        self.nearest = nearest
+
+    def sample(self, lon, lat):
+        """Costo (min) y hospital más cercano para puntos; inf / -1 fuera de la malla."""
+        fila, columna, dentro = self.grid.cell_of(lon, lat)
+        costo = np.full(len(fila), np.inf, dtype=np.float32)
+        cercano = np.full(len(fila), -1, dtype=np.int32)
+        costo[dentro] = self.cost[fila[dentro], columna[dentro]]
+        cercano[dentro] = self.nearest[fila[dentro], columna[dentro]]
+        return costo, cercano
+
+    def save(self, path):
+        g = self.grid
+        np.savez_compressed(path, cost=self.cost, nearest=self.nearest,
+                            grid=np.array([g.west, g.north, g.cell_x, g.cell_y, *g.shape]))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as datos:
+            west, north, cell_x, cell_y, filas, columnas = datos["grid"]
+            return cls(CostGrid(west, north, cell_x, cell_y, (filas, columnas)), datos["cost"], datos["nearest"])
+
+
+def cost_surface(grid, friccion, hosp_lon, hosp_lat, max_minutes=600, tile=512):
+    """
+    Costo mínimo desde cada celda al hospital más cercano, por bloques de
+    `tile` celdas con un margen que ningún camino de costo <= max_minutes
+    puede superar (la fricción mínima fija cuántas celdas avanza ese costo).
+    """
+    from scipy.sparse.csgraph import dijkstra
+
+    fila_h, columna_h, dentro = grid.cell_of(hosp_lon, hosp_lat)
+    posicion_h = np.flatnonzero(dentro)
+    fila_h, columna_h = fila_h[dentro], columna_h[dentro]
+    transitable = np.isfinite(friccion[fila_h, columna_h])
+    posicion_h, fila_h, columna_h = posicion_h[transitable], fila_h[transitable], columna_h[transitable]
+
+    costo = np.full(grid.shape, np.inf, dtype=np.float32)
+    cercano = np.full(grid.shape, -1, dtype=np.int32)
+    minima = float(np.nanmin(np.where(np.isfinite(friccion), friccion, np.nan))) if np.isfinite(friccion).any() else np.inf
+    if not posicion_h.size or not np.isfinite(minima):
+        return CostSurface(grid, costo, cercano)
+    paso_minimo = min(float(grid.step_km(np.arange(grid.shape[0]))[0].min()), grid.cell_y * KM_PER_DEGREE)
+    margen = int(np.ceil(max_minutes / (minima * paso_minimo))) + 1
+
+    alto, ancho = grid.shape
+    for r0 in range(0, alto, tile):
+        for c0 in range(0, ancho, tile):
+            r1, c1 = min(r0 + tile, alto), min(c0 + tile, ancho)
+            R0, R1 = max(0, r0 - margen), min(alto, r1 + margen)
+            C0, C1 = max(0, c0 - margen), min(ancho, c1 + margen)
+            en_ventana = (fila_h >= R0) & (fila_h < R1) & (columna_h >= C0) & (columna_h < C1)
+            if not en_ventana.any():
+                continue
+            nodos = (fila_h[en_ventana] - R0) * (C1 - C0) + (columna_h[en_ventana] - C0)
+            # Varios hospitales en una celda: basta el primero como origen
+            nodos, primero = np.unique(nodos, return_index=True)
+            hospital = posicion_h[en_ventana][primero]
+            grafo = _window_graph(grid, friccion, R0, R1, C0, C1)
+            dist, _, origen = dijkstra(grafo, directed=False, indices=nodos, min_only=True,
+                                       limit=max_minutes, return_predecessors=True)
+            dist = dist.reshape(R1 - R0, C1 - C0)[r0 - R0:r1 - R0, c0 - C0:c1 - C0]
+            origen = origen.reshape(R1 - R0, C1 - C0)[r0 - R0:r1 - R0, c0 - C0:c1 - C0]
+            alcanzado = origen >= 0
+            costo[r0:r1, c0:c1] = dist
+            bloque = cercano[r0:r1, c0:c1]
+            bloque[alcanzado] = hospital[np.searchsorted(nodos, origen[alcanzado])]
+    return CostSurface(grid, costo, cercano)
+
+
+def region_accessibility(hospitales, centros, distritos, departamento, cell_km=1.0, margin_km=50,
+                         rivers=None, roads=None, max_minutes=600, tile=512):
+    """
+    Superficie de costo de un departamento (con un margen para hospitales
+    vecinos) y costo de cada centro poblado leído de su celda.
+    Devuelve (superficie, tabla de centros con costo_min y hospital_cercano).
+    """
+    from proximity import point_coords
+
+    propios = distritos[distritos["DEPARTAMEN"].astype(str).str.upper() == departamento.upper()]
+    if propios.crs is not None and propios.crs.to_epsg() != 4326:
+        propios = propios.to_crs("EPSG:4326")
+    oeste, sur, este, norte = propios.total_bounds
+    margen = margin_km / KM_PER_DEGREE
+    bounds = (oeste - margen, sur - margen, este + margen, norte + margen)
+
+    grid, friccion = friction_grid(distritos, bounds, cell_km, rivers, roads)
+    h_lon, h_lat = point_coords(hospitales)
+    superficie = cost_surface(grid, friccion, h_lon, h_lat, max_minutes, tile)
+
+    c_lon, c_lat = point_coords(centros)
+    costo, cercano = superficie.sample(c_lon, c_lat)
+    nombres = hospitales["Nombre del establecimiento"].to_numpy() if "Nombre del establecimiento" in hospitales else None
+    tabla = centros.drop(columns=centros.geometry.name).copy()
+    tabla["longitud"] = c_lon
+    tabla["latitud"] = c_lat
+    tabla["costo_min"] = costo
+    if nombres is not None:
+        tabla["hospital_cercano"] = np.where(cercano >= 0, nombres[np.maximum(cercano, 0)], None)
+    return superficie, tabla
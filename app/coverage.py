@@ -0,0 +1,137 @@
+"""
+Cobertura hospitalaria por departamento en su zona UTM correcta.
+
+El notebook 03 proyecta todo a EPSG:32718, lo que distorsiona las distancias
+en las zonas 17S (Tumbes, Piura) y 19S (Madre de Dios, este de Loreto), y solo
+procesa Lima y Loreto una tras otra. Aquí cada departamento se proyecta a la
+zona UTM de su centro, se generan los buffers de sus hospitales (incluidos los
+de departamentos vecinos a menos de `radius_km` del límite), se disuelve la
+cobertura y se cuentan los centros poblados cubiertos. Los 25 departamentos se
+procesan en paralelo y el resultado se une en una sola tabla nacional.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+def utm_epsg(lon: float, lat: float) -> int:
+    """Código EPSG WGS84/UTM de la zona que contiene (lon, lat)."""
+    zona = int((lon + 180) // 6) + 1
+    return (32700 if lat < 0 else 32600) + zona
+
+
+def _bbox_mask(lon, lat, bbox, margin_km):
+    """Puntos dentro de bbox (lon/lat) ampliado en margin_km."""
+    minx, miny, maxx, maxy = bbox
+    dlat = margin_km / KM_PER_DEGREE_LAT
+    dlon = dlat / max(np.cos(np.radians(max(abs(miny), abs(maxy)))), 0.1)
+    return (lon >= minx - dlon) & (lon <= maxx + dlon) & (lat >= miny - dlat) & (lat <= maxy + dlat)
+
+
+def coverage_partition(nombre, hosp_lon, hosp_lat, propios, ccpp_lon, ccpp_lat,
+                       radius_km=10, with_geometry=False):
+    """
+    Cobertura de una partición (departamento) proyectada a su zona UTM.
+    `propios` marca los hospitales que pertenecen al departamento; el resto
+    son vecinos cuyos buffers cruzan el límite. El área reportada es la de la
+    cobertura disuelta, incluidos esos buffers vecinos.
+    """
+    import shapely
+    from pyproj import Transformer
+
+    fila = {
+        "Departamento": nombre,
+        "epsg_utm": None,
+        "hospitales": int(np.count_nonzero(propios)),
+        "hospitales_considerados": len(hosp_lon),
+        "centros_poblados": len(ccpp_lon),
+        "centros_cubiertos": 0,
+        "area_cobertura_km2": 0.0,
+    }
+    if len(ccpp_lon) == 0 and len(hosp_lon) == 0:
+        return fila, None
+
+    ref_lon = np.concatenate([ccpp_lon, hosp_lon[propios]]) if len(ccpp_lon) else hosp_lon
+    ref_lat = np.concatenate([ccpp_lat, hosp_lat[propios]]) if len(ccpp_lat) else hosp_lat
+    epsg = utm_epsg(float(np.median(ref_lon)), float(np.median(ref_lat)))
+    fila["epsg_utm"] = epsg
+    if len(hosp_lon) == 0:
+        return fila, None
+
+    to_utm = Transformer.from_crs(4326, epsg, always_xy=True)
+    hx, hy = to_utm.transform(hosp_lon, hosp_lat)
+    buffers = shapely.buffer(shapely.points(hx, hy), radius_km * 1000)
+    cobertura = shapely.union_all(buffers)
+    fila["area_cobertura_km2"] = cobertura.area / 1e6
+
+    if len(ccpp_lon):
+        cx, cy = to_utm.transform(ccpp_lon, ccpp_lat)
+        shapely.prepare(cobertura)
+        fila["centros_cubiertos"] = int(np.count_nonzero(shapely.contains_xy(cobertura, cx, cy)))
+
+    geometria = None
+    if with_geometry:
+        to_wgs84 = Transformer.from_crs(epsg, 4326, always_xy=True)
+        geometria = shapely.to_wkb(shapely.transform(
+            cobertura, lambda xy: np.column_stack(to_wgs84.transform(xy[:, 0], xy[:, 1]))
+        ))
+    return fila, geometria
+
+
+def _coverage_args(args):
+    return coverage_partition(*args)
+
+
+def assign_departments(points, distritos, dept_col="DEPARTAMEN"):
+    """Departamento de cada punto por inclusión en los polígonos distritales (preparados)."""
+    from districts import DistrictIndex
+    return DistrictIndex(distritos, columns=[dept_col]).assign(points, dept_col)
+
+
+def national_coverage(hospitales, centros, radius_km=10, max_workers=None, with_geometry=False):
+    """
+    Cobertura de todos los departamentos en paralelo.
+    `centros` debe traer la columna 'Departamento' (ver assign_departments).
+    Devuelve (tabla, geometrías WKB en EPSG:4326 por departamento o None).
+    """
+    from proximity import point_coords
+
+    h_lon, h_lat = point_coords(hospitales)
+    h_dept = hospitales["Departamento"].astype(str).str.upper().to_numpy()
+    c_lon, c_lat = point_coords(centros)
+    c_dept = centros["Departamento"].astype(object).fillna("").astype(str).str.upper().to_numpy()
+
+    departamentos = sorted((set(h_dept) | set(c_dept)) - {""})
+    tareas = []
+    for dept in departamentos:
+        en_dept = c_dept == dept
+        propios_h = h_dept == dept
+        ref_lon = c_lon[en_dept] if en_dept.any() else h_lon[propios_h]
+        ref_lat = c_lat[en_dept] if en_dept.any() else h_lat[propios_h]
+        bbox = (ref_lon.min(), ref_lat.min(), ref_lon.max(), ref_lat.max())
+        # Hospitales propios + vecinos cuyo buffer puede alcanzar el departamento
+        cerca = propios_h | _bbox_mask(h_lon, h_lat, bbox, radius_km)
+        tareas.append((dept, h_lon[cerca], h_lat[cerca], propios_h[cerca],
+                       c_lon[en_dept], c_lat[en_dept], radius_km, with_geometry))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        resultados = list(pool.map(_coverage_args, tareas))
+
+    tabla = pd.DataFrame([fila for fila, _ in resultados])
+    tabla["porcentaje_cubierto"] = np.where(
+        tabla["centros_poblados"] > 0, tabla["centros_cubiertos"] / tabla["centros_poblados"].clip(lower=1) * 100, 0.0
+    )
+    geometrias = {fila["Departamento"]: g for fila, g in resultados} if with_geometry else None
+    return tabla.sort_values("porcentaje_cubierto", kind="stable").reset_index(drop=True), geometrias
+
+
+def coverage_geodataframe(tabla, geometrias):
+    """GeoDataFrame de cobertura disuelta por departamento (EPSG:4326)."""
+    import geopandas as gpd
+    import shapely
+    wkb = [geometrias.get(d) for d in tabla["Departamento"]]
+    geometry = [shapely.from_wkb(g) if g is not None else None for g in wkb]
+    return gpd.GeoDataFrame(tabla.copy(), geometry=geometry, crs="EPSG:4326")
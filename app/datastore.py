@@ -0,0 +1,279 @@
+"""
+Caché columnar de los datasets del proyecto.
+
+Convierte cada GeoJSON / shapefile / CSV de /data a un archivo Arrow IPC
+(Feather v2, sin compresión) con la geometría en WKB, columnas de texto
+repetitivas como categóricas y metadatos con versión de esquema y huella del
+archivo fuente. La carga usa memory-map y puede leer solo las columnas
+necesarias; si la caché no existe o está desactualizada (mtime/tamaño y, si
+cambian, hash SHA-256) se regenera desde la fuente.
+
+Uso:
+    python app/datastore.py            # convierte todos los datasets
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - pyarrow es opcional
+    pa = None
+
+# ----- Rutas robustas -----
+APP_DIR   = Path(__file__).resolve().parent
+ROOT_DIR  = APP_DIR.parent
+DATA_DIR  = ROOT_DIR / "data"
+CACHE_DIR = DATA_DIR / "cache"
+
+SCHEMA_VERSION = 1
+GEOMETRY_COLUMN = "geometry"
+METADATA_KEY = b"hospitals_access_peru"
+
+# Nombre lógico -> archivo fuente en /data
+DATASETS = {
+    "hospitales":           "hospitales_procesados.geojson",
+    "distritos":            "DISTRITOS.shp",
+    "distritos_hospitales": "distritos_con_hospitales.geojson",
+    "ccpp":                 "CCPP_IGN100K.shp",
+    "buffers_lima":         "buffers_lima_10km.geojson",
+    "buffers_loreto":       "buffers_loreto_10km.geojson",
+    "centros_lima":         "centros_poblados_lima_acceso.geojson",
+    "centros_loreto":       "centros_poblados_loreto_acceso.geojson",
+    "estadisticas":         "estadisticas_departamentales.csv",
+    "sitios_optimos":       "sitios_optimos.csv",
+}
+
+# Agregados materializados: nombre -> (dataset de origen, "módulo:función").
+# Su caché se invalida con la huella del archivo fuente del dataset de origen
+# o si cambia el módulo que los construye (builder_fingerprint).
+DERIVED = {
+    "cubo_hospitales":   ("hospitales", "aggregates:build_cube"),
+    "distritos_resumen": ("distritos_hospitales", "aggregates:build_district_table"),
+    # Geometría distrital limpia en EPSG:4326 y simplificada por tolerancia (districts.py)
+    "distritos_wgs84":   ("distritos", "districts:clean_districts"),
+    "distritos_fino":    ("distritos", "districts:simplify_fino"),
+    "distritos_medio":   ("distritos", "districts:simplify_medio"),
+    "distritos_grueso":  ("distritos", "districts:simplify_grueso"),
+    "distritos_hospitales_medio": ("distritos_hospitales", "districts:simplify_medio"),
+}
+
+SHAPEFILE_PARTS = (".shp", ".shx", ".dbf", ".prj", ".cpg")
+
+
+def source_path(name: str) -> Path:
+    if name in DERIVED:
+        name = DERIVED[name][0]
+    return DATA_DIR / DATASETS[name]
+
+
+def cache_path(name: str) -> Path:
+    return CACHE_DIR / f"{name}.feather"
+
+
+def _source_files(path: Path):
+    """Un shapefile son varios archivos; todos cuentan para la huella."""
+    if path.suffix.lower() == ".shp":
+        return [p for p in (path.with_suffix(s) for s in SHAPEFILE_PARTS) if p.exists()]
+    return [path]
+
+
+def source_stat(path: Path) -> dict:
+    files = _source_files(path)
+    return {
+        "mtime_ns": max(p.stat().st_mtime_ns for p in files),
+        "size": sum(p.stat().st_size for p in files),
+    }
+
+
+def source_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    for p in _source_files(path):
+        with open(p, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _categorize(df: pd.DataFrame, max_ratio=0.5) -> pd.DataFrame:
+    """Convierte a categóricas las columnas de texto con pocos valores distintos."""
+    n = len(df)
+    for col in df.columns:
+        if col == GEOMETRY_COLUMN or n == 0:
+            continue
+        if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col]):
+            if df[col].nunique(dropna=True) <= max_ratio * n:
+                df[col] = df[col].astype("category")
+    return df
+
+
+def _builder(name: str):
+    import importlib
+    module, func = DERIVED[name][1].split(":")
+    return getattr(importlib.import_module(module), func)
+
+
+def builder_fingerprint(name: str):
+    """
+    Huella del constructor de un agregado de DERIVED: el código del módulo
+    que lo define (función y constantes como CUBE_DIMENSIONS o TOLERANCIAS),
+    y si es un functools.partial sus argumentos fijados y el módulo de la
+    función envuelta. None para los datasets fuente.
+    """
+    if name not in DERIVED:
+        return None
+    import functools
+    import sys
+    builder = _builder(name)
+    modules = {DERIVED[name][1].split(":")[0]}
+    digest = hashlib.sha256()
+    while isinstance(builder, functools.partial):
+        digest.update(repr((builder.args, sorted(builder.keywords.items()))).encode())
+        builder = builder.func
+    modules.add(builder.__module__)
+    for module in sorted(modules):
+        digest.update(Path(sys.modules[module].__file__).read_bytes())
+    return digest.hexdigest()
+
+
+def _build_derived(name: str, columns=None):
+    data = _builder(name)(load(DERIVED[name][0]))
+    return data if columns is None else data[list(columns)]
+
+
+def _read_source(name: str, columns=None):
+    if name in DERIVED:
+        return _build_derived(name, columns)
+    path = source_path(name)
+    if not path.exists():
+        raise FileNotFoundError(path)
+    if path.suffix.lower() == ".csv":
+        return pd.read_csv(path, usecols=columns)
+    import geopandas as gpd
+    gdf = gpd.read_file(path, columns=columns)
+    if gdf.crs is None:
+        gdf = gdf.set_crs("EPSG:4326")
+    return gdf
+
+
+def _read_schema(path: Path):
+    with pa.memory_map(str(path), "r") as source:
+        return pa.ipc.open_file(source).schema
+
+
+def _read_metadata(path: Path):
+    raw = (_read_schema(path).metadata or {}).get(METADATA_KEY)
+    return json.loads(raw) if raw else None
+
+
+def write_cache(name: str, data=None) -> Path:
+    """Escribe la caché Arrow de un dataset (leyendo la fuente si no se pasa `data`)."""
+    if pa is None:
+        raise ImportError("pyarrow es necesario para la caché columnar")
+    path = source_path(name)
+    data = _read_source(name) if data is None else data
+
+    meta = {
+        "schema_version": SCHEMA_VERSION,
+        "source": path.name,
+        "sha256": source_hash(path),
+        "crs": None,
+        "builder": builder_fingerprint(name),
+        **source_stat(path),
+    }
+    df = pd.DataFrame(data, copy=True)
+    if GEOMETRY_COLUMN in df.columns:
+        import shapely
+        meta["crs"] = data.crs.to_string() if data.crs is not None else None
+        df[GEOMETRY_COLUMN] = shapely.to_wkb(df[GEOMETRY_COLUMN].to_numpy())
+    df = _categorize(df)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        METADATA_KEY: json.dumps(meta).encode(),
+    })
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    out = cache_path(name)
+    tmp = out.with_suffix(f".{os.getpid()}.tmp")
+    # Sin compresión para que la lectura con memory-map no copie buffers
+    feather.write_feather(table, tmp, compression="uncompressed")
+    tmp.replace(out)
+    return out
+
+
+def is_fresh(name: str) -> bool:
+    """True si la caché existe, tiene el esquema actual y corresponde a la fuente (y al constructor)."""
+    if pa is None or not cache_path(name).exists():
+        return False
+    meta = _read_metadata(cache_path(name))
+    if not meta or meta.get("schema_version") != SCHEMA_VERSION:
+        return False
+    path = source_path(name)
+    if not path.exists():
+        # Sin fuente la caché es lo único disponible
+        return True
+    if meta.get("builder") != builder_fingerprint(name):
+        # Cambió el código que construye el agregado
+        return False
+    stat = source_stat(path)
+    if stat["mtime_ns"] == meta["mtime_ns"] and stat["size"] == meta["size"]:
+        return True
+    # mtime cambió (p. ej. git checkout): decide el contenido
+    return stat["size"] == meta["size"] and source_hash(path) == meta["sha256"]
+
+
+def _from_table(table, meta):
+    df = table.to_pandas()
+    if GEOMETRY_COLUMN not in df.columns:
+        return df
+    import geopandas as gpd
+    import shapely
+    geometry = shapely.from_wkb(df.pop(GEOMETRY_COLUMN).to_numpy())
+    return gpd.GeoDataFrame(df, geometry=geometry, crs=meta.get("crs"))
+
+
+def load(name: str, columns=None, refresh=True):
+    """
+    Carga un dataset por nombre lógico.
+    `columns` limita las columnas leídas (la geometría se incluye si existe).
+    Con `refresh=True` una caché ausente o desactualizada se regenera.
+    """
+    if pa is None:
+        return _read_source(name, columns)
+
+    path = cache_path(name)
+    if not is_fresh(name):
+        if not refresh:
+            return _read_source(name, columns)
+        write_cache(name)
+
+    if columns is not None:
+        columns = list(columns)
+        if GEOMETRY_COLUMN in _read_schema(path).names and GEOMETRY_COLUMN not in columns:
+            columns.append(GEOMETRY_COLUMN)
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    return _from_table(table, _read_metadata(path))
+
+
+def build_all(names=None, force=False):
+    """Convierte todos los datasets disponibles; devuelve {nombre: estado}."""
+    estados = {}
+    for name in names or [*DATASETS, *DERIVED]:
+        if not source_path(name).exists():
+            estados[name] = "sin fuente"
+        elif not force and is_fresh(name):
+            estados[name] = "al día"
+        else:
+            write_cache(name)
+            estados[name] = "regenerada"
+    return estados
+
+
+if __name__ == "__main__":
+    for nombre, estado in build_all().items():
+        print(f"{nombre}: {estado}")
@@ -0,0 +1,126 @@
+"""
+Servicio de geometrías distritales: polígonos preparados y versiones simplificadas.
+
+`DistrictIndex` guarda los polígonos de DISTRITOS ya preparados (GEOS) en un
+STRtree; ubicar un lote de puntos es una consulta de cajas al árbol seguida de
+`contains_xy` solo sobre los pares candidatos, sin el sjoin de geopandas ni
+GeoDataFrames intermedios. `district_index()` lo construye una vez por proceso
+y versión de la fuente, a partir de la capa ya limpia y en EPSG:4326 de la
+caché columnar.
+
+Las versiones simplificadas (TOLERANCIAS, en grados) son agregados derivados
+de datastore: se calculan una vez y su caché se invalida con la huella del
+shapefile, de modo que los mapas estáticos no dibujan la geometría completa.
+"""
+from functools import lru_cache, partial
+
+import numpy as np
+import pandas as pd
+
+INDEX_COLUMNS = ("IDDPTO", "DEPARTAMEN", "IDPROV", "PROVINCIA", "IDDIST", "DISTRITO")
+
+# Tolerancias de simplificación (grados); "medio" queda por debajo de un píxel en los PNG a 300 dpi
+TOLERANCIAS = {"fino": 0.0005, "medio": 0.002, "grueso": 0.01}
+
+
+def clean_districts(distritos):
+    """Distritos en EPSG:4326, sin geometrías nulas o vacías."""
+    if distritos.crs is not None and distritos.crs.to_epsg() != 4326:
+        distritos = distritos.to_crs("EPSG:4326")
+    return distritos[~(distritos.geometry.isna() | distritos.geometry.is_empty)].reset_index(drop=True)
+
+
+def simplify_districts(distritos, tolerance):
+    """
+    Simplificación que conserva la topología. Si los polígonos forman una
+    cobertura válida (sin solapes) se simplifican los bordes compartidos una
+    sola vez, sin abrir huecos entre vecinos; si no, polígono a polígono.
+    """
+    import shapely
+
+    distritos = clean_districts(distritos)
+    geometrias = np.asarray(distritos.geometry.values, dtype=object)
+    if hasattr(shapely, "coverage_simplify") and shapely.coverage_is_valid(geometrias):
+        simples = shapely.coverage_simplify(geometrias, tolerance)
+    else:
+        simples = shapely.simplify(geometrias, tolerance, preserve_topology=True)
+    return distritos.set_geometry(simples, crs=distritos.crs)
+
+
+# Constructores de los agregados de datastore.DERIVED, uno por tolerancia
+simplify_fino = partial(simplify_districts, tolerance=TOLERANCIAS["fino"])
+simplify_medio = partial(simplify_districts, tolerance=TOLERANCIAS["medio"])
+simplify_grueso = partial(simplify_districts, tolerance=TOLERANCIAS["grueso"])
+
+
+class DistrictIndex:
+    """Polígonos distritales preparados y su STRtree para ubicar lotes de puntos."""
+
+    def __init__(self, distritos, columns=INDEX_COLUMNS):
+        import shapely
+
+        distritos = clean_districts(distritos)
+        self.geometries = np.asarray(distritos.geometry.values, dtype=object)
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+        self.attrs = {c: distritos[c].astype(object).to_numpy() for c in columns if c in distritos.columns}
+
+    def __len__(self):
+        return len(self.geometries)
+
+    def locate(self, lon, lat, points=None) -> np.ndarray:
+        """
+        Posición del distrito que contiene cada punto (-1 si ninguno o
+        coordenada inválida). `points` son las geometrías de los mismos puntos
+        si ya existen, para no volver a crearlas.
+        """
+        import shapely
+
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        posicion = np.full(len(lon), -1, dtype=np.int64)
+        validos = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+        if validos.size == 0 or len(self.geometries) == 0:
+            return posicion
+        x, y = lon[validos], lat[validos]
+        puntos = shapely.points(x, y) if points is None else np.asarray(points, dtype=object)[validos]
+        # Cajas primero; el test exacto solo corre sobre los pares candidatos
+        punto, distrito = self.tree.query(puntos)
+        dentro = shapely.contains_xy(self.geometries[distrito], x[punto], y[punto])
+        punto, distrito = punto[dentro], distrito[dentro]
+        # Un punto en el límite de dos distritos se queda con el de menor posición
+        orden = np.lexsort((distrito, punto))
+        punto, distrito = punto[orden], distrito[orden]
+        primero = np.r_[True, punto[1:] != punto[:-1]]
+        posicion[validos[punto[primero]]] = distrito[primero]
+        return posicion
+
+    def lookup(self, lon, lat, column, points=None) -> np.ndarray:
+        """Valor de `column` del distrito de cada punto (None si ninguno)."""
+        posicion = self.locate(lon, lat, points)
+        valores = np.full(len(posicion), None, dtype=object)
+        dentro = posicion >= 0
+        valores[dentro] = self.attrs[column][posicion[dentro]]
+        return valores
+
+    def assign(self, points, column) -> pd.Series:
+        """`column` del distrito de cada punto de un GeoDataFrame, alineado a su índice."""
+        if points.crs is not None and points.crs.to_epsg() != 4326:
+            points = points.to_crs("EPSG:4326")
+        geometrias = np.asarray(points.geometry.values, dtype=object)
+        lon, lat = points.geometry.x.to_numpy(), points.geometry.y.to_numpy()
+        return pd.Series(self.lookup(lon, lat, column, geometrias), index=points.index, dtype=object)
+
+
+@lru_cache(maxsize=2)
+def _cached_index(columns, version):
+    import datastore
+    return DistrictIndex(datastore.load("distritos_wgs84", columns=list(columns)), columns)
+
+
+def district_index(columns=INDEX_COLUMNS) -> DistrictIndex:
+    """Índice de DISTRITOS compartido en el proceso; se reconstruye si cambia la fuente."""
+    import datastore
+    fuente = datastore.source_path("distritos")
+    version = tuple(datastore.source_stat(fuente).values()) if fuente.exists() else None
+    return _cached_index(tuple(columns), version)
@@ -2,6 +2,7 @@ import numpy as np
 from scipy.stats import norm
 import plotly.graph_objects as go
 import pandas as pd
+from contextlib import contextmanager
 
 def generate_data(n = 1000):
         avg_age_group = np.random.choice([10, 20, 30, 40, 50], size = (n, 1))
@@ -36,7 +37,70 @@ def calculate_pvalue(beta, beta_variance):
         p_value = 2 * norm.cdf(-np.abs(t_statistic))
         return p_value
 
-def regression_results(data, outcome_label, explanatory_label):
+# Upper bound on replicate x row elements drawn at once (32 MB per float64 array)
+RESAMPLING_CHUNK_ELEMENTS = 4_000_000
+
+def _seed_sequence(seed):
+        return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+def batched_slopes(outcome, explanatory):
+        explanatory_deviations = explanatory - explanatory.mean(axis = 1, keepdims = True)
+        outcome_deviations = outcome - outcome.mean(axis = 1, keepdims = True)
+        return (outcome_deviations * explanatory_deviations).sum(axis = 1) / (explanatory_deviations ** 2).sum(axis = 1)
+
+def _resampling_chunk(args):
+        outcome, explanatory, kind, replicates, seed = args
+        rng = np.random.default_rng(seed)
+        n = len(outcome)
+        if kind == "bootstrap":
+                rows = rng.integers(0, n, size = (replicates, n))
+                return batched_slopes(outcome[rows], explanatory[rows])
+        rows = rng.permuted(np.broadcast_to(np.arange(n), (replicates, n)), axis = 1)
+        return batched_slopes(outcome[rows], np.broadcast_to(explanatory, (replicates, n)))
+
+@contextmanager
+def resampling_pool(max_workers = None, pool = None):
+        # One process pool shared by every resampled_slopes call of a run, so
+        # worker start-up is paid once; None when resampling runs in this process
+        if pool is not None or max_workers is None or max_workers <= 1:
+                yield pool
+                return
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers = max_workers) as new_pool:
+                yield new_pool
+
+def resampled_slopes(outcome, explanatory, kind, replicates = 2000, seed = 0, max_workers = None, pool = None):
+        outcome = np.asarray(outcome, dtype = float)
+        explanatory = np.asarray(explanatory, dtype = float)
+        per_chunk = max(1, min(replicates, RESAMPLING_CHUNK_ELEMENTS // max(len(outcome), 1)))
+        sizes = [min(per_chunk, replicates - start) for start in range(0, replicates, per_chunk)]
+        # One child seed per chunk: same draws whatever the number of workers
+        seeds = _seed_sequence(seed).spawn(len(sizes))
+        tasks = [(outcome, explanatory, kind, size, child) for size, child in zip(sizes, seeds)]
+        if len(tasks) == 1 or (pool is None and (max_workers is None or max_workers <= 1)):
+                return np.concatenate([_resampling_chunk(task) for task in tasks])
+        with resampling_pool(max_workers, pool) as active:
+                return np.concatenate(list(active.map(_resampling_chunk, tasks)))
+
+def resampling_inference(outcome, explanatory, replicates = 2000, seed = 0, confidence = 0.95, max_workers = None, pool = None):
+        outcome = np.asarray(outcome, dtype = float)
+        explanatory = np.asarray(explanatory, dtype = float)
+        beta_2 = batched_slopes(outcome[None, :], explanatory[None, :])[0]
+        bootstrap_seed, permutation_seed = _seed_sequence(seed).spawn(2)
+        with resampling_pool(max_workers, pool) as pool:
+                bootstrap = resampled_slopes(outcome, explanatory, "bootstrap", replicates, bootstrap_seed, max_workers, pool)
+                permutation = resampled_slopes(outcome, explanatory, "permutation", replicates, permutation_seed, max_workers, pool)
+        alpha = (1 - confidence) / 2
+        ci_low, ci_high = np.nanquantile(bootstrap, [alpha, 1 - alpha])
+        extreme = np.count_nonzero(np.abs(permutation) >= np.abs(beta_2))
+        return {
+                "ci_low": ci_low,
+                "ci_high": ci_high,
+                "confidence": confidence,
+                "permutation_p_value": (extreme + 1) / (replicates + 1)
+        }
+
+def regression_results(data, outcome_label, explanatory_label, resampling = None):
         beta_1, beta_2, beta_2_variance = bivariate_regression(data, outcome_label, explanatory_label)
         p_value = calculate_pvalue(beta_2, beta_2_variance)
         results = {
@@ -44,26 +108,224 @@ def regression_results(data, outcome_label, explanatory_label):
                 "beta_2": beta_2, 
                 "p_value": p_value
         }
+        if resampling is not None:
+                results.update(resampling_inference(data[outcome_label].to_numpy(), data[explanatory_label].to_numpy(), **resampling))
         return results
 
+def sufficient_statistics(outcome, explanatory, codes, n_groups, shift_outcome = 0.0, shift_explanatory = 0.0):
+        y = np.asarray(outcome, dtype = float) - shift_outcome
+        x = np.asarray(explanatory, dtype = float) - shift_explanatory
+        statistics = np.empty((6, n_groups))
+        statistics[0] = np.bincount(codes, minlength = n_groups)
+        statistics[1] = np.bincount(codes, weights = x, minlength = n_groups)
+        statistics[2] = np.bincount(codes, weights = y, minlength = n_groups)
+        statistics[3] = np.bincount(codes, weights = x * y, minlength = n_groups)
+        statistics[4] = np.bincount(codes, weights = x * x, minlength = n_groups)
+        statistics[5] = np.bincount(codes, weights = y * y, minlength = n_groups)
+        return statistics
+
+def regression_from_statistics(statistics, shift_outcome = 0.0, shift_explanatory = 0.0):
+        n, sum_x, sum_y, sum_xy, sum_xx, sum_yy = statistics
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+                mean_explanatory = sum_x / n
+                mean_outcome = sum_y / n
+                explanatory_squares = sum_xx - sum_x * mean_explanatory
+                cross_products = sum_xy - sum_x * mean_outcome
+                outcome_squares = sum_yy - sum_y * mean_outcome
+                beta_2 = cross_products / explanatory_squares
+                beta_1 = (mean_outcome + shift_outcome) - (mean_explanatory + shift_explanatory) * beta_2
+                estimated_variance = np.maximum(outcome_squares - beta_2 * cross_products, 0) / (n - 2)
+                beta_2_variance = estimated_variance / explanatory_squares
+        return beta_1, beta_2, beta_2_variance
+
+def grouped_regression(data, outcome_label, explanatory_label, group_variable):
+        codes, groups = pd.factorize(data[group_variable], sort = True)
+        outcome = data[outcome_label].to_numpy(dtype = float)
+        explanatory = data[explanatory_label].to_numpy(dtype = float)
+        # Centering on the overall means keeps the one-pass sums numerically stable
+        shift_outcome, shift_explanatory = outcome.mean(), explanatory.mean()
+        # Rows with a missing group go to an extra last bin: excluded from the
+        # per-group fits but still part of the aggregated totals
+        codes = np.where(codes < 0, len(groups), codes)
+        statistics = sufficient_statistics(outcome, explanatory, codes, len(groups) + 1, shift_outcome, shift_explanatory)
+        beta_1, beta_2, beta_2_variance = regression_from_statistics(statistics[:, :-1], shift_outcome, shift_explanatory)
+        grouped = {
+                "beta_1": beta_1,
+                "beta_2": beta_2,
+                "beta_2_variance": beta_2_variance,
+                "p_value": calculate_pvalue(beta_2, beta_2_variance)
+        }
+        return groups, grouped, statistics, (shift_outcome, shift_explanatory)
+
 def disaggregated_fits(data, explanatory_label, group_variable, results):
-        data["disaggregated_beta1"] = data[group_variable].apply(lambda row: results[row]["beta_1"])
-        data["disaggregated_beta2"] = data[group_variable].apply(lambda row: results[row]["beta_2"])
+        codes, groups = pd.factorize(data[group_variable])
+        beta_1 = np.append([results[group]["beta_1"] for group in groups], np.nan)
+        beta_2 = np.append([results[group]["beta_2"] for group in groups], np.nan)
+        # Missing groups have code -1 and pick the trailing NaN
+        data["disaggregated_beta1"] = beta_1[codes]
+        data["disaggregated_beta2"] = beta_2[codes]
         disaggregated_fit = data["disaggregated_beta1"] + data["disaggregated_beta2"] * data[explanatory_label]
         return disaggregated_fit
 
 
-def execute_regressions(data: pd.DataFrame, outcome_label = "cholesterol", explanatory_label = "exercise", group_variable = "age_groups"):
+def execute_regressions(data: pd.DataFrame, outcome_label = "cholesterol", explanatory_label = "exercise", group_variable = "age_groups", resampling = None):
+        groups, grouped, statistics, shifts = grouped_regression(data, outcome_label, explanatory_label, group_variable)
+        beta_1, beta_2, beta_2_variance = regression_from_statistics(statistics.sum(axis = 1), *shifts)
         results = {
-                "segregated": {}, 
-                "aggregated": regression_results(data, outcome_label, explanatory_label)
+                "segregated": {
+                        group: {measure: values[i] for measure, values in grouped.items()}
+                        for i, group in enumerate(groups)
+                },
+                "aggregated": {
+                        "beta_1": beta_1,
+                        "beta_2": beta_2,
+                        "beta_2_variance": beta_2_variance,
+                        "p_value": calculate_pvalue(beta_2, beta_2_variance)
+                }
         }
-        for age, group in data.groupby(group_variable):
-                results["segregated"].update({age: regression_results(group, outcome_label, explanatory_label)})
+        if resampling is not None:
+                # resampling: keyword arguments of resampling_inference (replicates, seed, max_workers...)
+                outcome = data[outcome_label].to_numpy(dtype = float)
+                explanatory = data[explanatory_label].to_numpy(dtype = float)
+                seeds = _seed_sequence(resampling.get("seed", 0)).spawn(len(groups) + 1)
+                options = {key: value for key, value in resampling.items() if key not in ("seed", "pool")}
+                codes = pd.Categorical(data[group_variable], categories = groups).codes
+                with resampling_pool(options.get("max_workers"), resampling.get("pool")) as pool:
+                        results["aggregated"].update(resampling_inference(outcome, explanatory, seed = seeds[-1], pool = pool, **options))
+                        for i, group in enumerate(groups):
+                                rows = codes == i
+                                results["segregated"][group].update(resampling_inference(outcome[rows], explanatory[rows], seed = seeds[i], pool = pool, **options))
         aggregated = results["aggregated"]
         data["aggregated_fit"] = aggregated["beta_1"] + aggregated["beta_2"] * data[explanatory_label]
         data["disaggregated_fit"] = disaggregated_fits(data, explanatory_label, group_variable, results["segregated"])
         return results, data
 
+def generate_data_chunks(n = 1000, chunksize = 100_000):
+        for start in range(0, n, chunksize):
+                yield generate_data(min(chunksize, n - start))
+
+def chunk_moments(outcome, explanatory, codes, n_groups):
+        y = np.asarray(outcome, dtype = float)
+        x = np.asarray(explanatory, dtype = float)
+        n = np.bincount(codes, minlength = n_groups).astype(float)
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+                mean_x = np.where(n > 0, np.bincount(codes, weights = x, minlength = n_groups) / n, 0.0)
+                mean_y = np.where(n > 0, np.bincount(codes, weights = y, minlength = n_groups) / n, 0.0)
+        dx = x - mean_x[codes]
+        dy = y - mean_y[codes]
+        return np.stack([
+                n, mean_x, mean_y,
+                np.bincount(codes, weights = dx * dx, minlength = n_groups),
+                np.bincount(codes, weights = dy * dy, minlength = n_groups),
+                np.bincount(codes, weights = dx * dy, minlength = n_groups)
+        ])
+
+def combine_moments(a, b):
+        # Pairwise update of means and centered sums (Chan et al.), exact for any split
+        n_a, mean_x_a, mean_y_a, m2x_a, m2y_a, cxy_a = a
+        n_b, mean_x_b, mean_y_b, m2x_b, m2y_b, cxy_b = b
+        n = n_a + n_b
+        share_b = np.divide(n_b, n, out = np.zeros_like(n), where = n > 0)
+        delta_x = mean_x_b - mean_x_a
+        delta_y = mean_y_b - mean_y_a
+        weight = n_a * share_b
+        return np.stack([
+                n,
+                mean_x_a + delta_x * share_b,
+                mean_y_a + delta_y * share_b,
+                m2x_a + m2x_b + delta_x * delta_x * weight,
+                m2y_a + m2y_b + delta_y * delta_y * weight,
+                cxy_a + cxy_b + delta_x * delta_y * weight
+        ])
+
+def regression_from_moments(moments):
+        n, mean_x, mean_y, m2x, m2y, cxy = moments
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+                beta_2 = cxy / m2x
+                beta_1 = mean_y - mean_x * beta_2
+                estimated_variance = np.maximum(m2y - beta_2 * cxy, 0) / (n - 2)
+                beta_2_variance = estimated_variance / m2x
+        return {
+                "beta_1": beta_1,
+                "beta_2": beta_2,
+                "p_value": calculate_pvalue(beta_2, beta_2_variance)
+        }
+
+class RegressionAccumulator:
+        """
+        Streaming version of regression_results / execute_regressions: feed
+        chunks with update, combine partial states with merge and call finalize.
+        The state is six numbers per group, whatever the number of rows.
+        """
+
+        def __init__(self, outcome_label = "cholesterol", explanatory_label = "exercise", group_variable = None):
+                self.outcome_label = outcome_label
+                self.explanatory_label = explanatory_label
+                self.group_variable = group_variable
+                self.total = np.zeros(6)
+                self.groups = {}
+                self.moments = np.zeros((6, 0))
+
+        def _group_codes(self, labels):
+                codes, uniques = pd.factorize(np.asarray(labels))
+                uniques = uniques.tolist()
+                for label in uniques:
+                        self.groups.setdefault(label, len(self.groups))
+                if len(self.groups) > self.moments.shape[1]:
+                        self.moments = np.pad(self.moments, ((0, 0), (0, len(self.groups) - self.moments.shape[1])))
+                positions = np.append([self.groups[label] for label in uniques], -1).astype(np.intp)
+                return positions[codes]
+
+        def update(self, chunk):
+                # Any mapping of labels to arrays: DataFrame, dict, structured memmap...
+                outcome = np.asarray(chunk[self.outcome_label], dtype = float)
+                explanatory = np.asarray(chunk[self.explanatory_label], dtype = float)
+                self.total = combine_moments(self.total, chunk_moments(outcome, explanatory, np.zeros(len(outcome), dtype = np.intp), 1)[:, 0])
+                if self.group_variable is not None:
+                        codes = self._group_codes(chunk[self.group_variable])
+                        valid = codes >= 0
+                        moments = chunk_moments(outcome[valid], explanatory[valid], codes[valid], len(self.groups))
+                        self.moments = combine_moments(self.moments, moments)
+                return self
+
+        def merge(self, other):
+                self.total = combine_moments(self.total, other.total)
+                if other.groups:
+                        codes = self._group_codes(list(other.groups))
+                        moments = np.zeros_like(self.moments)
+                        moments[:, codes] = other.moments
+                        self.moments = combine_moments(self.moments, moments)
+                return self
+
+        def finalize(self):
+                aggregated = {measure: value.item() for measure, value in regression_from_moments(self.total).items()}
+                if self.group_variable is None:
+                        return aggregated
+                fits = regression_from_moments(self.moments)
+                segregated = {
+                        label: {measure: values[self.groups[label]] for measure, values in fits.items()}
+                        for label in sorted(self.groups)
+                }
+                return {"segregated": segregated, "aggregated": aggregated}
+
+def accumulate(chunks, outcome_label = "cholesterol", explanatory_label = "exercise", group_variable = None):
+        accumulator = RegressionAccumulator(outcome_label, explanatory_label, group_variable)
+        for chunk in chunks:
+                accumulator.update(chunk)
+        return accumulator
 
+def _accumulate_csv(args):
+        path, chunksize, labels = args
+        columns = [label for label in labels if label is not None]
+        chunks = pd.read_csv(path, usecols = columns, chunksize = chunksize, dtype = {labels[2]: str} if labels[2] else None)
+        return accumulate(chunks, *labels)
 
+def streaming_regression_results(paths, outcome_label = "cholesterol", explanatory_label = "exercise", group_variable = None, chunksize = 100_000, max_workers = None):
+        from concurrent.futures import ProcessPoolExecutor
+        labels = (outcome_label, explanatory_label, group_variable)
+        tasks = [(path, chunksize, labels) for path in ([paths] if isinstance(paths, (str, bytes)) or hasattr(paths, "__fspath__") else paths)]
+        accumulator = RegressionAccumulator(*labels)
+        with ProcessPoolExecutor(max_workers = max_workers) as pool:
+                for partial in pool.map(_accumulate_csv, tasks):
+                        accumulator.merge(partial)
+        return accumulator.finalize()
@@ -0,0 +1,102 @@
+"""
+Ingesta por bloques del registro MINSA-IPRESS.
+
+Lee `ipress_hospitales.csv` en bloques con un esquema de tipos explícito,
+aplica en cada bloque los filtros del notebook 01 (clasificación hospitalaria,
+en funcionamiento, institución pública, coordenadas válidas dentro de Perú) y
+solo conserva las filas que pasan. La memoria pico depende de los hospitales
+retenidos y del tamaño de bloque, no del total de establecimientos.
+"""
+import pandas as pd
+
+CLASIFICACIONES_HOSPITAL = [
+    'HOSPITALES O CLINICAS DE ATENCION GENERAL',
+    'HOSPITALES O CLINICAS DE ATENCION ESPECIALIZADA'
+]
+INSTITUCIONES_PUBLICAS = ['GOBIERNO REGIONAL', 'MINSA', 'ESSALUD']
+CONDICIONES_VALIDAS = ['EN FUNCIONAMIENTO']
+
+# Límites geográficos de Perú
+LAT_PERU = (-18.5, 0)
+LON_PERU = (-81.5, -68)
+
+ENCODING = 'iso-8859-1'
+
+# Columnas de filtro: categorías cerradas, cualquier otro valor se lee como NaN
+FILTER_DTYPES = {
+    'Institución':   pd.CategoricalDtype(INSTITUCIONES_PUBLICAS),
+    'Clasificación': pd.CategoricalDtype(CLASIFICACIONES_HOSPITAL),
+    'Condición':     pd.CategoricalDtype(CONDICIONES_VALIDAS),
+}
+
+# Resto del esquema; las columnas no listadas se leen como texto
+NUMERIC_DTYPES = {
+    'Código Único':     'Int32',
+    'UBIGEO':           'Int32',
+    'Código DISA':      'Int32',
+    'Código Red':       'Int32',
+    'Código Microrred': 'Int32',
+    'Código UE':        'Int32',
+    'NORTE':            'float64',
+    'ESTE':             'float64',
+    'COTA':             'float64',
+    'CAMAS':            'float64',
+}
+
+# Texto repetitivo que se convierte a categórico al final (categorías comunes)
+CATEGORY_COLUMNS = [
+    'Tipo', 'Departamento', 'Provincia', 'Distrito', 'DISA', 'Red', 'Microrred',
+    'Unidad Ejecutora', 'Categoria', 'Tipo Doc.Categorización', 'Estado', 'Situación',
+    'Inspección',
+]
+
+IPRESS_DTYPES = {**FILTER_DTYPES, **NUMERIC_DTYPES}
+
+
+def filter_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Filtros del notebook 01 sobre un bloque. Corrige las etiquetas
+    intercambiadas (ESTE contiene latitud, NORTE longitud) sin copiar el bloque.
+    """
+    latitud, longitud = chunk['ESTE'], chunk['NORTE']
+    mask = (
+        chunk['Clasificación'].notna() &
+        chunk['Condición'].notna() &
+        chunk['Institución'].notna() &
+        latitud.notna() & longitud.notna() &
+        (latitud != 0) & (longitud != 0) &
+        latitud.between(*LAT_PERU) & longitud.between(*LON_PERU)
+    )
+    kept = chunk.loc[mask]
+    return kept.assign(latitud=kept['ESTE'], longitud=kept['NORTE'])
+
+
+def iter_hospital_chunks(path, chunksize=5000):
+    """Genera los bloques ya filtrados del CSV IPRESS."""
+    reader = pd.read_csv(
+        path, encoding=ENCODING, dtype=IPRESS_DTYPES, chunksize=chunksize,
+        keep_default_na=True, na_values=[''],
+    )
+    for chunk in reader:
+        kept = filter_chunk(chunk)
+        if len(kept):
+            yield kept
+
+
+def load_hospitals_from_ipress(path, chunksize=5000):
+    """GeoDataFrame de hospitales públicos operativos a partir del CSV IPRESS."""
+    import geopandas as gpd
+
+    partes = list(iter_hospital_chunks(path, chunksize=chunksize))
+    if partes:
+        df = pd.concat(partes, ignore_index=True)
+    else:
+        columnas = pd.read_csv(path, encoding=ENCODING, nrows=0).columns
+        df = pd.DataFrame(columns=list(columnas) + ['latitud', 'longitud'])
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    geometry = gpd.points_from_xy(df['longitud'], df['latitud'])
+    return gpd.GeoDataFrame(df, geometry=geometry, crs='EPSG:4326')
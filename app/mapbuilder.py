@@ -0,0 +1,180 @@
+"""
+Capas Folium emitidas en bloque.
+
+Los notebooks crean un `folium.Marker` o un `folium.GeoJson` por fila, de modo
+que el HTML repite el JavaScript de cada objeto y crece (y tarda) linealmente
+con el número de elementos. Aquí cada capa es una sola FeatureCollection con
+coordenadas redondeadas, simplificación opcional, estilo derivado de las
+propiedades y popups/tooltips por campos; los puntos masivos van en un
+FastMarkerCluster que construye los marcadores en el navegador.
+"""
+import html
+import json
+
+import numpy as np
+import pandas as pd
+
+# 5 decimales ~ 1 m en el ecuador, de sobra para mapas web
+COORD_PRECISION = 5
+
+
+def _properties(gdf, columns):
+    """Columnas a propiedades serializables (categorías y objetos a texto)."""
+    props = pd.DataFrame(index=gdf.index)
+    for col in columns:
+        serie = gdf[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype == object:
+            serie = serie.astype(object).where(serie.notna(), None).map(
+                lambda v: v if v is None else str(v))
+        elif pd.api.types.is_bool_dtype(serie.dtype):
+            serie = serie.astype(bool)
+        props[col] = serie
+    return props
+
+
+def feature_collection(gdf, columns=(), precision=COORD_PRECISION, simplify=None) -> dict:
+    """
+    FeatureCollection (dict) de un GeoDataFrame en EPSG:4326 con solo las
+    columnas pedidas. `simplify` es la tolerancia en grados (preserva topología).
+    """
+    import geopandas as gpd
+    import shapely
+
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs("EPSG:4326")
+    geoms = np.asarray(gdf.geometry.values, dtype=object)
+    if simplify:
+        geoms = shapely.simplify(geoms, simplify, preserve_topology=True)
+    if precision is not None:
+        geoms = shapely.transform(geoms, lambda xy: np.round(xy, precision))
+    capa = gpd.GeoDataFrame(_properties(gdf, columns), geometry=geoms, crs="EPSG:4326")
+    return capa.to_geo_dict(na="null", drop_id=True)
+
+
+def geojson_layer(gdf, name=None, style=None, color_column=None, color_map=None,
+                  popup_fields=None, popup_aliases=None, tooltip_fields=None,
+                  tooltip_aliases=None, tooltip=None, marker=None, precision=COORD_PRECISION,
+                  simplify=None, **kwargs):
+    """
+    Una capa `folium.GeoJson` para todo el GeoDataFrame.
+    `style` es el estilo base; si se da `color_column`, `color_map` asigna
+    color y relleno según el valor de esa propiedad. `tooltip` es un texto fijo
+    cuando no hay `tooltip_fields`. `marker` (Marker o CircleMarker) dibuja las
+    geometrías puntuales.
+    """
+    import folium
+
+    campos = list(dict.fromkeys(
+        ([color_column] if color_column else []) + list(popup_fields or []) + list(tooltip_fields or [])
+    ))
+    data = feature_collection(gdf, campos, precision=precision, simplify=simplify)
+    base = dict(style or {})
+
+    def style_function(feature):
+        if color_column is None:
+            return base
+        color = color_map.get(feature["properties"].get(color_column), base.get("color"))
+        return {**base, "color": color, "fillColor": color}
+
+    popup = folium.GeoJsonPopup(popup_fields, aliases=popup_aliases or popup_fields) if popup_fields else None
+    if tooltip_fields:
+        tooltip = folium.GeoJsonTooltip(tooltip_fields, aliases=tooltip_aliases or [""] * len(tooltip_fields))
+    return folium.GeoJson(
+        data, name=name, style_function=style_function, popup=popup, tooltip=tooltip,
+        marker=marker, **kwargs
+    )
+
+
+CLUSTER_CALLBACK = """
+function (row) {
+    var fields = %(labels)s;
+    var html = '<div style="width: 250px;"><h4 style="color: %(title_color)s;"><b>' + row[2] + '</b></h4><hr>';
+    for (var i = 0; i < fields.length; i++) {
+        html += '<p><b>' + fields[i] + ':</b> ' + row[i + 3] + '</p>';
+    }
+    html += '</div>';
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.setIcon(L.AwesomeMarkers.icon(%(icon)s));
+    marker.bindPopup(html, {maxWidth: 300});
+    marker.bindTooltip(row[2]);
+    return marker;
+}
+"""
+
+
+def cluster_layer(gdf, title_field, fields=(), labels=None, name=None,
+                  icon_color="red", icon="plus-sign", precision=COORD_PRECISION, **kwargs):
+    """
+    FastMarkerCluster de puntos: solo viaja una fila [lat, lon, título, campos...]
+    por punto y el popup se arma en el navegador.
+    """
+    from folium.plugins import FastMarkerCluster
+    from proximity import point_coords
+
+    lon, lat = point_coords(gdf)
+    columnas = [title_field] + list(fields)
+    textos = _properties(gdf, columnas).fillna("N/A").astype(str)
+    textos = textos.apply(lambda serie: serie.map(html.escape))
+    filas = [
+        [la, lo, *valores] for la, lo, valores in zip(
+            np.round(lat, precision).tolist(), np.round(lon, precision).tolist(),
+            textos.itertuples(index=False, name=None))
+    ]
+
+    callback = CLUSTER_CALLBACK % {
+        "labels": json.dumps([html.escape(str(e)) for e in (labels or fields)], ensure_ascii=False),
+        "title_color": "#E74C3C",
+        "icon": json.dumps({"icon": icon, "markerColor": icon_color, "prefix": "fa"}),
+    }
+    return FastMarkerCluster(filas, callback=callback, name=name, **kwargs)
+
+
+def grid_features(tabla, columns=(), precision=COORD_PRECISION) -> dict:
+    """
+    FeatureCollection de rectángulos a partir de una tabla de teselas con
+    límites oeste/sur/este/norte (p. ej. `GridPyramid.table`), sin shapely.
+    """
+    o, s, e, n = (np.round(tabla[c].to_numpy(dtype=float), precision).tolist()
+                  for c in ("oeste", "sur", "este", "norte"))
+    props = _properties(tabla, columns).astype(object)
+    props = props.where(props.notna(), None).to_dict("records")
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "properties": p,
+             "geometry": {"type": "Polygon", "coordinates": [[[w, so], [ea, so], [ea, no], [w, no], [w, so]]]}}
+            for w, so, ea, no, p in zip(o, s, e, n, props)
+        ],
+    }
+
+
+def grid_layer(tabla, value_column, name=None, colors=("#ffffb2", "#fd8d3c", "#bd0026"), caption=None,
+               tooltip_fields=None, tooltip_aliases=None, fill_opacity=0.6, precision=COORD_PRECISION,
+               vmin=None, vmax=None, **kwargs):
+    """
+    Capa `folium.GeoJson` de teselas coloreadas por `value_column` con una
+    escala lineal; devuelve (capa, escala) para añadir la leyenda al mapa.
+    `vmin`/`vmax` fijan la escala (p. ej. común a varios niveles de zoom);
+    por defecto es el rango de la tabla.
+    """
+    import branca.colormap as cm
+    import folium
+
+    valores = tabla[value_column].astype(float)
+    finitos = valores[np.isfinite(valores)]
+    rango = (float(finitos.min()), float(finitos.max())) if len(finitos) else (0.0, 1.0)
+    vmin = rango[0] if vmin is None else vmin
+    vmax = rango[1] if vmax is None else vmax
+    escala = cm.LinearColormap(list(colors), vmin=vmin, vmax=max(vmax, vmin + 1e-9), caption=caption or value_column)
+    campos = list(dict.fromkeys([value_column] + list(tooltip_fields or [])))
+    data = grid_features(tabla, campos, precision=precision)
+
+    def style_function(feature):
+        valor = feature["properties"].get(value_column)
+        color = "lightgray" if valor is None or not np.isfinite(valor) else escala(valor)
+        return {"color": color, "fillColor": color, "weight": 0, "fillOpacity": fill_opacity}
+
+    tooltip = None
+    if tooltip_fields:
+        tooltip = folium.GeoJsonTooltip(tooltip_fields, aliases=tooltip_aliases or tooltip_fields)
+    return folium.GeoJson(data, name=name, style_function=style_function, tooltip=tooltip, **kwargs), escala
@@ -0,0 +1,145 @@
+"""
+Ubicación de nuevos hospitales por cobertura máxima (maximal covering location).
+
+Dado un conjunto de sitios candidatos (centros poblados CCPP o centroides
+distritales) y de puntos de demanda, `coverage_matrix` construye la matriz
+dispersa candidato × demanda de pares a <= radio con el KD-tree geocéntrico de
+proximity.py, sin materializar nunca la matriz densa N×M. `lazy_greedy`
+resuelve el problema de k sitios: mantiene la ganancia marginal exacta de
+cada candidato restando, al elegir un sitio, solo la demanda recién cubierta
+(vía la matriz transpuesta), y un heap con evaluación perezosa evita revisar
+candidatos cuya ganancia ya no puede superar a la del mejor.
+"""
+import heapq
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+from proximity import HospitalIndex, arc_to_chord, lonlat_to_xyz, point_coords
+
+
+def coverage_matrix(cand_lon, cand_lat, dem_lon=None, dem_lat=None, radius_km=10) -> sparse.csr_matrix:
+    """
+    Matriz dispersa (candidatos × demanda) con 1 donde la demanda queda a <= radius_km.
+    Sin `dem_lon`/`dem_lat` los candidatos son la propia demanda (matriz cuadrada).
+    """
+    radio = float(arc_to_chord(radius_km * 1000))
+    candidatos = cKDTree(lonlat_to_xyz(cand_lon, cand_lat))
+    if dem_lon is None:
+        # Mismo conjunto: query_pairs recorre cada par una vez y es mucho más rápido
+        pares = candidatos.query_pairs(radio, output_type="ndarray")
+        propios = np.arange(candidatos.n)
+        filas = np.concatenate([pares[:, 0], pares[:, 1], propios])
+        columnas = np.concatenate([pares[:, 1], pares[:, 0], propios])
+        n_dem = candidatos.n
+    else:
+        demanda = cKDTree(lonlat_to_xyz(dem_lon, dem_lat))
+        pares = candidatos.sparse_distance_matrix(demanda, max_distance=radio, output_type="ndarray")
+        filas, columnas = pares["i"], pares["j"]
+        n_dem = demanda.n
+    # Cada par aparece una sola vez: no hace falta sumar duplicados
+    return sparse.coo_matrix(
+        (np.ones(len(filas), dtype=np.float32), (filas, columnas)), shape=(candidatos.n, n_dem)
+    ).tocsr()
+
+
+def lazy_greedy(matriz, k, weights=None):
+    """
+    k sitios que cubren más demanda (ponderada). Devuelve un DataFrame con
+    rango, candidato, ganancia marginal y acumulado en el orden de selección;
+    termina antes si ningún candidato añade cobertura.
+    """
+    matriz = sparse.csr_matrix(matriz)
+    n_cand, n_dem = matriz.shape
+    w = np.ones(n_dem) if weights is None else np.asarray(weights, dtype=float)
+    transpuesta = matriz.T.tocsr()
+    cubierta = w <= 0
+    ganancia = matriz @ np.where(cubierta, 0.0, w)
+
+    heap = [(-g, c) for c, g in enumerate(ganancia) if g > 0]
+    heapq.heapify(heap)
+    filas = []
+    acumulado = 0.0
+    evaluaciones = 0
+    while heap and len(filas) < k:
+        negativo, c = heapq.heappop(heap)
+        evaluaciones += 1
+        if ganancia[c] <= 0:
+            continue
+        if ganancia[c] < -negativo:
+            # Ganancia desactualizada: vuelve al heap con su valor actual
+            heapq.heappush(heap, (-ganancia[c], c))
+            continue
+        demanda = matriz.indices[matriz.indptr[c]:matriz.indptr[c + 1]]
+        nuevas = demanda[~cubierta[demanda]]
+        cubierta[nuevas] = True
+        # Solo los candidatos que cubrían la demanda recién cubierta pierden ganancia
+        vecinos = transpuesta[nuevas]
+        ganancia -= np.bincount(vecinos.indices, weights=np.repeat(w[nuevas], np.diff(vecinos.indptr)),
+                                minlength=n_cand)
+        ganancia[c] = 0.0
+        acumulado += w[nuevas].sum()
+        filas.append({
+            "rango": len(filas) + 1,
+            "candidato": int(c),
+            "ganancia": float(w[nuevas].sum()),
+            "acumulado": float(acumulado),
+            "evaluaciones": evaluaciones,
+        })
+    return pd.DataFrame(filas, columns=["rango", "candidato", "ganancia", "acumulado", "evaluaciones"])
+
+
+def district_candidates(distritos, columns=("IDDIST", "DEPARTAMEN", "PROVINCIA", "DISTRITO")):
+    """Un candidato por distrito en un punto interior (representative_point)."""
+    if distritos.crs is not None and distritos.crs.to_epsg() != 4326:
+        distritos = distritos.to_crs("EPSG:4326")
+    distritos = distritos[~(distritos.geometry.isna() | distritos.geometry.is_empty)]
+    columnas = [c for c in columns if c in distritos.columns]
+    return distritos[columnas].set_geometry(distritos.geometry.representative_point())
+
+
+def maximal_coverage(hospitales, centros, k=20, radius_km=10, candidatos=None, exclude_covered=True,
+                     weights=None):
+    """
+    Sitios sugeridos para k hospitales nuevos.
+    `candidatos` es un GeoDataFrame de puntos (por defecto los propios centros
+    poblados). Con `exclude_covered` la demanda ya cubierta por los hospitales
+    existentes no cuenta, de modo que la ganancia es cobertura nueva.
+    Devuelve (tabla ordenada con coordenadas y atributos del candidato, resumen).
+    """
+    propios = candidatos is None
+    candidatos = centros if propios else candidatos
+    c_lon, c_lat = point_coords(candidatos)
+    d_lon, d_lat = point_coords(centros)
+    w = np.ones(len(centros)) if weights is None else np.asarray(weights, dtype=float)
+
+    ya_cubiertos = np.zeros(len(centros), dtype=bool)
+    if exclude_covered and len(hospitales):
+        ya_cubiertos = HospitalIndex.from_geodataframe(hospitales).count_within(d_lon, d_lat, radius_km) > 0
+    # Solo la demanda que aún puede ganarse entra en la matriz
+    pendiente = ~ya_cubiertos & (w > 0)
+    if propios:
+        matriz = coverage_matrix(c_lon, c_lat, radius_km=radius_km)[:, pendiente]
+    else:
+        matriz = coverage_matrix(c_lon, c_lat, d_lon[pendiente], d_lat[pendiente], radius_km=radius_km)
+    seleccion = lazy_greedy(matriz, k, w[pendiente])
+
+    atributos = candidatos.drop(columns=candidatos.geometry.name).iloc[seleccion["candidato"]].reset_index(drop=True)
+    tabla = pd.concat([seleccion, atributos], axis=1)
+    tabla.insert(2, "longitud", c_lon[seleccion["candidato"]])
+    tabla.insert(3, "latitud", c_lat[seleccion["candidato"]])
+    base = float(w[ya_cubiertos].sum())
+    total = float(w.sum())
+    tabla["porcentaje_cubierto"] = (base + tabla["acumulado"]) / total * 100 if total else 0.0
+    resumen = {
+        "candidatos": len(c_lon),
+        "demanda": len(d_lon),
+        "pares_en_radio": int(matriz.nnz),
+        "cubierta_inicial": base,
+        "porcentaje_inicial": base / total * 100 if total else 0.0,
+        "cobertura_nueva": float(tabla["ganancia"].sum()),
+        "evaluaciones": int(tabla["evaluaciones"].iloc[-1]) if len(tabla) else 0,
+    }
+    return tabla, resumen
@@ -0,0 +1,307 @@
+"""
+Ejecutor incremental del pipeline (reemplaza la cadena nbconvert del Makefile).
+
+Cada etapa declara sus archivos de entrada y de salida en /data. Su firma es
+el hash del contenido de las entradas más el hash del código de la función (y
+de las funciones auxiliares del mismo módulo que usa); si coincide con la de
+la última ejecución y las salidas existen, la etapa se salta. Las etapas cuyas
+dependencias ya terminaron se ejecutan en paralelo en procesos separados.
+
+Uso:
+    python app/pipeline.py                 # ejecuta lo que haya cambiado
+    python app/pipeline.py --force         # re-ejecuta todo
+    python app/pipeline.py --only mapas_interactivos
+    python app/pipeline.py --list
+    python app/pipeline.py --profile traza.json   # traza Chrome de las etapas
+"""
+import argparse
+import ast
+import hashlib
+import inspect
+import json
+import sys
+import time
+import types
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+import datastore
+import profiling
+import stages
+
+DATA_DIR   = datastore.DATA_DIR
+STATE_PATH = datastore.CACHE_DIR / "pipeline_state.json"
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    func: types.FunctionType
+    inputs: tuple
+    outputs: tuple
+    # Entradas que la etapa usa solo si existen (p. ej. capas aportadas por el usuario)
+    optional: tuple = ()
+
+    def input_paths(self):
+        return [DATA_DIR / p for p in self.inputs]
+
+    def optional_paths(self):
+        return [DATA_DIR / p for p in self.optional]
+
+    def output_paths(self):
+        return [DATA_DIR / p for p in self.outputs]
+
+
+STAGES = [
+    Stage("procesar_ipress", stages.procesar_ipress,
+          inputs=("ipress_hospitales.csv",),
+          outputs=("hospitales_procesados.geojson",)),
+    Stage("conteo_distritos", stages.conteo_distritos,
+          inputs=("hospitales_procesados.geojson", "DISTRITOS.shp"),
+          outputs=("distritos_con_hospitales.geojson", "estadisticas_departamentales.csv")),
+    Stage("mapas_estaticos", stages.mapas_estaticos,
+          inputs=("hospitales_procesados.geojson", "distritos_con_hospitales.geojson"),
+          outputs=("mapas_estaticos_completos.png",) + tuple(a for _, a in stages.MAPAS_ESTATICOS)
+                  + tuple(stages.archivo_atlas(x) for x in stages.DEPARTAMENTOS)),
+    Stage("proximidad", stages.proximidad,
+          inputs=("hospitales_procesados.geojson",),
+          outputs=tuple(f"{tipo}_{r}_{sufijo}" for r in stages.REGIONES_PROXIMIDAD
+                        for tipo, sufijo in (("buffers", "10km.geojson"), ("centros_poblados", "acceso.geojson")))),
+    Stage("cobertura", stages.cobertura,
+          inputs=("hospitales_procesados.geojson", "CCPP_IGN100K.shp", "DISTRITOS.shp",
+                  "estadisticas_departamentales.csv"),
+          outputs=("cobertura_departamental.csv", "cobertura_departamental.geojson")),
+    Stage("ubicacion_optima", stages.ubicacion_optima,
+          inputs=("hospitales_procesados.geojson", "CCPP_IGN100K.shp", "DISTRITOS.shp"),
+          outputs=("sitios_optimos.csv",)),
+    Stage("costo_acceso", stages.costo_acceso,
+          inputs=("hospitales_procesados.geojson", "CCPP_IGN100K.shp", "DISTRITOS.shp"),
+          outputs=tuple(f"{tipo}_{r}.{ext}" for r in stages.REGIONES_COSTO
+                        for tipo, ext in (("costo_acceso", "npz"), ("centros_costo", "csv"))),
+          optional=tuple(f"{capa}_{r}.geojson" for r in stages.REGIONES_COSTO for capa in stages.CAPAS_COSTO)),
+    Stage("grilla_nacional", stages.grilla_nacional,
+          inputs=("hospitales_procesados.geojson", "CCPP_IGN100K.shp"),
+          outputs=("grilla_nacional.npz",)),
+    Stage("mapas_interactivos", stages.mapas_interactivos,
+          inputs=("hospitales_procesados.geojson", "distritos_con_hospitales.geojson", "grilla_nacional.npz")
+                 + tuple(f"buffers_{r}_10km.geojson" for r in stages.REGIONES_PROXIMIDAD)
+                 + tuple(f"centros_poblados_{r}_acceso.geojson" for r in stages.REGIONES_PROXIMIDAD),
+          outputs=("mapa_nacional_hospitales.html",)
+                  + tuple(f"mapa_{r}_proximidad.html" for r in stages.REGIONES_PROXIMIDAD)),
+]
+
+
+def dependencies(stage, stages_list=STAGES):
+    """Etapas que producen alguna de las entradas de `stage`."""
+    return {s.name for s in stages_list if s is not stage and set(s.outputs) & set(stage.inputs)}
+
+
+def app_imports(path: Path) -> list:
+    """Módulos propios de app/ que importa un archivo, en cualquier nivel (también dentro de funciones)."""
+    nombres = set()
+    for nodo in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+        if isinstance(nodo, ast.Import):
+            nombres.update(alias.name.split(".")[0] for alias in nodo.names)
+        elif isinstance(nodo, ast.ImportFrom) and nodo.module and nodo.level == 0:
+            nombres.add(nodo.module.split(".")[0])
+    return sorted(n for n in nombres if (APP_DIR / f"{n}.py").exists())
+
+
+def code_hash(func) -> str:
+    """
+    Hash del código de `func`, de las funciones y constantes del mismo módulo
+    que referencia y de los módulos propios de app/ que importa o cuyos
+    agregados de datastore.DERIVED carga por nombre, junto con los módulos de
+    app/ que estos importan a su vez (recursivamente).
+    """
+    module = inspect.getmodule(func)
+    seen, pending, digest = set(), [func], hashlib.sha256()
+    modules = []
+    while pending:
+        fn = pending.pop()
+        if fn.__name__ in seen:
+            continue
+        seen.add(fn.__name__)
+        digest.update(inspect.getsource(fn).encode())
+        for name in fn.__code__.co_names:
+            ref = getattr(module, name, None)
+            if isinstance(ref, types.FunctionType) and ref.__module__ == module.__name__:
+                pending.append(ref)
+            elif name.isupper() and ref is not None and not callable(ref):
+                # Constantes del módulo (listas de archivos, filtros...)
+                digest.update(repr(ref).encode())
+            elif (APP_DIR / f"{name}.py").exists():
+                modules.append(name)
+        for const in fn.__code__.co_consts:
+            # Agregados de datastore cargados por nombre: cuenta el módulo que los construye
+            if isinstance(const, str) and const in datastore.DERIVED:
+                modules.append(datastore.DERIVED[const][1].split(":")[0])
+
+    hashed = {module.__name__}
+    while modules:
+        name = modules.pop()
+        if name in hashed:
+            continue
+        hashed.add(name)
+        path = APP_DIR / f"{name}.py"
+        digest.update(name.encode())
+        digest.update(path.read_bytes())
+        modules.extend(reversed(app_imports(path)))
+    return digest.hexdigest()
+
+
+class InputHashes:
+    """Hashes de archivos reutilizados mientras mtime y tamaño no cambien."""
+
+    def __init__(self, known=None):
+        self.known = dict(known or {})
+
+    def __call__(self, path: Path) -> str:
+        stat = datastore.source_stat(path)
+        entry = self.known.get(path.name)
+        if entry and entry["mtime_ns"] == stat["mtime_ns"] and entry["size"] == stat["size"]:
+            return entry["sha256"]
+        sha = datastore.source_hash(path)
+        self.known[path.name] = {**stat, "sha256": sha}
+        return sha
+
+
+def signature(stage, hashes) -> str:
+    digest = hashlib.sha256(code_hash(stage.func).encode())
+    for path in stage.input_paths():
+        digest.update(path.name.encode())
+        digest.update(hashes(path).encode())
+    for path in stage.optional_paths():
+        # Que aparezca o desaparezca una entrada opcional también cambia la firma
+        digest.update(path.name.encode())
+        digest.update((hashes(path) if path.exists() else "-").encode())
+    return digest.hexdigest()
+
+
+def load_state():
+    try:
+        return json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"stages": {}, "files": {}}
+
+
+def save_state(state):
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    STATE_PATH.write_text(json.dumps(state, indent=1, ensure_ascii=False), encoding="utf-8")
+
+
+def _run_stage(name, profile=False):
+    """Punto de entrada en el proceso hijo; devuelve también sus eventos de perfilado."""
+    stage = next(s for s in STAGES if s.name == name)
+    if profile:
+        profiling.enable()
+    profiling.clear()
+    inicio = time.perf_counter()
+    with profiling.span(name, category="pipeline"):
+        resumen = stage.func()
+    return resumen, time.perf_counter() - inicio, profiling.drain()
+
+
+def run(only=None, force=False, jobs=None, log=print, profile=False):
+    """
+    Ejecuta el pipeline y devuelve ({etapa: estado}, etapas fallidas).
+    `only` restringe a esas etapas (sin arrastrar dependencias). Una etapa sin
+    entradas ni salidas previas falla sin detener a las que no dependen de ella.
+    Con `profile` los eventos de cada etapa se acumulan en `profiling`.
+    """
+    seleccion = [s for s in STAGES if only is None or s.name in only]
+    state = load_state()
+    hashes = InputHashes(state.get("files"))
+    estados, fallidas = {}, set()
+    pendientes = {s.name: s for s in seleccion}
+    en_curso = {}
+
+    def lista(stage):
+        return not dependencies(stage) & (set(pendientes) | set(en_curso.values()))
+
+    def evaluar(stage):
+        """None si hay que ejecutarla; si no, (estado, falló)."""
+        bloqueo = dependencies(stage) & fallidas
+        if bloqueo:
+            return f"bloqueada por {', '.join(sorted(bloqueo))}", True
+        faltantes = [p.name for p in stage.input_paths() if not p.exists()]
+        if faltantes:
+            if all(p.exists() for p in stage.output_paths()):
+                return f"sin fuente ({', '.join(faltantes)}); se conservan salidas", False
+            return f"error: faltan entradas {', '.join(faltantes)}", True
+        firma = signature(stage, hashes)
+        previo = state["stages"].get(stage.name, {})
+        if not force and previo.get("signature") == firma and all(p.exists() for p in stage.output_paths()):
+            return "al día", False
+        return None
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pendientes or en_curso:
+            for stage in [s for s in pendientes.values() if lista(s)]:
+                del pendientes[stage.name]
+                decision = evaluar(stage)
+                if decision is not None:
+                    estados[stage.name], fallo = decision
+                    if fallo:
+                        fallidas.add(stage.name)
+                    log(f"{'❌' if fallo else '⏭️ '} {stage.name}: {estados[stage.name]}")
+                    continue
+                log(f"▶️  {stage.name}...")
+                en_curso[pool.submit(_run_stage, stage.name, profile)] = stage.name
+
+            if not en_curso:
+                continue
+
+            hechos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                name = en_curso.pop(futuro)
+                stage = next(s for s in STAGES if s.name == name)
+                try:
+                    resumen, segundos, eventos = futuro.result()
+                except Exception as e:
+                    fallidas.add(name)
+                    estados[name] = f"error: {e!r}"
+                    log(f"❌ {name}: {e!r}")
+                    continue
+                profiling.extend(eventos)
+                # La firma se calcula sobre las entradas tal como se usaron
+                state["stages"][name] = {
+                    "signature": signature(stage, hashes),
+                    "seconds": round(segundos, 3),
+                    "summary": resumen,
+                }
+                state["files"] = hashes.known
+                save_state(state)
+                estados[name] = f"ejecutada en {segundos:.1f}s"
+                log(f"✅ {name}: {resumen} ({segundos:.1f}s)")
+    return estados, fallidas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline incremental Hospitals Access Peru")
+    parser.add_argument("--only", nargs="+", metavar="ETAPA", help="ejecutar solo estas etapas")
+    parser.add_argument("--force", action="store_true", help="ignorar firmas y re-ejecutar")
+    parser.add_argument("--jobs", type=int, default=None, help="procesos en paralelo")
+    parser.add_argument("--list", action="store_true", help="listar etapas y dependencias")
+    parser.add_argument("--profile", metavar="TRAZA.json", help="perfilar las etapas y exportar traza Chrome")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for stage in STAGES:
+            deps = ", ".join(sorted(dependencies(stage))) or "-"
+            print(f"{stage.name:20s} depende de: {deps}")
+        return
+    _, fallidas = run(only=args.only, force=args.force, jobs=args.jobs, profile=bool(args.profile))
+    if args.profile:
+        profiling.export_trace(args.profile)
+        print(profiling.summary().to_string(index=False))
+    sys.exit(1 if fallidas else 0)
+
+
+if __name__ == "__main__":
+    main()
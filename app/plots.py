@@ -1,43 +1,128 @@
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
 
+
+# Above this many points traces are drawn with WebGL instead of SVG
+WEBGL_THRESHOLD = 5_000
+# Points actually sent to the browser per figure
+MAX_POINTS = 20_000
+
+def render_mode(n):
+        return "webgl" if n > WEBGL_THRESHOLD else "svg"
+
+def scatter_trace(x, y, webgl = None, **kwargs):
+        if webgl is None:
+                webgl = render_mode(len(x)) == "webgl"
+        trace = go.Scattergl if webgl else go.Scatter
+        return trace(x = x, y = y, **kwargs)
+
+def decimate(x, y, max_points = MAX_POINTS, grid = 100, seed = 0):
+        # Stratified sample on a grid x grid lattice: each occupied cell keeps a share
+        # proportional to its count (at least one point), so dense areas stay dense
+        # and isolated points are not lost. Returns sorted row positions.
+        x = np.asarray(x, dtype = float)
+        y = np.asarray(y, dtype = float)
+        n = len(x)
+        if n <= max_points:
+                return np.arange(n)
+        def bin_index(values):
+                low, high = np.nanmin(values), np.nanmax(values)
+                scaled = (values - low) / ((high - low) or 1.0) * grid
+                return np.clip(np.nan_to_num(scaled), 0, grid - 1).astype(np.int64)
+        rng = np.random.default_rng(seed)
+        cell = bin_index(x) * grid + bin_index(y)
+        order = np.lexsort((rng.random(n), cell))
+        cells, first, counts = np.unique(cell[order], return_index = True, return_counts = True)
+        quota = np.repeat(np.maximum(1, np.floor(counts * max_points / n)).astype(np.int64), counts)
+        rank = np.arange(n) - np.repeat(first, counts)
+        keep = np.flatnonzero(rank < quota)
+        if len(keep) > max_points:
+                # The one-point minimum per cell can overshoot: trim every cell's tail in
+                # proportion to its quota (first points of each cell go last, ties at random)
+                share = rank[keep] / quota[keep]
+                keep = keep[np.lexsort((rng.random(len(keep)), share))[:max_points]]
+        return np.sort(order[keep])
+
+def histogram_figure(values, nbins = 20, title = None, x_label = None, color = None):
+        # Bins are computed here; the browser only receives nbins bars
+        values = np.asarray(values, dtype = float)
+        counts, edges = np.histogram(values[np.isfinite(values)], bins = nbins)
+        fig = go.Figure(go.Bar(
+                x = (edges[:-1] + edges[1:]) / 2,
+                y = counts,
+                width = np.diff(edges),
+                marker_color = color
+        ))
+        fig.update_layout(title = title, bargap = 0, xaxis_title = x_label, yaxis_title = "Count")
+        return fig
+
+def line_endpoints(x, fit):
+        # A fitted line only needs its two endpoints
+        x = np.asarray(x, dtype = float)
+        fit = np.asarray(fit, dtype = float)
+        if len(x) == 0:
+                return x, fit
+        ends = [np.argmin(x), np.argmax(x)]
+        return x[ends], fit[ends]
+
 def get_figure(plot_data, segregated, fit_line):
         fig = go.Figure(layout = go.Layout(width=900))
         fig.update_xaxes(title_text = "Exercise")
         fig.update_yaxes(title_text = "Cholesterol")
         if not segregated:
-                fig.add_trace(go.Scatter(
-                        x = plot_data.exercise,
-                        y = plot_data.cholesterol,
+                sample = plot_data.iloc[decimate(plot_data.exercise, plot_data.cholesterol)]
+                fig.add_trace(scatter_trace(
+                        sample.exercise,
+                        sample.cholesterol,
                         mode = "markers",
                         showlegend = False,
                         marker_color = "black"
                 ))
                 if fit_line:
+                        x, y = line_endpoints(plot_data.exercise, plot_data.aggregated_fit)
                         fig.add_trace(go.Scatter(
-                                x = plot_data.exercise,
-                                y = plot_data.aggregated_fit,
+                                x = x,
+                                y = y,
+                                mode = "lines",
                                 showlegend = False,
                                 marker_color = "red"
                         ))
                         return fig
                 return fig
+        # Decimate once over all groups so each group keeps its share of the points
+        sample = plot_data.iloc[decimate(plot_data.exercise, plot_data.cholesterol)]
+        sampled_groups = dict(list(sample.groupby("age_groups")))
+        webgl = render_mode(len(sample)) == "webgl"
         for age, group in plot_data.groupby("age_groups"):
-                fig.add_trace(go.Scatter(
-                        x = group.exercise,
-                        y = group.cholesterol,
+                points = sampled_groups.get(age, group.iloc[:0])
+                fig.add_trace(scatter_trace(
+                        points.exercise,
+                        points.cholesterol,
                         mode = "markers",
-                        name = age
+                        name = age,
+                        webgl = webgl
                 ))
                 if fit_line:
+                        x, y = line_endpoints(group.exercise, group.disaggregated_fit)
                         fig.add_trace(go.Scatter(
-                                x = group.exercise,
-                                y = group.disaggregated_fit,
+                                x = x,
+                                y = y,
+                                mode = "lines",
                                 showlegend = False,
                                 marker_color = "red"
                         ))
         return fig
 
+def add_resampling_columns(results_table, measures):
+        # Only present when the regressions were run with resampling
+        if not measures or "ci_low" not in measures[0]:
+                return results_table
+        confidence = measures[0].get("confidence", 0.95)
+        results_table[f"{confidence * 100:g}% CI"] = [f"[{m['ci_low']:.3f}, {m['ci_high']:.3f}]" for m in measures]
+        results_table["Permutation p"] = [m["permutation_p_value"] for m in measures]
+        return results_table
+
 def get_table(results: dict[str, dict], segregated):
         if not segregated:
                 results = results["aggregated"]
@@ -48,7 +133,7 @@ def get_table(results: dict[str, dict], segregated):
                         "Estimate": [beta],
                         "Pr(>|t|)": [p_value]
                 })
-                return results_table
+                return add_resampling_columns(results_table, [results])
         age_group = []
         beta = []
         p_value = []
@@ -62,4 +147,4 @@ def get_table(results: dict[str, dict], segregated):
                 "Estimate": beta,
                 "Pr(>|t|)": p_value
         })
-        return results_table
\ No newline at end of file
+        return add_resampling_columns(results_table, list(results.values()))
\ No newline at end of file
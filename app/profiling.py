@@ -0,0 +1,318 @@
+"""
+Instrumentación ligera de etapas del dashboard y del pipeline.
+
+`span(nombre)` (context manager) y `profiled` (decorador) registran tiempo de
+pared, memoria pico (tracemalloc, anidable) y filas procesadas de cada tramo;
+`rerun()` agrupa los tramos de una recarga de Streamlit. Desactivado (por
+defecto) cada hook se reduce a comprobar un booleano y devolver un objeto
+nulo compartido. Se activa para todo el proceso con `enable()` o la variable
+de entorno HOSPITALS_PROFILE=1 (pipeline), o solo para una recarga con
+`rerun(events=buffer)`: el hilo de esa recarga registra en su propio buffer
+(p. ej. guardado en la sesión de Streamlit) y tracemalloc corre únicamente
+mientras haya alguna recarga así en curso. Como tracemalloc es global al
+proceso, si dos recargas medidas se solapan sus tramos quedan sin memoria
+pico (peak_mb None) y el resto de sesiones paga su coste mientras dure.
+Los eventos se pueden ver como
+tabla (`records`, `summary`) o exportar en formato Chrome Trace
+(chrome://tracing, Perfetto).
+"""
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+ENV_VAR = "HOSPITALS_PROFILE"
+MAX_EVENTS = 20_000
+
+_enabled = os.environ.get(ENV_VAR, "") not in ("", "0")
+_events = deque(maxlen=MAX_EVENTS)
+_local = threading.local()
+_run_ids = itertools.count(1)
+# Recargas con buffer propio que miden memoria; tracemalloc se para al terminar la última
+_tracing_lock = threading.Lock()
+_tracing_runs = 0
+_tracing_owned = False
+# Cuántas veces ha empezado una recarga medida con otra ya en curso. tracemalloc es
+# global al proceso: con dos a la vez ningún pico es atribuible a una sola
+_tracing_overlaps = 0
+
+
+def enabled() -> bool:
+    """Si el hilo actual registra tramos (globalmente o dentro de una recarga con buffer)."""
+    return _enabled or getattr(_local, "events", None) is not None
+
+
+def new_buffer():
+    """Buffer de eventos para una sesión (se pasa a `rerun(events=...)`)."""
+    return deque(maxlen=MAX_EVENTS)
+
+
+def enable(memory=True):
+    """Activa el registro; con `memory` también la medición de memoria pico."""
+    global _enabled
+    _enabled = True
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Apaga el registro global; tracemalloc sigue si alguna recarga con buffer lo usa."""
+    global _enabled
+    _enabled = False
+    with _tracing_lock:
+        if _tracing_runs == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def _acquire_tracing():
+    global _tracing_runs, _tracing_owned, _tracing_overlaps
+    with _tracing_lock:
+        if _tracing_runs == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        elif _tracing_runs > 0:
+            _tracing_overlaps += 1
+        _tracing_runs += 1
+
+
+def _memory_exclusive():
+    """Si el pico de tracemalloc es atribuible a este hilo (como mucho una recarga medida)."""
+    return tracemalloc.is_tracing() and _tracing_runs <= 1
+
+
+def _release_tracing():
+    global _tracing_runs, _tracing_owned
+    with _tracing_lock:
+        _tracing_runs -= 1
+        if _tracing_runs == 0 and _tracing_owned:
+            _tracing_owned = False
+            if not _enabled and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+
+class _NullSpan:
+    """Tramo inactivo: acepta la misma interfaz sin registrar nada."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class Span:
+    """Tramo activo. Asignar `rows` dentro del bloque registra las filas procesadas."""
+
+    def __init__(self, name, category, rows=None):
+        self.name = name
+        self.category = category
+        self.rows = rows
+
+    def __enter__(self):
+        stack = _stack()
+        # Con otra recarga medida en curso no se toca el pico compartido (reset_peak)
+        self.memory = _memory_exclusive()
+        self.overlaps = _tracing_overlaps
+        self.start_bytes = self.peak_seen = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak_seen = max(stack[-1].peak_seen, peak)
+            tracemalloc.reset_peak()
+            self.start_bytes = self.peak_seen = current
+        stack.append(self)
+        # Reloj de pared para alinear procesos en la traza; duración con perf_counter
+        self.wall_ns = time.time_ns()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end_ns = time.perf_counter_ns()
+        stack = _stack()
+        stack.pop()
+        peak_mb = None
+        if self.memory and _memory_exclusive() and _tracing_overlaps == self.overlaps:
+            _, peak = tracemalloc.get_traced_memory()
+            self.peak_seen = max(self.peak_seen, peak)
+            peak_mb = (self.peak_seen - self.start_bytes) / 2**20
+            if stack:
+                # El pico interno también cuenta para el tramo que lo contiene
+                stack[-1].peak_seen = max(stack[-1].peak_seen, self.peak_seen)
+            tracemalloc.reset_peak()
+        buffer = getattr(_local, "events", None)
+        (_events if buffer is None else buffer).append({
+            "name": self.name,
+            "category": self.category,
+            "run": getattr(_local, "run", None),
+            "depth": len(stack),
+            "start_ms": self.wall_ns / 1e6,
+            "duration_ms": (end_ns - self.start_ns) / 1e6,
+            "peak_mb": peak_mb,
+            "rows": self.rows,
+            "error": None if exc_type is None else exc_type.__name__,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        })
+        return False
+
+
+def span(name, category="app", rows=None):
+    """Context manager que mide un tramo (objeto nulo si el perfilado está apagado)."""
+    if not enabled():
+        return NULL_SPAN
+    return Span(name, category, rows)
+
+
+def profiled(name=None, category="app", rows=None):
+    """
+    Decorador equivalente a `span`. `rows` puede ser una función que recibe el
+    resultado y devuelve el número de filas (p. ej. `rows=len`).
+    """
+    def decorator(func):
+        etiqueta = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+            with Span(etiqueta, category) as tramo:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    try:
+                        tramo.rows = rows(result)
+                    except Exception:
+                        pass
+                return result
+        return wrapper
+    return decorator
+
+
+class rerun:
+    """
+    Agrupa los tramos de una ejecución completa del script (una recarga de
+    Streamlit). Con `events` (ver `new_buffer`) la recarga se registra aunque el
+    perfilado global esté apagado, solo en ese buffer y midiendo memoria.
+    """
+
+    def __init__(self, name="rerun", events=None):
+        self.name = name
+        self.events = events
+        self.span = NULL_SPAN
+
+    def __enter__(self):
+        if self.events is not None:
+            _local.events = self.events
+            _acquire_tracing()
+        if enabled():
+            _local.run = next(_run_ids)
+            self.span = Span(self.name, "rerun").__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        if self.span is not NULL_SPAN:
+            self.span.__exit__(*exc)
+            _local.run = None
+        if self.events is not None:
+            _local.events = None
+            _release_tracing()
+        return False
+
+
+def events():
+    """Copia de los eventos registrados (más antiguos primero)."""
+    return list(_events)
+
+
+def extend(nuevos):
+    """Incorpora eventos registrados en otro proceso (p. ej. workers del pipeline)."""
+    _events.extend(nuevos)
+
+
+def drain():
+    """Devuelve y borra los eventos registrados."""
+    registrados = list(_events)
+    _events.clear()
+    return registrados
+
+
+def clear():
+    _events.clear()
+
+
+def last_run(eventos=None):
+    """Identificador de la última recarga registrada (o None)."""
+    eventos = _events if eventos is None else eventos
+    runs = [e["run"] for e in eventos if e["run"] is not None]
+    return max(runs) if runs else None
+
+
+def records(run=None, eventos=None):
+    """Eventos (los globales o los de un buffer) como DataFrame, opcionalmente de una sola recarga."""
+    import pandas as pd
+    eventos = events() if eventos is None else list(eventos)
+    tabla = pd.DataFrame(eventos, columns=[
+        "name", "category", "run", "depth", "start_ms", "duration_ms", "peak_mb", "rows", "error", "pid", "tid",
+    ])
+    return tabla if run is None else tabla[tabla["run"] == run]
+
+
+def summary(tabla=None):
+    """Agregado por tramo: llamadas, tiempo total/medio/máximo, memoria pico y filas."""
+    tabla = records() if tabla is None else tabla
+    agregado = tabla.groupby(["category", "name"], sort=False).agg(
+        calls=("duration_ms", "size"),
+        total_ms=("duration_ms", "sum"),
+        mean_ms=("duration_ms", "mean"),
+        max_ms=("duration_ms", "max"),
+        peak_mb=("peak_mb", "max"),
+        rows=("rows", "max"),
+    )
+    return agregado.sort_values("total_ms", ascending=False).reset_index()
+
+
+def chrome_trace(eventos=None) -> dict:
+    """Eventos en formato Chrome Trace Event ("X" = duración completa, en µs)."""
+    eventos = events() if eventos is None else eventos
+    return {
+        "traceEvents": [
+            {
+                "name": e["name"],
+                "cat": e["category"],
+                "ph": "X",
+                "ts": e["start_ms"] * 1000,
+                "dur": e["duration_ms"] * 1000,
+                "pid": e["pid"],
+                "tid": e["tid"],
+                "args": {k: e[k] for k in ("run", "rows", "peak_mb", "error") if e[k] is not None},
+            }
+            for e in eventos
+        ],
+        "displayTimeUnit": "ms",
+    }
+
+
+def export_trace(path=None, eventos=None) -> str:
+    """Serializa la traza en JSON y, si se da `path`, la escribe a disco."""
+    texto = json.dumps(chrome_trace(eventos))
+    if path is not None:
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(texto)
+    return texto
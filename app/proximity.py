@@ -0,0 +1,148 @@
+"""
+Motor de proximidad a hospitales.
+
+Construye una sola vez un KD-tree sobre las coordenadas geocéntricas (metros)
+de los hospitales y responde, para lotes completos de puntos, consultas de
+vecino más cercano (k) y de conteo dentro de un radio en una llamada vectorizada.
+Las distancias devueltas son de gran círculo, sin la distorsión de proyectar
+todo el país a una sola zona UTM.
+"""
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def lonlat_to_xyz(lon, lat) -> np.ndarray:
+    """Convierte lon/lat (grados) a coordenadas cartesianas geocéntricas en metros."""
+    lon = np.radians(np.asarray(lon, dtype=float))
+    lat = np.radians(np.asarray(lat, dtype=float))
+    cos_lat = np.cos(lat)
+    return EARTH_RADIUS_M * np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def arc_to_chord(distance_m):
+    """Distancia sobre la superficie (m) a distancia de cuerda (m) para consultar el árbol."""
+    return 2 * EARTH_RADIUS_M * np.sin(np.asarray(distance_m, dtype=float) / (2 * EARTH_RADIUS_M))
+
+
+def chord_to_arc(chord_m):
+    """Distancia de cuerda (m) a distancia de gran círculo (m); conserva inf."""
+    ratio = np.clip(np.asarray(chord_m, dtype=float) / (2 * EARTH_RADIUS_M), 0, 1)
+    arc = 2 * EARTH_RADIUS_M * np.arcsin(ratio)
+    return np.where(np.isinf(chord_m), np.inf, arc)
+
+
+def point_coords(gdf):
+    """Devuelve (lon, lat) como arrays de un GeoDataFrame de puntos, reproyectando a EPSG:4326."""
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs("EPSG:4326")
+    return gdf.geometry.x.to_numpy(), gdf.geometry.y.to_numpy()
+
+
+class HospitalIndex:
+    """Índice espacial de hospitales para consultas por lotes."""
+
+    def __init__(self, lon, lat, names=None):
+        self.lon = np.asarray(lon, dtype=float)
+        self.lat = np.asarray(lat, dtype=float)
+        self.names = None if names is None else np.asarray(names, dtype=object)
+        self.tree = cKDTree(lonlat_to_xyz(self.lon, self.lat))
+
+    @classmethod
+    def from_geodataframe(cls, gdf, name_col="Nombre del establecimiento"):
+        lon, lat = point_coords(gdf)
+        names = gdf[name_col].to_numpy() if name_col in gdf.columns else None
+        return cls(lon, lat, names)
+
+    def __len__(self):
+        return self.tree.n
+
+    def nearest(self, lon, lat, k=1, max_km=None, workers=-1):
+        """
+        k hospitales más cercanos a cada punto.
+        Devuelve (distancias en metros, posiciones en el índice). Con k=1 los
+        arrays son 1-D; si no hay hospital dentro de max_km la distancia es inf
+        y la posición es len(self).
+        """
+        upper = np.inf if max_km is None else float(arc_to_chord(max_km * 1000))
+        chord, pos = self.tree.query(lonlat_to_xyz(lon, lat), k=k, distance_upper_bound=upper, workers=workers)
+        return chord_to_arc(chord), pos
+
+    def count_within(self, lon, lat, radius_km, workers=-1) -> np.ndarray:
+        """Número de hospitales a <= radius_km de cada punto."""
+        counts = self.tree.query_ball_point(
+            lonlat_to_xyz(lon, lat), r=float(arc_to_chord(radius_km * 1000)),
+            return_length=True, workers=workers
+        )
+        return np.asarray(counts, dtype=np.int32)
+
+    def within(self, lon, lat, radius_km, workers=-1):
+        """Posiciones de los hospitales a <= radius_km de cada punto (lista de listas)."""
+        return self.tree.query_ball_point(
+            lonlat_to_xyz(lon, lat), r=float(arc_to_chord(radius_km * 1000)), workers=workers
+        )
+
+    def access_table(self, points, radius_km=10):
+        """
+        Tabla de acceso para un GeoDataFrame de puntos (p. ej. centros poblados).
+        Añade distancia al hospital más cercano, su nombre, hospitales dentro
+        del radio y el indicador 'tiene_acceso' usado en el notebook 3.
+        """
+        lon, lat = point_coords(points)
+        dist_m, pos = self.nearest(lon, lat)
+        result = points.copy()
+        result["dist_hospital_km"] = dist_m / 1000
+        if self.names is not None:
+            result["hospital_cercano"] = self.names[pos]
+        result["hospitales_en_radio"] = self.count_within(lon, lat, radius_km)
+        result["tiene_acceso"] = result["hospitales_en_radio"] > 0
+        return result
+
+
+def load_hospitals(path=None):
+    """Carga los hospitales procesados (notebook 1), desde la caché columnar por defecto."""
+    if path is None:
+        from datastore import load
+        return load("hospitales")
+    import geopandas as gpd
+    return gpd.read_file(path)
+
+
+def load_population_centers(path=None):
+    """Carga la capa completa de centros poblados CCPP_IGN100K."""
+    if path is None:
+        from datastore import load
+        return load("ccpp")
+    import geopandas as gpd
+    ccpp = gpd.read_file(path)
+    if ccpp.crs is None:
+        ccpp = ccpp.set_crs("EPSG:4326")
+    return ccpp
+
+
+def national_access(radius_km=10, hospitales=None, centros=None):
+    """Acceso de todos los centros poblados del país a hospitales en una sola pasada."""
+    hospitales = load_hospitals() if hospitales is None else hospitales
+    centros = load_population_centers() if centros is None else centros
+    index = HospitalIndex.from_geodataframe(hospitales)
+    return index.access_table(centros, radius_km=radius_km)
+
+
+def access_summary(table: pd.DataFrame) -> dict:
+    """Resumen agregado de una tabla de acceso."""
+    total = len(table)
+    con_acceso = int(table["tiene_acceso"].sum())
+    return {
+        "centros": total,
+        "con_acceso": con_acceso,
+        "porcentaje_acceso": con_acceso / total * 100 if total else 0.0,
+        "dist_mediana_km": float(table["dist_hospital_km"].median()) if total else float("nan"),
+    }
+
+
+if __name__ == "__main__":
+    tabla = national_access()
+    for clave, valor in access_summary(tabla).items():
+        print(f"{clave}: {valor}")
@@ -0,0 +1,463 @@
+"""
+Consultas de hospitales cercanos sin abrir notebooks: CLI por lotes y servidor HTTP local.
+
+`QueryEngine` carga una sola vez los hospitales procesados (KD-tree de
+proximity.HospitalIndex) y la capa distrital (polígonos preparados de
+districts.DistrictIndex) y responde lotes de coordenadas con los k hospitales
+más cercanos y sus distancias, el distrito/UBIGEO que contiene cada punto y
+el número de hospitales dentro del radio. El índice es de solo lectura, así
+que los hilos del servidor lo comparten sin copias ni bloqueos.
+
+Uso:
+    python app/service.py query puntos.csv -k 3 --radius 10 -o resultado.csv
+    python app/service.py query puntos.ndjson --format ndjson      # salida a stdout
+    python app/service.py serve --port 8765
+
+Entradas: CSV con columnas lat/lon (o latitud/longitud) y opcionalmente id, o
+JSON por líneas ({"lat": .., "lon": .., "id": ..}); se leen en lotes de
+`--batch-size` filas. El servidor acepta:
+    GET  /health
+    GET  /nearest?lat=-12.05&lon=-77.04&k=3&radius_km=10
+    POST /nearest  JSON {"points": [{"lat": .., "lon": ..}, ...], "k": 3, "radius_km": 10}
+    POST /nearest  text/csv o application/x-ndjson: respuesta NDJSON por lotes (chunked)
+El cuerpo puede llegar con Content-Length o Transfer-Encoding: chunked
+(`curl -T -`) y se procesa por lotes a medida que se lee del socket.
+"""
+import argparse
+import io
+import json
+import shutil
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+APP_DIR = Path(__file__).resolve().parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+import numpy as np
+import pandas as pd
+
+import datastore
+from districts import DistrictIndex, district_index
+from proximity import HospitalIndex
+
+HOSPITAL_COLUMNS = ["Nombre del establecimiento", "Institución", "Departamento"]
+DISTRICT_COLUMNS = ["IDDIST", "DISTRITO", "PROVINCIA", "DEPARTAMEN"]
+LAT_NAMES = ("lat", "latitud", "latitude")
+LON_NAMES = ("lon", "longitud", "longitude", "lng")
+BATCH_SIZE = 50_000
+MAX_K = 50
+# Respuesta acumulada en memoria mientras el cliente sigue enviando; por encima, en disco
+SPOOL_BYTES = 8 * 2**20
+MAX_LINE = 65_536
+
+
+class QueryEngine:
+    """Índices en memoria de hospitales y distritos para consultas por lotes."""
+
+    def __init__(self, hospitales=None, distritos=None):
+        if hospitales is None:
+            hospitales = datastore.load("hospitales")
+        self.index = HospitalIndex.from_geodataframe(hospitales)
+        columnas = [c for c in HOSPITAL_COLUMNS if c in hospitales.columns]
+        self.hospital_lon, self.hospital_lat = self.index.lon, self.index.lat
+        self.hospital_attrs = {c: hospitales[c].astype(object).to_numpy() for c in columnas}
+
+        # Polígonos distritales preparados (districts.py); sin la capa no hay UBIGEO
+        self.districts = None
+        if distritos is None:
+            try:
+                self.districts = district_index(DISTRICT_COLUMNS)
+            except FileNotFoundError:
+                pass
+        else:
+            self.districts = DistrictIndex(distritos, DISTRICT_COLUMNS)
+
+    @classmethod
+    def from_paths(cls, hospitales_path=None, distritos_path=None):
+        import geopandas as gpd
+        hospitales = None if hospitales_path is None else gpd.read_file(hospitales_path)
+        distritos = None if distritos_path is None else gpd.read_file(distritos_path)
+        return cls(hospitales, distritos)
+
+    def districts_of(self, lon, lat) -> np.ndarray:
+        """Posición del distrito que contiene cada punto (-1 si ninguno)."""
+        if self.districts is None:
+            return np.full(len(lon), -1, dtype=np.int64)
+        return self.districts.locate(lon, lat)
+
+    def query(self, lon, lat, k=3, radius_km=10, ids=None, workers=1) -> pd.DataFrame:
+        """Tabla plana: punto, distrito, hospitales en radio y, por j=1..k, hospital_j y dist_km_j."""
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        k = max(1, min(int(k), MAX_K, len(self.index)))
+        tabla = pd.DataFrame({"lat": lat, "lon": lon})
+        if ids is not None:
+            tabla.insert(0, "id", np.asarray(ids, dtype=object))
+        validos = np.isfinite(lon) & np.isfinite(lat)
+
+        distrito = np.full(len(lon), -1, dtype=np.int64)
+        distrito[validos] = self.districts_of(lon[validos], lat[validos])
+        if self.districts is not None:
+            con_distrito = distrito >= 0
+            for c, valores in self.districts.attrs.items():
+                tabla[c] = np.where(con_distrito, valores[np.maximum(distrito, 0)], None)
+
+        en_radio = np.zeros(len(lon), dtype=np.int32)
+        en_radio[validos] = self.index.count_within(lon[validos], lat[validos], radius_km, workers=workers)
+        tabla["hospitales_en_radio"] = en_radio
+
+        dist = np.full((len(lon), k), np.inf)
+        pos = np.zeros((len(lon), k), dtype=np.int64)
+        if validos.any():
+            d, p = self.index.nearest(lon[validos], lat[validos], k=k, workers=workers)
+            dist[validos], pos[validos] = np.reshape(d, (-1, k)), np.reshape(p, (-1, k))
+        for j in range(k):
+            encontrado = np.isfinite(dist[:, j])
+            for c, valores in self.hospital_attrs.items():
+                etiqueta = "hospital" if c == "Nombre del establecimiento" else c.lower()
+                tabla[f"{etiqueta}_{j + 1}"] = np.where(encontrado, valores[np.minimum(pos[:, j], len(valores) - 1)], None)
+            tabla[f"dist_km_{j + 1}"] = np.round(dist[:, j] / 1000, 4)
+        return tabla
+
+    def to_records(self, tabla):
+        """Filas de `query` como dicts JSON: los k hospitales en una lista 'cercanos'."""
+        columnas = [c for c in tabla.columns if c.startswith("dist_km_")]
+        base = [c for c in tabla.columns if not c.rsplit("_", 1)[-1].isdigit()]
+        registros = []
+        for fila in tabla.to_dict("records"):
+            registro = {c: _json_value(fila[c]) for c in base}
+            cercanos = []
+            for j in range(1, len(columnas) + 1):
+                if not np.isfinite(fila[f"dist_km_{j}"]):
+                    break
+                cercanos.append({
+                    c.rsplit("_", 1)[0]: _json_value(v) for c, v in fila.items() if c.rsplit("_", 1)[-1] == str(j)
+                })
+            registro["cercanos"] = cercanos
+            registros.append(registro)
+        return registros
+
+
+def _json_value(valor):
+    if isinstance(valor, (np.integer,)):
+        return int(valor)
+    if isinstance(valor, (float, np.floating)):
+        return float(valor) if np.isfinite(valor) else None
+    return valor
+
+
+def _coordinate_columns(columnas):
+    nombres = {str(c).lower(): c for c in columnas}
+    lat = next((nombres[n] for n in LAT_NAMES if n in nombres), None)
+    lon = next((nombres[n] for n in LON_NAMES if n in nombres), None)
+    if lat is None or lon is None:
+        raise ValueError(f"se esperan columnas lat/lon (o latitud/longitud); recibidas: {list(columnas)}")
+    return lat, lon, nombres.get("id")
+
+
+def _frame_points(frame):
+    """(lon, lat, ids) de un DataFrame con columnas de coordenadas."""
+    lat, lon, ident = _coordinate_columns(frame.columns)
+    ids = None if ident is None else frame[ident].to_numpy()
+    return (pd.to_numeric(frame[lon], errors="coerce").to_numpy(),
+            pd.to_numeric(frame[lat], errors="coerce").to_numpy(), ids)
+
+
+def _request_points(puntos):
+    """DataFrame de 'points' de una petición JSON: objetos con lat/lon o pares [lat, lon]."""
+    if not isinstance(puntos, list) or not puntos:
+        raise ValueError("'points' debe ser una lista no vacía")
+    if all(isinstance(p, dict) for p in puntos):
+        return pd.DataFrame(puntos)
+    if all(isinstance(p, (list, tuple)) and len(p) == 2 for p in puntos):
+        return pd.DataFrame(puntos, columns=["lat", "lon"])
+    raise ValueError("'points' debe ser una lista de objetos {lat, lon} o de pares [lat, lon]")
+
+
+def iter_csv_batches(fuente, batch_size=BATCH_SIZE):
+    """Lotes (lon, lat, ids) de un CSV (ruta o archivo) sin leerlo completo."""
+    for bloque in pd.read_csv(fuente, chunksize=batch_size):
+        yield _frame_points(bloque)
+
+
+def iter_ndjson_batches(lineas, batch_size=BATCH_SIZE):
+    """Lotes (lon, lat, ids) de JSON por líneas (iterable de str o bytes)."""
+    lote = []
+    for linea in lineas:
+        linea = linea.strip()
+        if linea:
+            lote.append(json.loads(linea))
+        if len(lote) >= batch_size:
+            yield _frame_points(pd.DataFrame(lote))
+            lote = []
+    if lote:
+        yield _frame_points(pd.DataFrame(lote))
+
+
+def iter_batches(path, batch_size=BATCH_SIZE):
+    """Lotes de un archivo .csv o .ndjson/.jsonl ('-' = CSV por stdin)."""
+    if path == "-":
+        return iter_csv_batches(sys.stdin, batch_size)
+    if Path(path).suffix.lower() in (".ndjson", ".jsonl", ".json"):
+        return iter_ndjson_batches(open(path, encoding="utf-8"), batch_size)
+    return iter_csv_batches(path, batch_size)
+
+
+def run_batches(engine, lotes, salida, fmt="csv", k=3, radius_km=10, workers=-1):
+    """Procesa lotes y los escribe en `salida` a medida que llegan; devuelve (puntos, segundos)."""
+    puntos, inicio = 0, time.perf_counter()
+    for i, (lon, lat, ids) in enumerate(lotes):
+        tabla = engine.query(lon, lat, k=k, radius_km=radius_km, ids=ids, workers=workers)
+        if fmt == "csv":
+            tabla.to_csv(salida, index=False, header=i == 0)
+        else:
+            for registro in engine.to_records(tabla):
+                salida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        puntos += len(tabla)
+    return puntos, time.perf_counter() - inicio
+
+
+class RequestBody(io.RawIOBase):
+    """
+    Cuerpo de una petición leído del socket a medida que se consume, con
+    Content-Length (`length`) o Transfer-Encoding: chunked (`length=None`).
+    """
+
+    def __init__(self, rfile, length=None):
+        self.rfile = rfile
+        self.remaining = length
+        self.chunk_left = 0
+        self.done = length == 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.done:
+            return 0
+        if self.remaining is None and self.chunk_left == 0 and not self._next_chunk():
+            return 0
+        pendiente = self.remaining if self.remaining is not None else self.chunk_left
+        n = self.rfile.readinto(memoryview(buffer)[:min(len(buffer), pendiente)])
+        if not n:
+            raise ValueError("cuerpo de la petición incompleto")
+        if self.remaining is not None:
+            self.remaining -= n
+            self.done = self.remaining == 0
+        else:
+            self.chunk_left -= n
+            if self.chunk_left == 0:
+                self.rfile.readline(MAX_LINE)  # CRLF que cierra el bloque
+        return n
+
+    def _next_chunk(self):
+        """Lee la cabecera del siguiente bloque; False en el bloque final (tamaño 0)."""
+        linea = self.rfile.readline(MAX_LINE)
+        try:
+            tamano = int(linea.split(b";")[0].strip(), 16)
+        except ValueError:
+            raise ValueError(f"bloque chunked inválido: {linea[:40]!r}") from None
+        if tamano == 0:
+            # Trailers opcionales hasta la línea vacía
+            while self.rfile.readline(MAX_LINE) not in (b"\r\n", b"\n", b""):
+                pass
+            self.done = True
+            return False
+        self.chunk_left = tamano
+        return True
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Handler HTTP; `engine` se asigna en make_server y lo comparten todos los hilos."""
+    engine = None
+    protocol_version = "HTTP/1.1"
+    server_version = "HospitalsAccess/1.0"
+
+    def _send_json(self, estado, cuerpo):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        if estado >= 400:
+            # El cuerpo de la petición puede no haberse leído completo: no reutilizar la conexión
+            self.close_connection = True
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _parametros(self, consulta):
+        k = int(consulta.get("k", [3])[0])
+        radio = float(consulta.get("radius_km", [10])[0])
+        return k, radio
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        consulta = parse_qs(url.query)
+        try:
+            if url.path == "/health":
+                self._send_json(200, {"status": "ok", "hospitales": len(self.engine.index),
+                                      "distritos": self.engine.districts is not None})
+            elif url.path == "/nearest":
+                k, radio = self._parametros(consulta)
+                lat, lon = float(consulta["lat"][0]), float(consulta["lon"][0])
+                tabla = self.engine.query([lon], [lat], k=k, radius_km=radio)
+                self._send_json(200, self.engine.to_records(tabla)[0])
+            else:
+                self._send_json(404, {"error": f"ruta desconocida: {url.path}"})
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/nearest":
+            self._send_json(404, {"error": f"ruta desconocida: {url.path}"})
+            return
+        tipo = self.headers.get("Content-Type", "application/json").split(";")[0].strip()
+        try:
+            k, radio = self._parametros(parse_qs(url.query))
+            cuerpo = self._body()
+            if tipo == "application/json":
+                cuerpo = json.loads(cuerpo.readall() or b"{}")
+                if not isinstance(cuerpo, dict):
+                    raise ValueError("se espera un objeto JSON con 'points'")
+                k, radio = int(cuerpo.get("k", k)), float(cuerpo.get("radius_km", radio))
+                puntos = _request_points(cuerpo.get("points"))
+                inicio = time.perf_counter()
+                lon, lat, ids = _frame_points(puntos)
+                tabla = self.engine.query(lon, lat, k=k, radius_km=radio, ids=ids)
+                self._send_json(200, {"count": len(tabla),
+                                      "elapsed_ms": round((time.perf_counter() - inicio) * 1000, 3),
+                                      "results": self.engine.to_records(tabla)})
+            elif tipo in ("text/csv", "application/x-ndjson"):
+                self._stream(tipo, cuerpo, k, radio)
+            else:
+                self._send_json(415, {"error": f"Content-Type no soportado: {tipo}"})
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+
+    def _body(self):
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            return RequestBody(self.rfile)
+        return RequestBody(self.rfile, int(self.headers.get("Content-Length", 0)))
+
+    def _stream(self, tipo, cuerpo, k, radio):
+        """Procesa el cuerpo por lotes a medida que llega del socket y responde NDJSON chunked."""
+        lector = io.BufferedReader(cuerpo)
+        lotes = iter_csv_batches(lector) if tipo == "text/csv" else iter_ndjson_batches(lector)
+        primero = next(lotes, None)
+        if primero is None:
+            raise ValueError("cuerpo vacío")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # Un cliente síncrono no lee la respuesta hasta terminar de enviar: mientras
+        # siga llegando cuerpo los resultados se acumulan aquí, y escribir antes
+        # bloquearía ambos lados
+        pendiente = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        lotes = _chain(primero, lotes)
+        while True:
+            error = None
+            try:
+                lote = next(lotes, None)
+                if lote is None:
+                    break
+                lon, lat, ids = lote
+                tabla = self.engine.query(lon, lat, k=k, radius_km=radio, ids=ids)
+                datos = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in self.engine.to_records(tabla))
+            except Exception as e:
+                # Las cabeceras 200 ya salieron: el error va como último registro y se cierra el cuerpo
+                self.close_connection = True
+                error = f"{type(e).__name__}: {e}"
+                datos = json.dumps({"error": error}, ensure_ascii=False) + "\n"
+            if pendiente is not None and (cuerpo.done or error):
+                pendiente = self._flush(pendiente)
+            self._write_chunk(datos, pendiente)
+            if error:
+                break
+        if pendiente is not None:
+            self._flush(pendiente)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _flush(self, pendiente):
+        pendiente.seek(0)
+        shutil.copyfileobj(pendiente, self.wfile)
+        pendiente.close()
+        return None
+
+    def _write_chunk(self, texto, pendiente=None):
+        datos = texto.encode("utf-8")
+        (self.wfile if pendiente is None else pendiente).write(f"{len(datos):X}\r\n".encode() + datos + b"\r\n")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def _chain(primero, resto):
+    yield primero
+    yield from resto
+
+
+def make_server(engine, host="127.0.0.1", port=8765, verbose=False):
+    """Servidor con un hilo por conexión que comparte `engine`."""
+    handler = type("BoundQueryHandler", (QueryHandler,), {"engine": engine})
+    servidor = ThreadingHTTPServer((host, port), handler)
+    servidor.daemon_threads = True
+    servidor.verbose = verbose
+    return servidor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hospitales cercanos para lotes de coordenadas")
+    parser.add_argument("--hospitales", help="GeoJSON de hospitales (por defecto la caché de datastore)")
+    parser.add_argument("--distritos", help="capa distrital (por defecto DISTRITOS.shp vía datastore)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    q = sub.add_parser("query", help="procesar un archivo CSV / NDJSON por lotes")
+    q.add_argument("entrada", help="archivo .csv, .ndjson/.jsonl o '-' (CSV por stdin)")
+    q.add_argument("-o", "--output", help="archivo de salida (por defecto stdout)")
+    q.add_argument("--format", choices=["csv", "ndjson"], default=None, help="formato de salida")
+    q.add_argument("-k", type=int, default=3, help="hospitales más cercanos por punto")
+    q.add_argument("--radius", type=float, default=10, help="radio (km) para el conteo")
+    q.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    s = sub.add_parser("serve", help="servidor HTTP local")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8765)
+    s.add_argument("--verbose", action="store_true", help="registrar cada petición")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    engine = (QueryEngine() if args.hospitales is None and args.distritos is None
+              else QueryEngine.from_paths(args.hospitales, args.distritos))
+    print(f"Índices cargados en {time.perf_counter() - inicio:.2f}s "
+          f"({len(engine.index)} hospitales)", file=sys.stderr)
+
+    if args.comando == "query":
+        fmt = args.format or ("ndjson" if args.output and Path(args.output).suffix in (".ndjson", ".jsonl") else "csv")
+        salida = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+        try:
+            puntos, segundos = run_batches(engine, iter_batches(args.entrada, args.batch_size), salida,
+                                           fmt=fmt, k=args.k, radius_km=args.radius)
+        finally:
+            if args.output:
+                salida.close()
+        print(f"{puntos:,} puntos en {segundos:.2f}s ({puntos / max(segundos, 1e-9):,.0f} puntos/s)", file=sys.stderr)
+    else:
+        servidor = make_server(engine, args.host, args.port, args.verbose)
+        print(f"Escuchando en http://{args.host}:{args.port}", file=sys.stderr)
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
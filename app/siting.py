@@ -0,0 +1,245 @@
+"""
+Escenarios "what-if" de ubicación de hospitales con actualización incremental.
+
+`CoverageScenario` mantiene en memoria, para cada centro poblado, la distancia
+al establecimiento activo más cercano y cuántos quedan dentro del radio de
+cobertura, además de los conteos cubiertos por grupo (distrito). Añadir o
+quitar un establecimiento consulta el KD-tree de centros solo en su vecindad
+(radio de seguimiento `track_km`) y corrige esos centros y los grupos que
+cambian, sin recalcular el resto del país; cada operación toma milisegundos.
+
+Las distancias mayores que `track_km` se registran como inf ("fuera de
+rango"): un establecimiento nuevo solo puede acercar centros dentro de ese
+radio, lo que acota la vecindad que hay que revisar.
+"""
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from proximity import arc_to_chord, chord_to_arc, lonlat_to_xyz, point_coords
+
+TRACK_KM = 100
+SIN_GRUPO = "(sin distrito)"
+
+
+def _first_per_row(fila, candidato, distancia):
+    """Para pares (fila, candidato, distancia) devuelve, por fila, el candidato más cercano."""
+    orden = np.lexsort((distancia, fila))
+    fila, candidato, distancia = fila[orden], candidato[orden], distancia[orden]
+    primero = np.r_[True, fila[1:] != fila[:-1]]
+    return fila[primero], candidato[primero], distancia[primero]
+
+
+class CoverageScenario:
+    """Estado de cobertura de un conjunto de centros poblados frente a establecimientos editables."""
+
+    def __init__(self, site_lon, site_lat, center_lon, center_lat, groups=None,
+                 radius_km=10, track_km=TRACK_KM, site_names=None):
+        if track_km < radius_km:
+            raise ValueError("track_km debe ser >= radius_km")
+        self.radius_km = float(radius_km)
+        self.track_km = float(track_km)
+        self._radius_chord = float(arc_to_chord(self.radius_km * 1000))
+        self._track_chord = float(arc_to_chord(self.track_km * 1000))
+
+        self.center_lon = np.asarray(center_lon, dtype=float)
+        self.center_lat = np.asarray(center_lat, dtype=float)
+        self.center_xyz = lonlat_to_xyz(self.center_lon, self.center_lat)
+        self.center_tree = cKDTree(self.center_xyz)
+
+        grupos = pd.Series(SIN_GRUPO if groups is None else groups, index=range(len(self.center_lon)))
+        codes, labels = pd.factorize(grupos.fillna(SIN_GRUPO).astype(str), sort=True)
+        self.codes = codes
+        self.group_labels = np.asarray(labels, dtype=object)
+        self.centers_by_group = np.bincount(codes, minlength=len(labels))
+
+        self.site_lon = np.asarray(site_lon, dtype=float)
+        self.site_lat = np.asarray(site_lat, dtype=float)
+        self.site_xyz = lonlat_to_xyz(self.site_lon, self.site_lat)
+        n_sites = len(self.site_lon)
+        self.site_names = [f"Sitio {i}" for i in range(n_sites)] if site_names is None else [str(s) for s in site_names]
+        self.active = np.ones(n_sites, dtype=bool)
+        self.hypothetical = np.zeros(n_sites, dtype=bool)
+        # Árbol de los establecimientos iniciales; los añadidos después se revisan por fuerza bruta
+        self.site_tree = cKDTree(self.site_xyz)
+        self._tree_size = n_sites
+
+        if n_sites:
+            chord, pos = self.site_tree.query(self.center_xyz, distance_upper_bound=self._track_chord, workers=-1)
+            self.in_radius = np.asarray(self.site_tree.query_ball_point(
+                self.center_xyz, r=self._radius_chord, return_length=True, workers=-1
+            ), dtype=np.int32)
+        else:
+            chord = np.full(len(self.center_lon), np.inf)
+            pos = np.zeros(len(self.center_lon), dtype=np.intp)
+            self.in_radius = np.zeros(len(self.center_lon), dtype=np.int32)
+        self.nearest_chord = np.asarray(chord, dtype=float)
+        self.nearest_site = np.where(np.isinf(chord), -1, pos).astype(np.intp)
+        self.covered_by_group = np.bincount(codes, weights=self.in_radius > 0, minlength=len(labels)).astype(np.int64)
+
+    @classmethod
+    def from_geodataframes(cls, hospitales, centros, group_col=None, radius_km=10, track_km=TRACK_KM,
+                           name_col="Nombre del establecimiento"):
+        h_lon, h_lat = point_coords(hospitales)
+        c_lon, c_lat = point_coords(centros)
+        grupos = None if group_col is None else centros[group_col].to_numpy()
+        nombres = hospitales[name_col].to_numpy() if name_col in hospitales.columns else None
+        return cls(h_lon, h_lat, c_lon, c_lat, grupos, radius_km, track_km, nombres)
+
+    def copy(self):
+        """Copia independiente del estado mutable; los árboles se comparten (no cambian)."""
+        nuevo = object.__new__(CoverageScenario)
+        nuevo.__dict__.update(self.__dict__)
+        for atributo in ("site_lon", "site_lat", "site_xyz", "active", "hypothetical",
+                         "in_radius", "nearest_chord", "nearest_site", "covered_by_group"):
+            setattr(nuevo, atributo, getattr(self, atributo).copy())
+        nuevo.site_names = list(self.site_names)
+        return nuevo
+
+    def __len__(self):
+        return len(self.codes)
+
+    # ----- Actualización incremental -----
+
+    def _neighbourhood(self, xyz, chord):
+        """Centros a <= chord del punto y su distancia de cuerda."""
+        cercanos = np.asarray(self.center_tree.query_ball_point(xyz, r=chord), dtype=np.intp)
+        return cercanos, np.linalg.norm(self.center_xyz[cercanos] - xyz, axis=1)
+
+    def _shift_counts(self, centros, delta):
+        """Suma `delta` a los conteos en radio; actualiza grupos y devuelve el cambio de cubiertos por grupo."""
+        antes = self.in_radius[centros] > 0
+        self.in_radius[centros] += delta
+        cambio = (self.in_radius[centros] > 0).astype(np.int64) - antes
+        por_grupo = np.bincount(self.codes[centros], weights=cambio, minlength=len(self.group_labels)).astype(np.int64)
+        self.covered_by_group += por_grupo
+        return por_grupo
+
+    def _nearest_active(self, centros):
+        """Recalcula el establecimiento activo más cercano (dentro de track_km) de los centros dados."""
+        xyz = self.center_xyz[centros]
+        mejor = np.full(len(centros), np.inf)
+        sitio = np.full(len(centros), -1, dtype=np.intp)
+        vecinos = self.site_tree.query_ball_point(xyz, r=self._track_chord)
+        largos = np.fromiter(map(len, vecinos), dtype=np.intp, count=len(vecinos))
+        fila = np.repeat(np.arange(len(centros)), largos)
+        candidato = np.fromiter((j for lista in vecinos for j in lista), dtype=np.intp, count=int(largos.sum()))
+        extra = np.flatnonzero(self.active[self._tree_size:]) + self._tree_size
+        if extra.size:
+            fila = np.concatenate([fila, np.repeat(np.arange(len(centros)), extra.size)])
+            candidato = np.concatenate([candidato, np.tile(extra, len(centros))])
+        activos = self.active[candidato]
+        fila, candidato = fila[activos], candidato[activos]
+        if fila.size:
+            distancia = np.linalg.norm(xyz[fila] - self.site_xyz[candidato], axis=1)
+            fila, candidato, distancia = _first_per_row(fila, candidato, distancia)
+            dentro = distancia <= self._track_chord
+            mejor[fila[dentro]] = distancia[dentro]
+            sitio[fila[dentro]] = candidato[dentro]
+        self.nearest_chord[centros] = mejor
+        self.nearest_site[centros] = sitio
+
+    def _change(self, sitio, operacion, revisados, por_grupo):
+        cambios = np.flatnonzero(por_grupo)
+        return {
+            "sitio": sitio,
+            "operacion": operacion,
+            "centros_revisados": int(revisados),
+            "cambio_cubiertos": int(por_grupo.sum()),
+            "cambio_por_grupo": {self.group_labels[g]: int(por_grupo[g]) for g in cambios},
+            **self.summary(),
+        }
+
+    def add_site(self, lon, lat, name=None) -> dict:
+        """Añade un establecimiento hipotético y actualiza solo los centros de su vecindad."""
+        xyz = lonlat_to_xyz([lon], [lat])
+        sitio = len(self.site_lon)
+        self.site_lon = np.append(self.site_lon, float(lon))
+        self.site_lat = np.append(self.site_lat, float(lat))
+        self.site_xyz = np.vstack([self.site_xyz, xyz])
+        self.site_names.append(name or f"Hipotético {int(self.hypothetical.sum()) + 1}")
+        self.active = np.append(self.active, True)
+        self.hypothetical = np.append(self.hypothetical, True)
+
+        cercanos, chord = self._neighbourhood(xyz[0], self._track_chord)
+        por_grupo = self._shift_counts(cercanos[chord <= self._radius_chord], 1)
+        mejora = chord < self.nearest_chord[cercanos]
+        self.nearest_chord[cercanos[mejora]] = chord[mejora]
+        self.nearest_site[cercanos[mejora]] = sitio
+        return self._change(sitio, "add", len(cercanos), por_grupo)
+
+    def remove_site(self, sitio) -> dict:
+        """Desactiva un establecimiento (existente o hipotético) y corrige su vecindad."""
+        if not 0 <= sitio < len(self.active) or not self.active[sitio]:
+            raise ValueError(f"El sitio {sitio} no existe o ya fue retirado")
+        self.active[sitio] = False
+        cercanos, chord = self._neighbourhood(self.site_xyz[sitio], self._track_chord)
+        por_grupo = self._shift_counts(cercanos[chord <= self._radius_chord], -1)
+        afectados = cercanos[self.nearest_site[cercanos] == sitio]
+        if afectados.size:
+            self._nearest_active(afectados)
+        return self._change(int(sitio), "remove", len(cercanos), por_grupo)
+
+    # ----- Consultas -----
+
+    def distances_km(self) -> np.ndarray:
+        """Distancia (km) al establecimiento activo más cercano; inf si supera track_km."""
+        return chord_to_arc(self.nearest_chord) / 1000
+
+    def covered(self) -> np.ndarray:
+        return self.in_radius > 0
+
+    def summary(self) -> dict:
+        """Totales del escenario actual."""
+        total = len(self.codes)
+        cubiertos = int(self.covered_by_group.sum())
+        distancias = self.distances_km()
+        return {
+            "sitios_activos": int(self.active.sum()),
+            "sitios_hipoteticos": int((self.active & self.hypothetical).sum()),
+            "centros": total,
+            "cubiertos": cubiertos,
+            "sin_cobertura": total - cubiertos,
+            "porcentaje_cubierto": cubiertos / total * 100 if total else 0.0,
+            "dist_mediana_km": float(np.median(distancias)) if total else float("nan"),
+            "fuera_de_rango": int(np.isinf(distancias).sum()),
+        }
+
+    def group_table(self) -> pd.DataFrame:
+        """Métricas por grupo: centros, cubiertos, sin cobertura, % y distancia media (dentro de track_km)."""
+        distancias = self.distances_km()
+        finitas = np.isfinite(distancias)
+        n_grupos = len(self.group_labels)
+        suma = np.bincount(self.codes[finitas], weights=distancias[finitas], minlength=n_grupos)
+        con_distancia = np.bincount(self.codes[finitas], minlength=n_grupos)
+        tabla = pd.DataFrame({
+            "grupo": self.group_labels,
+            "centros": self.centers_by_group,
+            "cubiertos": self.covered_by_group,
+        })
+        tabla["sin_cobertura"] = tabla["centros"] - tabla["cubiertos"]
+        tabla["porcentaje_cubierto"] = tabla["cubiertos"] / tabla["centros"].clip(lower=1) * 100
+        tabla["dist_media_km"] = np.where(con_distancia > 0, suma / np.maximum(con_distancia, 1), np.nan)
+        return tabla
+
+    def centers_table(self) -> pd.DataFrame:
+        """Estado de cada centro poblado (para mapas)."""
+        return pd.DataFrame({
+            "longitud": self.center_lon,
+            "latitud": self.center_lat,
+            "grupo": self.group_labels[self.codes],
+            "dist_hospital_km": self.distances_km(),
+            "hospitales_en_radio": self.in_radius,
+            "tiene_acceso": self.covered(),
+        })
+
+    def sites_table(self) -> pd.DataFrame:
+        """Establecimientos del escenario con su estado."""
+        return pd.DataFrame({
+            "sitio": np.arange(len(self.site_lon)),
+            "nombre": self.site_names,
+            "longitud": self.site_lon,
+            "latitud": self.site_lat,
+            "activo": self.active,
+            "hipotetico": self.hypothetical,
+        })
@@ -0,0 +1,511 @@
+"""
+Etapas del análisis (notebooks 01-04) como funciones importables.
+
+Cada etapa lee sus entradas desde /data y escribe sus salidas en /data, sin
+estado compartido, para que pipeline.py pueda ejecutarlas en procesos
+separados y saltarlas cuando sus entradas y su código no cambian.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import datastore
+import mapbuilder
+import profiling
+
+# ----- Rutas robustas -----
+APP_DIR  = Path(__file__).resolve().parent
+ROOT_DIR = APP_DIR.parent
+DATA_DIR = ROOT_DIR / "data"
+
+REGIONES_PROXIMIDAD = ['lima', 'loreto']
+
+# Centros poblados de referencia para Lima y Loreto (notebook 03)
+CENTROS_POBLADOS = {
+    'nombre_ccpp': [
+        # Lima (centros urbanos principales)
+        'Lima Centro', 'Miraflores', 'San Isidro', 'La Molina', 'Surco',
+        'San Juan de Lurigancho', 'Villa El Salvador', 'Ate', 'Comas', 'Los Olivos',
+        'Chorrillos', 'Barranco', 'Jesus Maria', 'Magdalena', 'Pueblo Libre',
+        'Villa Maria del Triunfo', 'San Martin de Porres', 'Independencia',
+
+        # Loreto (centros amazónicos dispersos)
+        'Iquitos', 'Nauta', 'Requena', 'Contamana', 'Yurimaguas',
+        'Caballococha', 'Pebas', 'Santa Rosa', 'Islandia', 'Tamshiyacu',
+        'Mazán', 'Indiana', 'Yaquerana', 'Soplin', 'Bagazan'
+    ],
+    'latitud': [
+        -12.0464, -12.1196, -12.0956, -12.0726, -12.1028,
+        -11.9773, -12.2095, -12.0294, -11.9387, -11.9608,
+        -12.1697, -12.1404, -12.0744, -12.0968, -12.0764,
+        -12.1594, -11.9879, -11.9454,
+
+        -3.7437, -4.5081, -5.0472, -7.3350, -5.8896,
+        -3.9167, -3.3167, -4.2833, -4.1500, -3.8833,
+        -3.4833, -3.5000, -4.3667, -4.8333, -5.3833
+    ],
+    'longitud': [
+        -77.0428, -77.0197, -77.0365, -76.9426, -76.9695,
+        -77.0028, -76.9419, -76.8969, -77.0436, -77.0611,
+        -77.0208, -77.0167, -77.0561, -77.0751, -77.0864,
+        -76.9419, -77.0564, -77.0564,
+
+        -73.2516, -73.5758, -73.8414, -75.0036, -76.0969,
+        -70.5000, -71.8500, -69.9500, -73.2667, -73.1667,
+        -73.0833, -73.0333, -72.8500, -74.9500, -75.7500
+    ],
+    'departamento': ['LIMA'] * 18 + ['LORETO'] * 15,
+    'tipo_centro': ['URBANO'] * 18 + ['RURAL'] * 15
+}
+
+
+def d(nombre: str) -> Path:
+    """Ruta absoluta de un archivo en /data."""
+    return DATA_DIR / nombre
+
+
+# ---------------------------------------------------------------------------
+# Notebook 01: procesamiento IPRESS
+# ---------------------------------------------------------------------------
+
+def procesar_ipress():
+    """Etapa 1: ipress_hospitales.csv -> hospitales_procesados.geojson (lectura por bloques)."""
+    from ipress import load_hospitals_from_ipress
+    gdf = load_hospitals_from_ipress(d('ipress_hospitales.csv'))
+    gdf.to_file(d('hospitales_procesados.geojson'), driver='GeoJSON')
+    return {'hospitales': len(gdf)}
+
+
+# ---------------------------------------------------------------------------
+# Notebook 02: conteo por distrito y estadísticas departamentales
+# ---------------------------------------------------------------------------
+
+def contar_hospitales_por_distrito(gdf_hospitales, gdf_distritos):
+    """Ubica cada hospital en su distrito (polígonos preparados) y cuenta hospitales por distrito."""
+    from districts import DistrictIndex
+
+    claves = ['IDDIST', 'DISTRITO', 'PROVINCIA', 'DEPARTAMEN']
+    indice = DistrictIndex(gdf_distritos, columns=claves)
+    posicion = indice.locate(gdf_hospitales.geometry.x.to_numpy(), gdf_hospitales.geometry.y.to_numpy(),
+                             gdf_hospitales.geometry.values)
+    # Conteo por polígono; el groupby solo recorre la tabla de distritos
+    por_poligono = pd.DataFrame(indice.attrs).assign(
+        num_hospitales=np.bincount(posicion[posicion >= 0], minlength=len(indice))
+    )
+    conteo_distritos = por_poligono.groupby(claves).sum().reset_index()
+    conteo_distritos = conteo_distritos[conteo_distritos['num_hospitales'] > 0].reset_index(drop=True)
+
+    # Merge con TODOS los distritos para incluir los que tienen 0 hospitales
+    distritos_completo = gdf_distritos.merge(
+        conteo_distritos,
+        on=['IDDIST', 'DISTRITO', 'PROVINCIA', 'DEPARTAMEN'],
+        how='left'
+    )
+    distritos_completo['num_hospitales'] = distritos_completo['num_hospitales'].fillna(0)
+    return distritos_completo, conteo_distritos
+
+
+def analisis_departamental(gdf_hospitales, gdf_distritos_hospitales):
+    """Estadísticas por departamento (igual que estadisticas_departamentales.csv)."""
+    hospitales_por_dept = gdf_hospitales['Departamento'].astype(str).value_counts().reset_index()
+    hospitales_por_dept.columns = ['Departamento', 'num_hospitales']
+
+    departamentos = gdf_distritos_hospitales['DEPARTAMEN'].astype(str)
+    sin_hospitales = gdf_distritos_hospitales['num_hospitales'] == 0
+    stats = pd.DataFrame({
+        'total_distritos': departamentos.value_counts(),
+        'distritos_sin_hospitales': departamentos[sin_hospitales].value_counts(),
+    }).rename_axis('Departamento').reset_index()
+    stats = stats.sort_values('total_distritos', ascending=False, kind='stable')
+
+    stats = stats.merge(hospitales_por_dept, on='Departamento', how='left')
+    stats['distritos_sin_hospitales'] = stats['distritos_sin_hospitales'].fillna(0)
+    stats['num_hospitales'] = stats['num_hospitales'].fillna(0)
+    stats['porcentaje_sin_acceso'] = stats['distritos_sin_hospitales'] / stats['total_distritos'] * 100
+    return stats
+
+
+def conteo_distritos():
+    """Etapa 2: hospitales + DISTRITOS -> distritos_con_hospitales + estadísticas."""
+    gdf_hospitales = datastore.load('hospitales')
+    gdf_distritos = datastore.load('distritos')
+    if gdf_distritos.crs != 'EPSG:4326':
+        gdf_distritos = gdf_distritos.to_crs('EPSG:4326')
+
+    with profiling.span('sjoin_distritos', 'stage', rows=len(gdf_hospitales)):
+        distritos_completo, _ = contar_hospitales_por_distrito(gdf_hospitales, gdf_distritos)
+    stats = analisis_departamental(gdf_hospitales, distritos_completo)
+
+    distritos_completo.to_file(d('distritos_con_hospitales.geojson'), driver='GeoJSON')
+    stats.to_csv(d('estadisticas_departamentales.csv'), index=False)
+    return {'distritos': len(distritos_completo),
+            'sin_hospitales': int((distritos_completo['num_hospitales'] == 0).sum())}
+
+
+# ---------------------------------------------------------------------------
+# Notebook 02: mapas estáticos
+# ---------------------------------------------------------------------------
+
+MAPAS_ESTATICOS = [
+    ('Distribución General de Hospitales', 'mapa_distribucion_general.png'),
+    ('Distritos Sin Hospitales', 'mapa_distritos_sin_hospitales.png'),
+    ('Concentración por Distrito', 'mapa_concentracion_distritos.png'),
+    ('Top 10 Distritos', 'mapa_top10_distritos.png'),
+]
+
+
+# Atlas: una hoja 2×2 por departamento (nombres como en DISTRITOS.DEPARTAMEN)
+DEPARTAMENTOS = [
+    'AMAZONAS', 'ANCASH', 'APURIMAC', 'AREQUIPA', 'AYACUCHO', 'CAJAMARCA', 'CALLAO', 'CUSCO',
+    'HUANCAVELICA', 'HUANUCO', 'ICA', 'JUNIN', 'LA LIBERTAD', 'LAMBAYEQUE', 'LIMA', 'LORETO',
+    'MADRE DE DIOS', 'MOQUEGUA', 'PASCO', 'PIURA', 'PUNO', 'SAN MARTIN', 'TACNA', 'TUMBES', 'UCAYALI',
+]
+DPI_MAPAS = 300
+DPI_ATLAS = 150
+
+
+def archivo_atlas(departamento: str) -> str:
+    """Ruta (relativa a /data) de la hoja del atlas de un departamento."""
+    return f"atlas/mapa_{departamento.lower().replace(' ', '_')}.png"
+
+
+def tareas_mapas_estaticos(dpi=DPI_MAPAS, departamentos=DEPARTAMENTOS, dpi_atlas=DPI_ATLAS):
+    """Figuras del lote: hoja nacional, mapas individuales para Streamlit y hojas del atlas."""
+    tareas = [(None, None, 'Análisis Geoespacial de Hospitales Públicos en Perú',
+               d('mapas_estaticos_completos.png'), dpi)]
+    tareas += [(i, None, titulo, d(archivo), dpi) for i, (titulo, archivo) in enumerate(MAPAS_ESTATICOS)]
+    tareas += [(None, depto, f'Hospitales Públicos - {depto.title()}', d(archivo_atlas(depto)), dpi_atlas)
+               for depto in departamentos]
+    return tareas
+
+
+def mapas_estaticos():
+    """
+    Etapa 3: PNGs de la pestaña de mapas estáticos y atlas departamental,
+    renderizados en paralelo sobre capas preparadas una sola vez.
+    """
+    from staticmaps import StaticLayers, render
+
+    # Polígonos simplificados bajo el tamaño de píxel (caché por huella de la fuente)
+    distritos = datastore.load('distritos_hospitales_medio', columns=['DEPARTAMEN', 'num_hospitales'])
+    hospitales = datastore.load('hospitales', columns=['Departamento'])
+    capas = StaticLayers.from_geodataframes(distritos, hospitales)
+    tareas = tareas_mapas_estaticos()
+    d('atlas').mkdir(exist_ok=True)
+    with profiling.span('render_mapas', 'stage', rows=len(tareas)):
+        resultados = render(capas, tareas)
+    return {'mapas': len(resultados),
+            'mas_lento_s': round(max(segundos for _, segundos in resultados), 1)}
+
+
+# ---------------------------------------------------------------------------
+# Notebook 03: proximidad Lima / Loreto
+# ---------------------------------------------------------------------------
+
+def cargar_centros_poblados():
+    """Centros poblados de referencia de Lima y Loreto como GeoDataFrame."""
+    import geopandas as gpd
+    datos = pd.DataFrame(CENTROS_POBLADOS)
+    geometry = gpd.points_from_xy(datos['longitud'], datos['latitud'])
+    return gpd.GeoDataFrame(datos, geometry=geometry, crs='EPSG:4326')
+
+
+def crear_buffers_proximidad(gdf_hospitales, gdf_centros_poblados, distancia_km=10):
+    """Buffers de proximidad por región y acceso de cada centro poblado."""
+    from proximity import HospitalIndex
+
+    resultados = {}
+    for region in REGIONES_PROXIMIDAD:
+        hospitales_region = gdf_hospitales[gdf_hospitales['Departamento'].str.upper() == region.upper()]
+        centros_region = gdf_centros_poblados[gdf_centros_poblados['departamento'] == region.upper()]
+        if len(hospitales_region) == 0:
+            resultados[region] = {'buffers': None, 'centros': None, 'hospitales': None}
+            continue
+
+        # Buffers métricos en UTM 18S, reproyectados a WGS84
+        buffers = hospitales_region.to_crs('EPSG:32718')
+        buffers = buffers.set_geometry(buffers.geometry.buffer(distancia_km * 1000)).to_crs('EPSG:4326')
+
+        # Acceso: hospitales a <= distancia_km con el índice espacial
+        indice = HospitalIndex.from_geodataframe(hospitales_region)
+        centros = indice.access_table(centros_region, radius_km=distancia_km)
+        centros = centros[list(centros_region.columns) + ['tiene_acceso']]
+
+        resultados[region] = {'buffers': buffers, 'centros': centros, 'hospitales': hospitales_region}
+    return resultados
+
+
+def proximidad():
+    """Etapa 4: buffers y centros poblados con acceso para Lima y Loreto."""
+    gdf_hospitales = datastore.load('hospitales')
+    resultados = crear_buffers_proximidad(gdf_hospitales, cargar_centros_poblados())
+    resumen = {}
+    for region, datos in resultados.items():
+        if datos['buffers'] is None:
+            continue
+        datos['buffers'].to_file(d(f'buffers_{region}_10km.geojson'), driver='GeoJSON')
+        datos['centros'].to_file(d(f'centros_poblados_{region}_acceso.geojson'), driver='GeoJSON')
+        resumen[region] = int(datos['centros']['tiene_acceso'].sum())
+    return resumen
+
+
+def cobertura():
+    """
+    Etapa 4b: cobertura de 10 km de todos los departamentos, cada uno en su zona
+    UTM, sobre la capa completa CCPP_IGN100K; se une a las estadísticas distritales.
+    """
+    from coverage import assign_departments, coverage_geodataframe, national_coverage
+
+    hospitales = datastore.load('hospitales', columns=['Departamento'])
+    centros = datastore.load('ccpp')
+    distritos = datastore.load('distritos', columns=['DEPARTAMEN'])
+    centros['Departamento'] = assign_departments(centros, distritos)
+
+    tabla, geometrias = national_coverage(hospitales, centros, radius_km=10, with_geometry=True)
+    stats = pd.read_csv(d('estadisticas_departamentales.csv'))
+    nacional = stats.merge(tabla.drop(columns=['hospitales']), on='Departamento', how='outer')
+    nacional.to_csv(d('cobertura_departamental.csv'), index=False)
+    coverage_geodataframe(tabla, geometrias).to_file(d('cobertura_departamental.geojson'), driver='GeoJSON')
+    return {'departamentos': len(tabla),
+            'centros_cubiertos': int(tabla['centros_cubiertos'].sum())}
+
+
+# Hospitales nuevos sugeridos por el optimizador de cobertura máxima
+SITIOS_OPTIMOS = 25
+
+
+def ubicacion_optima():
+    """
+    Etapa 4c: sitios (centros poblados CCPP) donde SITIOS_OPTIMOS hospitales
+    nuevos cubrirían a 10 km más centros hoy sin cobertura, en orden de selección.
+    """
+    from districts import district_index
+    from optimizer import maximal_coverage
+
+    hospitales = datastore.load('hospitales', columns=['Nombre del establecimiento'])
+    centros = datastore.load('ccpp')
+    indice = district_index()
+    centros['IDDIST'] = indice.assign(centros, 'IDDIST')
+
+    tabla, resumen = maximal_coverage(hospitales, centros, k=SITIOS_OPTIMOS, radius_km=10)
+    nombres = pd.DataFrame(indice.attrs)[['IDDIST', 'DEPARTAMEN', 'PROVINCIA', 'DISTRITO']].drop_duplicates('IDDIST')
+    tabla = tabla.merge(nombres, on='IDDIST', how='left').drop(columns=['IDDIST', 'candidato'])
+    tabla.to_csv(d('sitios_optimos.csv'), index=False)
+    return {'sitios': len(tabla), 'centros_nuevos': int(resumen['cobertura_nueva'])}
+
+
+# Superficie de costo de viaje en regiones fluviales (ríos / vías opcionales en /data)
+REGIONES_COSTO = ['loreto']
+CAPAS_COSTO = ['rios', 'vias']
+CELDA_COSTO_KM = 1.0
+COSTO_MAXIMO_MIN = 600
+
+
+def cargar_capa_opcional(nombre):
+    """GeoDataFrame de /data si el archivo existe; None si no."""
+    ruta = d(nombre)
+    if not ruta.exists():
+        return None
+    import geopandas as gpd
+    capa = gpd.read_file(ruta)
+    return capa.set_crs('EPSG:4326') if capa.crs is None else capa
+
+
+def costo_acceso():
+    """
+    Etapa 4d: costo de viaje (min) al hospital más cercano sobre un raster de
+    fricción por región y costo de cada centro poblado leído de su celda.
+    Usa rios_{region}.geojson y vias_{region}.geojson si existen.
+    """
+    from costdistance import region_accessibility
+    from coverage import assign_departments
+
+    hospitales = datastore.load('hospitales', columns=['Nombre del establecimiento'])
+    centros = datastore.load('ccpp')
+    distritos = datastore.load('distritos', columns=['DEPARTAMEN'])
+    centros['Departamento'] = assign_departments(centros, distritos)
+
+    resumen = {}
+    for region in REGIONES_COSTO:
+        rios, vias = (cargar_capa_opcional(f'{capa}_{region}.geojson') for capa in CAPAS_COSTO)
+        with profiling.span(f'costo_{region}', 'stage') as tramo:
+            superficie, tabla = region_accessibility(
+                hospitales, centros[centros['Departamento'] == region.upper()], distritos, region,
+                cell_km=CELDA_COSTO_KM, rivers=rios, roads=vias, max_minutes=COSTO_MAXIMO_MIN
+            )
+            tramo.rows = superficie.cost.size
+        superficie.save(d(f'costo_acceso_{region}.npz'))
+        tabla.to_csv(d(f'centros_costo_{region}.csv'), index=False)
+        resumen[region] = {'celdas': int(superficie.cost.size),
+                           'centros_2h': int((tabla['costo_min'] <= 120).sum())}
+    return resumen
+
+
+# Pirámide de teselas web-mercator para mapas de densidad y acceso a escala nacional
+ZOOMS_GRILLA = (5, 13)
+
+
+def grilla_nacional():
+    """
+    Etapa 4e: hospitales, centros CCPP, centros con acceso a 10 km y distancia
+    media al hospital más cercano por tesela, del zoom 5 al 13.
+    """
+    from tilegrid import national_grid
+
+    hospitales = datastore.load('hospitales', columns=[])
+    centros = datastore.load('ccpp', columns=[])
+    with profiling.span('grilla_nacional', 'stage', rows=len(centros)):
+        piramide = national_grid(hospitales, centros, radius_km=10,
+                                 min_zoom=ZOOMS_GRILLA[0], max_zoom=ZOOMS_GRILLA[1])
+    piramide.save(d('grilla_nacional.npz'))
+    return {f'teselas_z{z}': len(piramide.levels[z]['x']) for z in (ZOOMS_GRILLA[0], ZOOMS_GRILLA[1])}
+
+
+# ---------------------------------------------------------------------------
+# Notebook 04: mapas interactivos
+# ---------------------------------------------------------------------------
+
+# Tolerancia (grados, ~100 m) de los polígonos distritales en el mapa web
+SIMPLIFICACION_DISTRITOS = 0.001
+# Niveles de la grilla nacional que se ofrecen como capas (teselas de ~77 km y ~19 km)
+ZOOMS_MAPA = (9, 11)
+
+
+def crear_mapa_nacional(hospitales, distritos, grilla=None):
+    """Mapa nacional con coroplético, cluster de hospitales y, opcionalmente, capas de la grilla."""
+    import folium
+
+    bounds = hospitales.total_bounds
+    mapa_nacional = folium.Map(
+        location=[(bounds[1] + bounds[3]) / 2, (bounds[0] + bounds[2]) / 2],
+        zoom_start=6,
+        tiles='OpenStreetMap'
+    )
+    title_html = '''
+    <h3 align="center" style="font-size:20px"><b>🏥 Hospitales Públicos en Perú</b></h3>
+    <p align="center">Análisis Geoespacial de Acceso Hospitalario</p>
+    '''
+    mapa_nacional.get_root().html.add_child(folium.Element(title_html))
+
+    folium.Choropleth(
+        geo_data=mapbuilder.feature_collection(
+            distritos, ['IDDIST', 'DISTRITO', 'num_hospitales'], simplify=SIMPLIFICACION_DISTRITOS
+        ),
+        name='Hospitales por Distrito',
+        data=distritos,
+        columns=['IDDIST', 'num_hospitales'],
+        key_on='feature.properties.IDDIST',
+        fill_color='YlOrRd',
+        fill_opacity=0.7,
+        line_opacity=0.2,
+        legend_name='Número de Hospitales por Distrito',
+        nan_fill_color='lightgray'
+    ).add_to(mapa_nacional)
+
+    mapbuilder.cluster_layer(
+        hospitales, 'Nombre del establecimiento',
+        fields=['Departamento', 'Provincia', 'Institución', 'Clasificación'],
+        labels=['📍 Departamento', '📍 Provincia', '🏛️ Institución', '🏥 Clasificación'],
+        name='Hospitales'
+    ).add_to(mapa_nacional)
+
+    if grilla is not None:
+        niveles = {}
+        for zoom in ZOOMS_MAPA:
+            teselas = grilla.table(zoom)
+            niveles[zoom] = teselas[teselas['centros'] > 0].round({'dist_media_km': 1, 'porcentaje_acceso': 1})
+        # Una sola escala para todos los niveles: la leyenda vale para cualquier capa visible
+        distancias = pd.concat([t['dist_media_km'] for t in niveles.values()]).dropna()
+        vmin, vmax = (distancias.min(), distancias.max()) if len(distancias) else (None, None)
+        for zoom, teselas in niveles.items():
+            capa, escala = mapbuilder.grid_layer(
+                teselas, 'dist_media_km', name=f'Distancia media a hospital (zoom {zoom})',
+                caption='Distancia media al hospital más cercano (km)',
+                tooltip_fields=['centros', 'porcentaje_acceso', 'dist_media_km', 'hospitales'],
+                tooltip_aliases=['Centros poblados', '% con acceso ≤10 km', 'Distancia media (km)', 'Hospitales'],
+                vmin=vmin, vmax=vmax, show=False
+            )
+            capa.add_to(mapa_nacional)
+        escala.add_to(mapa_nacional)
+
+    folium.LayerControl().add_to(mapa_nacional)
+    return mapa_nacional
+
+
+LEYENDA_PROXIMIDAD = '''
+<div style="position: fixed;
+            bottom: 50px; left: 50px; width: 200px; height: 120px;
+            background-color: white; border:2px solid grey; z-index:9999;
+            font-size:14px; padding: 10px">
+<h4>Leyenda</h4>
+<p><i class="fa fa-plus" style="color:red"></i> Hospitales</p>
+<p><i class="fa fa-circle" style="color:green"></i> Con acceso (≤10km)</p>
+<p><i class="fa fa-circle" style="color:orange"></i> Sin acceso (>10km)</p>
+<p style="color:blue">⭕ Buffers 10km</p>
+</div>
+'''
+
+
+def crear_mapa_regional_proximidad(region, hospitales, buffers, centros):
+    """Mapa de proximidad de una región con buffers, hospitales y centros poblados."""
+    import folium
+
+    center = hospitales.geometry.iloc[0]
+    mapa = folium.Map(
+        location=[center.y, center.x],
+        zoom_start=9 if region == 'lima' else 7,
+        tiles='CartoDB positron'
+    )
+    title_html = f'''
+    <h3 align="center"><b>Análisis de Proximidad - {region.title()}</b></h3>
+    <p align="center">Buffers de 10 km y Acceso a Hospitales</p>
+    '''
+    mapa.get_root().html.add_child(folium.Element(title_html))
+
+    mapbuilder.geojson_layer(
+        buffers, name='Buffers 10 km',
+        style={'fillColor': 'lightblue', 'color': 'blue', 'weight': 2, 'fillOpacity': 0.2, 'opacity': 0.8},
+        tooltip='Área de cobertura 10 km'
+    ).add_to(mapa)
+
+    mapbuilder.geojson_layer(
+        hospitales, name='Hospitales',
+        popup_fields=['Nombre del establecimiento', 'Institución'], popup_aliases=['', ''],
+        tooltip_fields=['Nombre del establecimiento'],
+        marker=folium.Marker(icon=folium.Icon(color='red', icon='plus', prefix='fa'))
+    ).add_to(mapa)
+
+    centros = centros.assign(acceso=centros['tiene_acceso'].map({True: '✅ SÍ (≤10km)', False: '❌ NO (>10km)'}))
+    mapbuilder.geojson_layer(
+        centros, name='Centros poblados',
+        style={'weight': 3, 'fillOpacity': 0.8},
+        color_column='tiene_acceso', color_map={True: 'green', False: 'orange'},
+        popup_fields=['nombre_ccpp', 'acceso'], popup_aliases=['', 'Acceso:'],
+        tooltip_fields=['nombre_ccpp'],
+        marker=folium.CircleMarker(radius=8, fill=True)
+    ).add_to(mapa)
+
+    mapa.get_root().html.add_child(folium.Element(LEYENDA_PROXIMIDAD))
+    return mapa
+
+
+def mapas_interactivos():
+    """Etapa 5: mapas HTML nacional (con la grilla de acceso) y de proximidad Lima / Loreto."""
+    from tilegrid import GridPyramid
+
+    hospitales = datastore.load('hospitales')
+    distritos = datastore.load('distritos_hospitales', columns=['IDDIST', 'DISTRITO', 'num_hospitales'])
+    grilla = GridPyramid.load(d('grilla_nacional.npz'))
+    with profiling.span('mapa_nacional', 'stage', rows=len(hospitales)):
+        crear_mapa_nacional(hospitales, distritos, grilla).save(str(d('mapa_nacional_hospitales.html')))
+
+    for region in REGIONES_PROXIMIDAD:
+        hospitales_region = hospitales[hospitales['Departamento'].str.upper() == region.upper()]
+        with profiling.span(f'mapa_{region}', 'stage', rows=len(hospitales_region)):
+            mapa = crear_mapa_regional_proximidad(
+                region, hospitales_region, datastore.load(f'buffers_{region}', columns=[]),
+                datastore.load(f'centros_{region}')
+            )
+            mapa.save(str(d(f'mapa_{region}_proximidad.html')))
+    return {'mapas': 1 + len(REGIONES_PROXIMIDAD)}
@@ -0,0 +1,209 @@
+"""
+Render de los mapas estáticos (notebook 02) en procesos paralelos.
+
+El notebook vuelve a convertir la capa distrital completa en parches de
+matplotlib (vía GeoDataFrame.plot) en cada uno de los cinco PNG a 300 dpi y
+los guarda uno tras otro. Aquí `StaticLayers` prepara una sola vez las
+trayectorias de matplotlib de cada distrito (anillos ya simplificados), su
+conteo de hospitales y su departamento, y las coordenadas de los hospitales;
+`render` reparte las figuras entre procesos con backend Agg que reciben esas
+capas una sola vez al arrancar. Cada figura, incluidas las hojas por
+departamento del atlas, es una tarea independiente, de modo que el lote tarda
+lo que la figura más lenta por proceso y no la suma de todas.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+TITULOS_PANELES = ['Distribución General de Hospitales', 'Distritos SIN Hospitales (Zonas Críticas)',
+                   'Concentración de Hospitales por Distrito', 'Top 10 Distritos con Más Hospitales']
+TOP_DISTRITOS = 10
+
+
+def district_paths(geometrias):
+    """
+    Una trayectoria compuesta de matplotlib por geometría (polígono o
+    multipolígono, con sus huecos); None para geometrías nulas o vacías.
+    """
+    import shapely
+    from matplotlib.path import Path
+
+    geometrias = np.asarray(geometrias, dtype=object)
+    partes, de_geometria = shapely.get_parts(geometrias, return_index=True)
+    anillos, de_parte = shapely.get_rings(partes, return_index=True)
+    coords, de_anillo = shapely.get_coordinates(anillos, return_index=True)
+
+    # Códigos por vértice: MOVETO al abrir cada anillo y CLOSEPOLY al cerrarlo
+    codigos = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+    inicio = np.r_[True, de_anillo[1:] != de_anillo[:-1]]
+    codigos[inicio] = Path.MOVETO
+    codigos[np.r_[inicio[1:], True]] = Path.CLOSEPOLY
+
+    de_vertice = de_geometria[de_parte[de_anillo]]
+    cortes = np.searchsorted(de_vertice, np.arange(len(geometrias) + 1))
+    return [Path(coords[a:b], codigos[a:b]) if b > a else None for a, b in zip(cortes[:-1], cortes[1:])]
+
+
+class StaticLayers:
+    """Distritos como trayectorias de matplotlib con su conteo y departamento, y hospitales como coordenadas."""
+
+    def __init__(self, paths, num_hospitales, departamento, hosp_lon, hosp_lat, hosp_departamento):
+        self.paths = paths
+        self.num_hospitales = np.asarray(num_hospitales, dtype=float)
+        self.departamento = np.asarray(departamento, dtype=object)
+        self.hosp_lon = np.asarray(hosp_lon, dtype=float)
+        self.hosp_lat = np.asarray(hosp_lat, dtype=float)
+        self.hosp_departamento = np.asarray(hosp_departamento, dtype=object)
+
+    @classmethod
+    def from_geodataframes(cls, distritos, hospitales, count_col="num_hospitales",
+                           dept_col="DEPARTAMEN", hosp_dept_col="Departamento"):
+        from proximity import point_coords
+
+        if distritos.crs is not None and distritos.crs.to_epsg() != 4326:
+            distritos = distritos.to_crs("EPSG:4326")
+        paths = district_paths(distritos.geometry.values)
+        con_geometria = np.array([p is not None for p in paths], dtype=bool)
+        h_lon, h_lat = point_coords(hospitales)
+        h_dept = (hospitales[hosp_dept_col].astype(object).to_numpy() if hosp_dept_col in hospitales.columns
+                  else np.full(len(hospitales), None, dtype=object))
+        return cls(
+            [p for p in paths if p is not None],
+            distritos[count_col].to_numpy(dtype=float)[con_geometria],
+            distritos[dept_col].astype(object).to_numpy()[con_geometria],
+            h_lon, h_lat, h_dept,
+        )
+
+    def __len__(self):
+        return len(self.paths)
+
+    def subset(self, departamento):
+        """Capas de un solo departamento (distritos y hospitales)."""
+        distritos = np.flatnonzero(self.departamento == departamento)
+        hospitales = self.hosp_departamento == departamento
+        return StaticLayers(
+            [self.paths[i] for i in distritos], self.num_hospitales[distritos], self.departamento[distritos],
+            self.hosp_lon[hospitales], self.hosp_lat[hospitales], self.hosp_departamento[hospitales],
+        )
+
+    def top(self, n=TOP_DISTRITOS):
+        """Máscara de los n distritos con más hospitales (empates: el primero, como nlargest)."""
+        mascara = np.zeros(len(self), dtype=bool)
+        mascara[np.argsort(-self.num_hospitales, kind="stable")[:n]] = True
+        return mascara
+
+    def aspect(self):
+        """Relación de aspecto de GeoPandas para coordenadas geográficas."""
+        if not self.paths:
+            return "equal"
+        extremos = np.array([p.get_extents().bounds for p in self.paths])
+        y_medio = (extremos[:, 1].min() + extremos[:, 3].max()) / 2
+        return 1 / np.cos(np.radians(y_medio))
+
+
+def _polygons(ax, capas, mascara, **estilo):
+    from matplotlib.collections import PathCollection
+    paths = [p for p, incluido in zip(capas.paths, mascara) if incluido]
+    coleccion = PathCollection(paths, **estilo)
+    ax.add_collection(coleccion, autolim=True)
+    return coleccion
+
+
+def draw_panel(ax, i, capas, detalle=False):
+    """Dibuja el mapa i (0-3) de la serie estática sobre `ax` (mismos estilos que el notebook 02)."""
+    import matplotlib.pyplot as plt
+
+    todos = np.ones(len(capas), dtype=bool)
+    lw = 0.3 if detalle else None
+    if i == 0:  # Distribución general
+        _polygons(ax, capas, todos, facecolor='lightgray', edgecolor='white', alpha=0.7, linewidth=0.5)
+        ax.scatter(capas.hosp_lon, capas.hosp_lat, color='red', s=25 if detalle else 30, alpha=0.8)
+    elif i == 1:  # Distritos sin hospitales
+        sin = capas.num_hospitales == 0
+        _polygons(ax, capas, sin, facecolor='red', alpha=0.7, edgecolor='darkred', linewidth=lw)
+        _polygons(ax, capas, ~sin, facecolor='lightgreen', alpha=0.5, edgecolor='white', linewidth=lw)
+    elif i == 2:  # Coroplético
+        coleccion = _polygons(ax, capas, todos, cmap='YlOrRd', edgecolor='white', linewidth=lw)
+        coleccion.set_array(capas.num_hospitales)
+        if len(capas):
+            coleccion.set_clim(capas.num_hospitales.min(), capas.num_hospitales.max())
+        plt.colorbar(coleccion, ax=ax)
+    elif i == 3:  # Top 10
+        _polygons(ax, capas, todos, facecolor='lightgray', edgecolor='white', alpha=0.7,
+                  linewidth=0.5 if detalle else None)
+        _polygons(ax, capas, capas.top(), facecolor='gold', edgecolor='orange', alpha=0.8,
+                  linewidth=1.5 if detalle else None)
+    ax.autoscale_view()
+    ax.set_aspect(capas.aspect())
+
+
+def sheet_figure(capas, titulo):
+    """Hoja 2×2 con los cuatro mapas."""
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(2, 2, figsize=(20, 16))
+    fig.suptitle(titulo, fontsize=20, fontweight='bold')
+    for i, (ax, titulo_panel) in enumerate(zip(axes.flat, TITULOS_PANELES)):
+        draw_panel(ax, i, capas, detalle=True)
+        ax.set_title(titulo_panel, fontsize=14, fontweight='bold')
+    axes[0, 0].set_xlabel('Longitud')
+    axes[0, 0].set_ylabel('Latitud')
+    plt.tight_layout()
+    return fig
+
+
+def single_figure(capas, i, titulo):
+    """Un mapa individual (pestaña de mapas estáticos del dashboard)."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(1, 1, figsize=(12, 8))
+    draw_panel(ax, i, capas)
+    ax.set_title(titulo, fontsize=16, fontweight='bold')
+    ax.set_xlabel('Longitud')
+    ax.set_ylabel('Latitud')
+    plt.tight_layout()
+    return fig
+
+
+# Capas del proceso de render (se fijan una vez por proceso en _init_worker)
+_CAPAS = None
+
+
+def _init_worker(capas):
+    global _CAPAS
+    import matplotlib
+    matplotlib.use('Agg')
+    _CAPAS = capas
+
+
+def _render(tarea):
+    """Tarea (panel o None para la hoja 2×2, departamento o None, título, ruta, dpi) -> (archivo, segundos)."""
+    import matplotlib.pyplot as plt
+
+    panel, departamento, titulo, ruta, dpi = tarea
+    inicio = time.perf_counter()
+    capas = _CAPAS if departamento is None else _CAPAS.subset(departamento)
+    fig = sheet_figure(capas, titulo) if panel is None else single_figure(capas, panel, titulo)
+    fig.savefig(ruta, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return str(ruta), time.perf_counter() - inicio
+
+
+def render(capas, tareas, max_workers=None):
+    """
+    Renderiza las tareas en procesos con backend Agg; con max_workers=1 en
+    este proceso. Las hojas 2×2 (las más lentas) se encolan primero.
+    Devuelve [(archivo, segundos)] en el orden de `tareas`.
+    """
+    orden = sorted(range(len(tareas)), key=lambda k: tareas[k][0] is not None)
+    if max_workers == 1:
+        _init_worker(capas)
+        resultados = [_render(tareas[k]) for k in orden]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(capas,)) as pool:
+            resultados = list(pool.map(_render, [tareas[k] for k in orden]))
+    salida = [None] * len(tareas)
+    for k, resultado in zip(orden, resultados):
+        salida[k] = resultado
+    return salida
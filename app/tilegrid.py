@@ -0,0 +1,153 @@
+"""
+Agregación jerárquica en teselas web-mercator (quadtree) a varios niveles de zoom.
+
+Hospitales y centros poblados se asignan una sola vez, de forma vectorizada,
+a su tesela del nivel más fino (`MAX_ZOOM`). Cada nivel guarda arrays
+compactos: columna/fila de la tesela, hospitales, centros, centros con acceso y
+la suma y el conteo de distancias al hospital más cercano. Como una tesela de
+zoom z contiene exactamente las cuatro de z+1 (x >> 1, y >> 1), pasar a un
+nivel más grueso es sumar por clave: la media de distancia se recompone de
+sumas y conteos sin volver a leer los puntos.
+"""
+import numpy as np
+import pandas as pd
+
+from proximity import point_coords
+
+MIN_ZOOM = 5
+MAX_ZOOM = 13
+# Límite de latitud de la proyección web-mercator
+MAX_LAT = 85.05112878
+
+CAMPOS = ("hospitales", "centros", "con_acceso", "dist_suma", "dist_conteo")
+
+
+def tile_xy(lon, lat, zoom):
+    """Columna y fila (enteros) de la tesela web-mercator de cada punto a un zoom."""
+    n = 1 << zoom
+    lat = np.radians(np.clip(np.asarray(lat, dtype=float), -MAX_LAT, MAX_LAT))
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0 * n
+    y = (1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0 * n
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def tile_bounds(x, y, zoom):
+    """(oeste, sur, este, norte) en grados de teselas dadas por columna/fila."""
+    n = float(1 << zoom)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    def latitud(fila):
+        return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * fila / n))))
+
+    return x / n * 360.0 - 180.0, latitud(y + 1), (x + 1) / n * 360.0 - 180.0, latitud(y)
+
+
+def _sum_by_key(x, y, zoom, valores):
+    """Suma cada array de `valores` por tesela (x, y); devuelve teselas ordenadas y sumas."""
+    clave = (x << zoom) | y
+    unicas, inversa = np.unique(clave, return_inverse=True)
+    sumas = {campo: np.bincount(inversa, weights=v, minlength=len(unicas)) for campo, v in valores.items()}
+    mascara = (1 << zoom) - 1
+    return unicas >> zoom, unicas & mascara, sumas
+
+
+class GridPyramid:
+    """Agregados por tesela para los niveles MIN_ZOOM..MAX_ZOOM."""
+
+    def __init__(self, levels):
+        # zoom -> dict con x, y y los CAMPOS como arrays alineados
+        self.levels = levels
+
+    @property
+    def zooms(self):
+        return sorted(self.levels)
+
+    @classmethod
+    def from_points(cls, hosp_lon, hosp_lat, center_lon, center_lat, dist_km=None, access=None,
+                    min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+        """
+        Construye la pirámide: asigna cada punto a su tesela de max_zoom y
+        agrega hacia arriba. `dist_km` (distancia al hospital más cercano, inf
+        si no se conoce) y `access` (bool) son por centro poblado.
+        """
+        n_h, n_c = len(hosp_lon), len(center_lon)
+        dist = np.full(n_c, np.inf) if dist_km is None else np.asarray(dist_km, dtype=float)
+        finita = np.isfinite(dist)
+        acceso = np.zeros(n_c, dtype=bool) if access is None else np.asarray(access, dtype=bool)
+
+        hx, hy = tile_xy(hosp_lon, hosp_lat, max_zoom)
+        cx, cy = tile_xy(center_lon, center_lat, max_zoom)
+        ceros_h, ceros_c = np.zeros(n_h), np.zeros(n_c)
+        valores = {
+            "hospitales": np.r_[np.ones(n_h), ceros_c],
+            "centros": np.r_[ceros_h, np.ones(n_c)],
+            "con_acceso": np.r_[ceros_h, acceso],
+            "dist_suma": np.r_[ceros_h, np.where(finita, dist, 0.0)],
+            "dist_conteo": np.r_[ceros_h, finita],
+        }
+        x, y, sumas = _sum_by_key(np.r_[hx, cx], np.r_[hy, cy], max_zoom, valores)
+        levels = {max_zoom: cls._pack(x, y, sumas)}
+        for zoom in range(max_zoom - 1, min_zoom - 1, -1):
+            levels[zoom] = cls._rollup(levels[zoom + 1], zoom)
+        return cls(levels)
+
+    @classmethod
+    def from_geodataframes(cls, hospitales, centros, dist_col="dist_hospital_km", access_col="tiene_acceso", **kwargs):
+        h_lon, h_lat = point_coords(hospitales)
+        c_lon, c_lat = point_coords(centros)
+        dist = centros[dist_col].to_numpy() if dist_col in centros.columns else None
+        acceso = centros[access_col].to_numpy() if access_col in centros.columns else None
+        return cls.from_points(h_lon, h_lat, c_lon, c_lat, dist, acceso, **kwargs)
+
+    @staticmethod
+    def _pack(x, y, sumas):
+        nivel = {"x": x.astype(np.int32), "y": y.astype(np.int32)}
+        for campo in CAMPOS:
+            tipo = np.float64 if campo == "dist_suma" else np.int32
+            nivel[campo] = sumas[campo].astype(tipo)
+        return nivel
+
+    @classmethod
+    def _rollup(cls, nivel, zoom):
+        """Nivel `zoom` a partir del inmediatamente más fino (zoom + 1)."""
+        x, y, sumas = _sum_by_key(nivel["x"].astype(np.int64) >> 1, nivel["y"].astype(np.int64) >> 1, zoom,
+                                  {campo: nivel[campo] for campo in CAMPOS})
+        return cls._pack(x, y, sumas)
+
+    def table(self, zoom) -> pd.DataFrame:
+        """Teselas no vacías de un nivel con sus agregados, límites y media de distancia."""
+        if zoom not in self.levels:
+            raise ValueError(f"Zoom {zoom} fuera de la pirámide ({self.zooms[0]}-{self.zooms[-1]})")
+        nivel = self.levels[zoom]
+        tabla = pd.DataFrame({campo: nivel[campo] for campo in ("x", "y") + CAMPOS})
+        tabla.insert(0, "zoom", zoom)
+        oeste, sur, este, norte = tile_bounds(tabla["x"], tabla["y"], zoom)
+        tabla["oeste"], tabla["sur"], tabla["este"], tabla["norte"] = oeste, sur, este, norte
+        conteo = tabla["dist_conteo"].to_numpy()
+        tabla["dist_media_km"] = np.where(conteo > 0, tabla["dist_suma"] / np.maximum(conteo, 1), np.nan)
+        tabla["porcentaje_acceso"] = np.where(
+            tabla["centros"] > 0, tabla["con_acceso"] / tabla["centros"].clip(lower=1) * 100, np.nan)
+        return tabla
+
+    def save(self, path):
+        np.savez_compressed(path, **{f"z{zoom}_{campo}": valores
+                                     for zoom, nivel in self.levels.items() for campo, valores in nivel.items()})
+
+    @classmethod
+    def load(cls, path):
+        levels = {}
+        with np.load(path) as datos:
+            for clave in datos.files:
+                zoom, campo = clave[1:].split("_", 1)
+                levels.setdefault(int(zoom), {})[campo] = datos[clave]
+        return cls(levels)
+
+
+def national_grid(hospitales=None, centros=None, radius_km=10, **kwargs) -> GridPyramid:
+    """Pirámide nacional de hospitales y centros CCPP con su acceso a radius_km."""
+    from proximity import load_hospitals, national_access
+
+    hospitales = load_hospitals() if hospitales is None else hospitales
+    tabla = national_access(radius_km=radius_km, hospitales=hospitales, centros=centros)
+    return GridPyramid.from_geodataframes(hospitales, tabla, **kwargs)
@@ -0,0 +1,306 @@
+"""
+Benchmarks de escalabilidad de las etapas del proyecto.
+
+Cada benchmark prepara datos sintéticos de tamaño n (benchmarks/synthetic.py,
+fuera del tiempo medido), mide el mejor tiempo de `--repeats` ejecuciones y,
+en una ejecución aparte con tracemalloc, la memoria pico. Los resultados se
+escriben en JSON y CSV y pueden compararse con una línea base guardada para
+detectar regresiones. No usa /data ni red.
+
+Uso:
+    python benchmarks/bench.py                          # tamaños 10^2..10^6
+    python benchmarks/bench.py --sizes 100 1000000 --only regresiones sjoin_distritos
+    python benchmarks/bench.py --save-baseline          # guarda benchmarks/baseline.json
+    python benchmarks/bench.py --baseline benchmarks/baseline.json
+"""
+import argparse
+import csv
+import gc
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "app"
+for ruta in (APP_DIR, BENCH_DIR):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+import numpy as np
+
+import synthetic
+
+RESULTS_DIR = BENCH_DIR / "results"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000, 1_000_000)
+SEED = 2024
+# Diferencias por debajo de este tiempo se consideran ruido
+NOISE_FLOOR_S = 0.005
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    setup: Callable       # (n, rng) -> tupla de argumentos, fuera de la medición
+    run: Callable         # (*args) -> dict opcional con métricas extra
+    max_size: Optional[int] = None
+    description: str = ""
+    teardown: Optional[Callable] = None   # (*args) -> None, limpia lo creado en setup
+
+
+# ----- Etapas -----
+
+def _setup_regresiones(n, rng):
+    import estimation
+    np.random.seed(rng.integers(2**32))
+    return (estimation.generate_data(n),)
+
+
+def _run_regresiones(data):
+    import estimation
+    estimation.execute_regressions(data.copy())
+
+
+def _setup_sjoin(n, rng):
+    return synthetic.hospitals(n, rng), synthetic.districts(1873)
+
+
+def _run_sjoin(hospitales, distritos):
+    import stages
+    distritos_completo, _ = stages.contar_hospitales_por_distrito(hospitales, distritos)
+    return {"distritos_con_hospital": int((distritos_completo["num_hospitales"] > 0).sum())}
+
+
+def _setup_buffers(n, rng):
+    # Solo Lima y Loreto generan buffers: concentrar ahí los n hospitales
+    hospitales = synthetic.hospitals(n, rng)
+    hospitales["Departamento"] = rng.choice(["LIMA", "LORETO"], size=n)
+    return hospitales, synthetic.population_centers(max(n // 10, 33), rng)
+
+
+def _run_buffers(hospitales, centros):
+    import stages
+    stages.crear_buffers_proximidad(hospitales, centros)
+
+
+def _setup_proximidad(n, rng):
+    return synthetic.hospitals(max(n // 100, 10), rng), synthetic.population_centers(n, rng)
+
+
+def _run_proximidad(hospitales, centros):
+    from proximity import HospitalIndex
+    tabla = HospitalIndex.from_geodataframe(hospitales).access_table(centros)
+    return {"con_acceso": int(tabla["tiene_acceso"].sum())}
+
+
+def _setup_mapa(n, rng):
+    hospitales = synthetic.hospitals(n, rng)
+    distritos = synthetic.districts(1873)
+    distritos["num_hospitales"] = rng.integers(0, 5, size=len(distritos))
+    return hospitales, distritos[["IDDIST", "DISTRITO", "num_hospitales", "geometry"]]
+
+
+def _run_mapa(hospitales, distritos):
+    import stages
+    html = stages.crear_mapa_nacional(hospitales, distritos).get_root().render()
+    return {"html_bytes": len(html.encode("utf-8"))}
+
+
+@contextmanager
+def _datastore_en(directorio):
+    """Apunta datastore a un directorio temporal (rutas resueltas en cada llamada)."""
+    import datastore
+    previo = datastore.DATA_DIR, datastore.CACHE_DIR
+    datastore.DATA_DIR, datastore.CACHE_DIR = directorio, directorio / "cache"
+    try:
+        yield datastore
+    finally:
+        datastore.DATA_DIR, datastore.CACHE_DIR = previo
+
+
+def _setup_carga(n, rng):
+    directorio = Path(tempfile.mkdtemp(prefix="bench_datastore_"))
+    hospitales = synthetic.hospitals(n, rng)
+    hospitales.to_file(directorio / "hospitales_procesados.geojson", driver="GeoJSON")
+    with _datastore_en(directorio) as datastore:
+        datastore.write_cache("hospitales")
+    return (directorio,)
+
+
+def _run_carga(directorio):
+    with _datastore_en(directorio) as datastore:
+        return {"filas": len(datastore.load("hospitales"))}
+
+
+def _teardown_carga(directorio):
+    shutil.rmtree(directorio, ignore_errors=True)
+
+
+def _run_carga_fuente(directorio):
+    import geopandas as gpd
+    return {"filas": len(gpd.read_file(directorio / "hospitales_procesados.geojson"))}
+
+
+BENCHMARKS = [
+    Benchmark("regresiones", _setup_regresiones, _run_regresiones,
+              description="estimation.execute_regressions sobre generate_data(n)"),
+    Benchmark("sjoin_distritos", _setup_sjoin, _run_sjoin,
+              description="stages.contar_hospitales_por_distrito: n hospitales x 1873 distritos"),
+    Benchmark("buffers_proximidad", _setup_buffers, _run_buffers, max_size=100_000,
+              description="stages.crear_buffers_proximidad: n hospitales en Lima/Loreto"),
+    Benchmark("acceso_kdtree", _setup_proximidad, _run_proximidad,
+              description="proximity.HospitalIndex.access_table: n centros, n/100 hospitales"),
+    Benchmark("mapa_nacional", _setup_mapa, _run_mapa, max_size=100_000,
+              description="stages.crear_mapa_nacional renderizado a HTML"),
+    Benchmark("carga_cache", _setup_carga, _run_carga, max_size=100_000,
+              description="datastore.load desde la caché Arrow (lo que usa load_data)",
+              teardown=_teardown_carga),
+    Benchmark("carga_fuente", _setup_carga, _run_carga_fuente, max_size=100_000,
+              description="lectura directa del GeoJSON fuente, sin caché", teardown=_teardown_carga),
+]
+
+
+# ----- Medición -----
+
+def measure(bench, n, repeats=3, seed=SEED):
+    """Mejor tiempo, mediana y memoria pico (MB) de un benchmark a tamaño n."""
+    args = bench.setup(n, synthetic.rng_for(seed, n))
+    tiempos, extra = [], {}
+    try:
+        for _ in range(repeats):
+            gc.collect()
+            inicio = time.perf_counter()
+            extra = bench.run(*args) or {}
+            tiempos.append(time.perf_counter() - inicio)
+
+        # Ejecución aparte: tracemalloc ralentiza el código Python
+        gc.collect()
+        tracemalloc.start()
+        bench.run(*args)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        if bench.teardown is not None:
+            bench.teardown(*args)
+    return {
+        "benchmark": bench.name,
+        "size": n,
+        "seconds": min(tiempos),
+        "seconds_median": statistics.median(tiempos),
+        "peak_mb": pico / 2**20,
+        "repeats": repeats,
+        **extra,
+    }
+
+
+def environment():
+    import pandas as pd
+    versiones = {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__}
+    for modulo in ("geopandas", "shapely", "scipy", "folium", "pyarrow"):
+        try:
+            versiones[modulo] = __import__(modulo).__version__
+        except ImportError:
+            versiones[modulo] = None
+    return {"platform": platform.platform(), "machine": platform.machine(), "versions": versiones}
+
+
+def run(sizes=DEFAULT_SIZES, only=None, repeats=3, seed=SEED, log=print):
+    resultados = []
+    for bench in BENCHMARKS:
+        if only and bench.name not in only:
+            continue
+        for n in sizes:
+            if bench.max_size is not None and n > bench.max_size:
+                log(f"⏭️  {bench.name} n={n:,}: supera max_size={bench.max_size:,}")
+                continue
+            fila = measure(bench, n, repeats=repeats, seed=seed)
+            resultados.append(fila)
+            log(f"⏱️  {bench.name:20s} n={n:>9,}  {fila['seconds']:8.3f}s  {fila['peak_mb']:8.1f} MB")
+    return resultados
+
+
+def write_results(resultados, meta, directorio=RESULTS_DIR):
+    directorio.mkdir(parents=True, exist_ok=True)
+    sello = meta["timestamp"].replace(":", "").replace("-", "")
+    ruta_json = directorio / f"bench_{sello}.json"
+    ruta_json.write_text(json.dumps({**meta, "results": resultados}, indent=1), encoding="utf-8")
+
+    campos = ["benchmark", "size", "seconds", "seconds_median", "peak_mb", "repeats"]
+    campos += sorted({k for fila in resultados for k in fila} - set(campos))
+    ruta_csv = ruta_json.with_suffix(".csv")
+    with open(ruta_csv, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=campos)
+        writer.writeheader()
+        writer.writerows(resultados)
+    return ruta_json, ruta_csv
+
+
+def compare(resultados, baseline, tolerance=0.25):
+    """Filas (benchmark, n, base, actual, ratio) con tiempo peor que base·(1+tolerance)."""
+    base = {(f["benchmark"], f["size"]): f for f in baseline["results"]}
+    regresiones = []
+    for fila in resultados:
+        previa = base.get((fila["benchmark"], fila["size"]))
+        if previa is None:
+            continue
+        ratio = fila["seconds"] / max(previa["seconds"], 1e-9)
+        if ratio > 1 + tolerance and fila["seconds"] - previa["seconds"] > NOISE_FLOOR_S:
+            regresiones.append((fila["benchmark"], fila["size"], previa["seconds"], fila["seconds"], ratio))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de escalabilidad Hospitals Access Peru")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES), help="tamaños n a medir")
+    parser.add_argument("--only", nargs="+", metavar="BENCHMARK", help="solo estos benchmarks")
+    parser.add_argument("--repeats", type=int, default=3, help="repeticiones por medición")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR, help="carpeta de resultados")
+    parser.add_argument("--baseline", type=Path, help="JSON de referencia para detectar regresiones")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="margen relativo antes de marcar regresión")
+    parser.add_argument("--save-baseline", action="store_true", help=f"guardar también en {BASELINE_PATH.name}")
+    parser.add_argument("--list", action="store_true", help="listar benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for bench in BENCHMARKS:
+            limite = f" (n <= {bench.max_size:,})" if bench.max_size else ""
+            print(f"{bench.name:20s} {bench.description}{limite}")
+        return
+
+    meta = {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "seed": args.seed,
+        "sizes": args.sizes,
+        **environment(),
+    }
+    resultados = run(args.sizes, args.only, args.repeats, args.seed)
+    ruta_json, ruta_csv = write_results(resultados, meta, args.output)
+    print(f"💾 {ruta_json}\n💾 {ruta_csv}")
+    if args.save_baseline:
+        BASELINE_PATH.write_text(ruta_json.read_text(encoding="utf-8"), encoding="utf-8")
+        print(f"📌 Línea base: {BASELINE_PATH}")
+
+    if args.baseline and not args.baseline.exists():
+        print(f"⚠️  No existe la línea base {args.baseline}; se omite la comparación (créala con --save-baseline)")
+    elif args.baseline:
+        regresiones = compare(resultados, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for nombre, n, antes, ahora, ratio in regresiones:
+            print(f"❌ {nombre} n={n:,}: {antes:.3f}s -> {ahora:.3f}s (x{ratio:.2f})")
+        if regresiones:
+            sys.exit(1)
+        print("✅ Sin regresiones respecto a la línea base")
+
+
+if __name__ == "__main__":
+    main()
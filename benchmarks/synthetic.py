@@ -0,0 +1,88 @@
+"""
+Datos sintéticos reproducibles para los benchmarks.
+
+Genera hospitales, centros poblados y polígonos distritales dentro del
+rectángulo de Perú usado en el filtrado (ipress.LAT_PERU / LON_PERU), con las
+mismas columnas que consumen las etapas de app/, para medir cómo escalan sin
+depender de los archivos de /data ni de conexión a internet.
+"""
+import numpy as np
+import pandas as pd
+
+from ipress import CLASIFICACIONES_HOSPITAL, INSTITUCIONES_PUBLICAS, LAT_PERU, LON_PERU
+
+DEPARTAMENTOS = [
+    'AMAZONAS', 'ANCASH', 'APURIMAC', 'AREQUIPA', 'AYACUCHO', 'CAJAMARCA', 'CALLAO',
+    'CUSCO', 'HUANCAVELICA', 'HUANUCO', 'ICA', 'JUNIN', 'LA LIBERTAD', 'LAMBAYEQUE',
+    'LIMA', 'LORETO', 'MADRE DE DIOS', 'MOQUEGUA', 'PASCO', 'PIURA', 'PUNO',
+    'SAN MARTIN', 'TACNA', 'TUMBES', 'UCAYALI',
+]
+
+
+def rng_for(seed, n):
+    """Generador independiente por (semilla, tamaño): cada escala es reproducible por sí sola."""
+    return np.random.default_rng([seed, n])
+
+
+def random_points(n, rng):
+    lon = rng.uniform(*LON_PERU, size=n)
+    lat = rng.uniform(*LAT_PERU, size=n)
+    return lon, lat
+
+
+def hospitals(n, rng):
+    """GeoDataFrame con el esquema de hospitales_procesados.geojson."""
+    import geopandas as gpd
+    lon, lat = random_points(n, rng)
+    departamento = rng.choice(DEPARTAMENTOS, size=n)
+    provincia = rng.integers(1, 10, size=n)
+    datos = pd.DataFrame({
+        'Nombre del establecimiento': [f'HOSPITAL {i}' for i in range(n)],
+        'Institución': pd.Categorical(rng.choice(INSTITUCIONES_PUBLICAS, size=n)),
+        'Clasificación': pd.Categorical(rng.choice(CLASIFICACIONES_HOSPITAL, size=n)),
+        'Departamento': pd.Categorical(departamento),
+        'Provincia': pd.Categorical([f'{d} {p}' for d, p in zip(departamento, provincia)]),
+        'Distrito': [f'DISTRITO {i}' for i in rng.integers(0, 1873, size=n)],
+        'latitud': lat,
+        'longitud': lon,
+    })
+    return gpd.GeoDataFrame(datos, geometry=gpd.points_from_xy(lon, lat), crs='EPSG:4326')
+
+
+def population_centers(n, rng, departamentos=('LIMA', 'LORETO')):
+    """Centros poblados con el esquema de stages.CENTROS_POBLADOS."""
+    import geopandas as gpd
+    lon, lat = random_points(n, rng)
+    datos = pd.DataFrame({
+        'nombre_ccpp': [f'CCPP {i}' for i in range(n)],
+        'latitud': lat,
+        'longitud': lon,
+        'departamento': rng.choice(list(departamentos), size=n),
+        'tipo_centro': rng.choice(['URBANO', 'RURAL'], size=n),
+    })
+    return gpd.GeoDataFrame(datos, geometry=gpd.points_from_xy(lon, lat), crs='EPSG:4326')
+
+
+def districts(n):
+    """Malla de ~n rectángulos sobre Perú con las columnas de DISTRITOS.shp."""
+    import geopandas as gpd
+    import shapely
+    columnas = max(1, int(round(np.sqrt(n))))
+    filas = max(1, int(np.ceil(n / columnas)))
+    xs = np.linspace(*LON_PERU, columnas + 1)
+    ys = np.linspace(*LAT_PERU, filas + 1)
+    ix, iy = np.meshgrid(np.arange(columnas), np.arange(filas))
+    ix, iy = ix.ravel()[:n], iy.ravel()[:n]
+    geometry = shapely.box(xs[ix], ys[iy], xs[ix + 1], ys[iy + 1])
+    departamento = np.asarray(DEPARTAMENTOS)[(iy * len(DEPARTAMENTOS)) // filas]
+    iddpto = np.array([f'{DEPARTAMENTOS.index(d) + 1:02d}' for d in departamento])
+    idprov = np.char.add(iddpto, np.char.zfill((ix % 20 + 1).astype(str), 2))
+    datos = pd.DataFrame({
+        'IDDPTO': iddpto,
+        'DEPARTAMEN': departamento,
+        'IDPROV': idprov,
+        'PROVINCIA': [f'PROVINCIA {p}' for p in idprov],
+        'IDDIST': [f'{i:06d}' for i in range(len(ix))],
+        'DISTRITO': [f'DISTRITO {i}' for i in range(len(ix))],
+    })
+    return gpd.GeoDataFrame(datos, geometry=geometry, crs='EPSG:4326')